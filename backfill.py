@@ -16,18 +16,26 @@ STAGE_CONFIG = {
     "ingestors": {
         "tag": "pipeline-ingestors",
         "cmd": ["ingestors", "massive"],
+        # Accepts --start/--end and handles the whole range in one container.
+        "batch": True,
     },
     "processors": {
         "tag": "pipeline-processors",
         "cmd": ["processors", "stock_features_daily"],
+        # Reads bronze once for the whole range plus lookback.
+        "batch": True,
     },
     "indicators": {
         "tag": "pipeline-indicators",
         "cmd": ["indicators", "spx_gold_daily"],
+        # Computes every date in the range from one silver read.
+        "batch": True,
     },
     "publishers": {
         "tag": "pipeline-publishers",
         "cmd": ["publishers", "spx_gold_trend"],
+        # One query, one COPY and one merge for the whole range.
+        "batch": True,
     },
 }
 
@@ -72,6 +80,44 @@ def run(
     return result.returncode
 
 
+def run_range(
+    start: str,
+    end: str,
+    stage: str,
+    *,
+    env_file: str = ".env",
+    version: str = VERSION,
+    series_id: str | None = None,
+    extra_args: list[str] | None = None,
+) -> int:
+    """Run the stage container once for an inclusive date range. Returns the exit code."""
+    config = STAGE_CONFIG[stage]
+    tag = config["tag"]
+    cmd = [
+        "docker",
+        "run",
+        "--rm",
+        "--env-file",
+        env_file,
+        "-v",
+        f"{ADC}:/tmp/keys/creds.json:ro",
+        "-e",
+        "GOOGLE_APPLICATION_CREDENTIALS=/tmp/keys/creds.json",
+        "-t",
+        f"{tag}:{version}",
+        *config["cmd"],
+        "--start",
+        start,
+        "--end",
+        end,
+        *(extra_args or []),
+    ]
+    if series_id is not None and stage == "ingestors":
+        cmd.extend(["--series-id", series_id])
+    result = subprocess.run(cmd, text=True)
+    return result.returncode
+
+
 @click.command()
 @click.option(
     "--stage",
@@ -126,6 +172,14 @@ def run(
     default=10,
     help="Number of dates to run in parallel. Default: 10.",
 )
+@click.option(
+    "--batch/--per-date",
+    default=False,
+    help=(
+        "Run the whole range in a single container for stages that support it "
+        "(--workers becomes the in-process concurrency). Default: per-date."
+    ),
+)
 def cli(
     stage: str,
     start: datetime | None,
@@ -136,6 +190,7 @@ def cli(
     version: str,
     continue_on_error: bool,
     workers: int,
+    batch: bool,
 ) -> None:
     """Backfill pipeline by running container for each date. Run stages in order: ingestors → processors → indicators → publishers."""
     logging.basicConfig(
@@ -161,6 +216,26 @@ def cli(
     if start is None or end is None:
         raise click.UsageError("Provide --start and --end, or --days-ago")
 
+    if batch and STAGE_CONFIG[stage].get("batch"):
+        # --end is exclusive here (matches the per-date loop); stage CLIs take inclusive ranges.
+        last = end.date() - timedelta(days=1)
+        if last < start.date():
+            raise click.UsageError("Date range is empty")
+        logging.info(f"[{stage}] Running {start.date()}..{last} in one container")
+        extra_args = ["--concurrency", str(workers)] if stage == "ingestors" else []
+        rc = run_range(
+            start.date().strftime("%Y-%m-%d"),
+            last.strftime("%Y-%m-%d"),
+            stage,
+            env_file=env_file,
+            version=version,
+            series_id=series_id,
+            extra_args=extra_args,
+        )
+        if rc != 0:
+            raise SystemExit(rc)
+        return
+
     delta = timedelta(days=1)
     current = start.date()
     end_date = end.date()
@@ -0,0 +1 @@
+"""Helpers shared across pipeline stages (no CLI commands live here)."""
@@ -0,0 +1,76 @@
+"""BigQuery readers that stay in Arrow.
+
+Query results are downloaded through the BigQuery Storage Read API, which
+streams Arrow record batches over several parallel read streams, instead of
+paging JSON rows through the REST API. Conversion to pandas avoids creating a
+Python object per value: strings and dates become ArrowDtype (or Categorical)
+columns, and null-free numeric columns become NumPy arrays that share Arrow's
+buffers.
+"""
+
+import os
+
+import pandas as pd
+import pyarrow as pa
+from google.cloud import bigquery
+
+PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT", "macrocontext")
+
+
+def query_arrow(
+    sql: str,
+    query_parameters: list | None = None,
+    *,
+    project: str = PROJECT_ID,
+) -> pa.Table:
+    """Run `sql` and fetch the result as an Arrow table via the Storage Read API.
+
+    Small results that fit in the first REST page skip the Storage API.
+    """
+    bq = bigquery.Client(project=project)
+    try:
+        job = bq.query(
+            sql, job_config=bigquery.QueryJobConfig(query_parameters=query_parameters or [])
+        )
+        return job.result().to_arrow(create_bqstorage_client=True)
+    finally:
+        bq.close()
+
+
+def _arrow_types(data_type: pa.DataType) -> pd.ArrowDtype | None:
+    if (
+        pa.types.is_string(data_type)
+        or pa.types.is_large_string(data_type)
+        or pa.types.is_date(data_type)
+    ):
+        return pd.ArrowDtype(data_type)
+    return None
+
+
+def to_dataframe(
+    table: pa.Table, *, dictionary_columns: tuple[str, ...] = ()
+) -> pd.DataFrame:
+    """Arrow table to pandas without per-value Python objects.
+
+    `dictionary_columns` (e.g. a ticker repeated on every row) become
+    Categoricals; other string and date columns stay Arrow-backed.
+    """
+    for name in dictionary_columns:
+        i = table.schema.get_field_index(name)
+        table = table.set_column(i, name, table.column(name).dictionary_encode())
+    return table.to_pandas(
+        types_mapper=_arrow_types, split_blocks=True, self_destruct=True
+    )
+
+
+def query_dataframe(
+    sql: str,
+    query_parameters: list | None = None,
+    *,
+    project: str = PROJECT_ID,
+    dictionary_columns: tuple[str, ...] = (),
+) -> pd.DataFrame:
+    return to_dataframe(
+        query_arrow(sql, query_parameters, project=project),
+        dictionary_columns=dictionary_columns,
+    )
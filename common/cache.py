@@ -0,0 +1,110 @@
+"""Content-addressed cache of computed frames.
+
+An entry is a Parquet file named by a fingerprint of everything the result
+depends on: a digest of the inputs (row hashes, or the ETags of the files they
+were read from), the date range and the parameters. Any upstream change yields
+a new key instead of a stale hit, so entries never need invalidating. The cache
+directory is any fsspec URL (a local path or `gs://bucket/prefix/`); once it
+grows past `max_bytes`, least-recently-used entries are deleted.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from datetime import UTC, datetime
+
+import fsspec
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from common import parquet
+
+MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(1 << 30)))
+
+
+def fingerprint(*parts) -> str:
+    """SHA-256 of JSON-serialisable `parts` (dates and other values via `str`)."""
+    payload = json.dumps(parts, default=str, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def frame_digest(df: pd.DataFrame) -> str:
+    """Digest of a frame's column names and row values, independent of its index."""
+    h = hashlib.sha256(",".join(map(str, df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def file_digest(paths: list[str]) -> str:
+    """Digest of local files' contents, e.g. the modules that compute a result."""
+    h = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def _entry_path(root: str, key: str) -> str:
+    return f"{root.rstrip('/')}/{key[:2]}/{key}.parquet"
+
+
+def _touch(fs: fsspec.AbstractFileSystem, path: str) -> None:
+    if hasattr(fs, "setxattrs"):
+        # GCS objects cannot be re-timestamped; a metadata update bumps `updated`.
+        fs.setxattrs(path, last_used=datetime.now(UTC).isoformat())
+    else:
+        fs.touch(path, truncate=False)
+
+
+def _mtime(info: dict) -> float:
+    mtime = info.get("mtime") or info.get("updated") or 0
+    return mtime.timestamp() if isinstance(mtime, datetime) else float(mtime)
+
+
+def load(url: str, key: str) -> pd.DataFrame | None:
+    """Cached frame for `key`, or None on a miss. A hit counts as a use for LRU."""
+    fs, root = fsspec.core.url_to_fs(url)
+    path = _entry_path(root, key)
+    try:
+        with fs.open(path, "rb") as f:
+            table = pq.read_table(f)
+    except FileNotFoundError:
+        return None
+    try:
+        _touch(fs, path)
+    except (OSError, NotImplementedError) as e:
+        logging.warning(f"Could not mark cache entry {path} as used: {e}")
+    return table.to_pandas()
+
+
+def store(url: str, key: str, df: pd.DataFrame, *, max_bytes: int = MAX_BYTES) -> None:
+    """Write `df` under `key`, then evict least-recently-used entries over `max_bytes`."""
+    fs, root = fsspec.core.url_to_fs(url)
+    path = _entry_path(root, key)
+    fs.makedirs(fs._parent(path), exist_ok=True)
+    fs.pipe_file(
+        path, parquet.to_parquet_bytes(pa.Table.from_pandas(df, preserve_index=False))
+    )
+    _evict(fs, root, max_bytes, keep=path)
+
+
+def _evict(fs: fsspec.AbstractFileSystem, root: str, max_bytes: int, *, keep: str) -> None:
+    entries = [
+        info
+        for info in fs.find(root, detail=True).values()
+        if info["name"].endswith(".parquet")
+    ]
+    total = sum(info["size"] for info in entries)
+    for info in sorted(entries, key=_mtime):
+        if total <= max_bytes:
+            break
+        if fs._strip_protocol(info["name"]) == fs._strip_protocol(keep):
+            continue
+        try:
+            fs.rm_file(info["name"])
+        except FileNotFoundError:
+            pass  # Evicted concurrently by another run.
+        total -= info["size"]
+        logging.info(f"Evicted cache entry {info['name']} ({info['size']} bytes)")
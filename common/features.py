@@ -0,0 +1,605 @@
+"""Vectorized per-symbol rolling features with a declarative registry.
+
+Rows sorted by (symbol, date) are laid out as a (symbols x positions) matrix,
+one left-aligned row per symbol padded with NaN, so every feature is a handful
+of whole-array NumPy operations instead of a Python callback per symbol.
+Windows count rows (trading days), like `Series.rolling(n)`.
+
+Features are named `<kind>_<window>`; FEATURE_KINDS declares, per kind, the
+series it runs over, the intermediates it shares with other features, the
+trailing history it needs to resume from a checkpoint and its warm-up:
+
+    sma_50         simple moving average of close
+    ema_20         exponential moving average (alpha = 2 / (window + 1))
+    std_20         rolling standard deviation of close
+    volatility_20  rolling std of 1-day returns, annualised (x sqrt(252))
+    rsi_14         Wilder's relative strength index
+    max_252        rolling max of close        min_252  rolling min of close
+    drawdown_252   close / rolling max - 1
+    return_1       close / close n rows earlier - 1
+
+Only requested features are computed. Prefix sums, returns and rolling
+maxima are computed once per request and shared, e.g. sma_50, sma_200 and
+std_20 all read the same cumulative sums of close, and drawdown_252 reuses
+max_252. Each feature is NaN until its warm-up is met unless `min_periods`
+overrides it.
+"""
+
+import multiprocessing
+import os
+import re
+import tempfile
+import zlib
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+FEATURE_PATTERN = re.compile(r"^([a-z]+)_(\d+)$")
+DEFAULT_FEATURES = (
+    "sma_50",
+    "sma_200",
+    "ema_20",
+    "volatility_20",
+    "rsi_14",
+    "drawdown_252",
+    "return_1",
+)
+TRADING_DAYS = 252
+# Calendar days added to a derived lookback to cover exchange holidays.
+LOOKBACK_SLACK_DAYS = 10
+
+
+def parse_feature(name: str) -> tuple[str, int]:
+    m = FEATURE_PATTERN.match(name)
+    if not m or m.group(1) not in FEATURE_KINDS or int(m.group(2)) < 1:
+        raise ValueError(
+            f"Unknown feature {name!r}; expected <kind>_<window> with kind in "
+            f"{', '.join(sorted(FEATURE_KINDS))}"
+        )
+    return m.group(1), int(m.group(2))
+
+
+def group_layout(symbols: np.ndarray) -> tuple[np.ndarray, np.ndarray, int, int]:
+    """Matrix coordinates for rows sorted by symbol.
+
+    Returns (row -> symbol index, row -> position within symbol, n_symbols,
+    longest symbol history).
+    """
+    n = len(symbols)
+    if n == 0:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64), 0, 0
+    starts = np.flatnonzero(np.r_[True, symbols[1:] != symbols[:-1]])
+    lengths = np.diff(np.r_[starts, n])
+    group = np.repeat(np.arange(len(starts)), lengths)
+    pos = np.arange(n) - starts[group]
+    return group, pos, len(starts), int(lengths.max())
+
+
+def to_matrix(
+    values: np.ndarray, group: np.ndarray, pos: np.ndarray, shape: tuple[int, int]
+) -> np.ndarray:
+    m = np.full(shape, np.nan)
+    m[group, pos] = values
+    return m
+
+
+def _window_sums(m: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray]:
+    """Rolling sum of non-NaN values and their count along axis 1."""
+    valid = ~np.isnan(m)
+    c = np.zeros((m.shape[0], m.shape[1] + 1))
+    np.cumsum(np.where(valid, m, 0.0), axis=1, out=c[:, 1:])
+    k = np.zeros_like(c)
+    np.cumsum(valid, axis=1, out=k[:, 1:])
+    end = np.arange(1, m.shape[1] + 1)
+    start = np.maximum(end - window, 0)
+    return c[:, end] - c[:, start], k[:, end] - k[:, start]
+
+
+def rolling_mean(m: np.ndarray, window: int, min_periods: int | None = None) -> np.ndarray:
+    s, n = _window_sums(m, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = s / n
+    out[n < (window if min_periods is None else min_periods)] = np.nan
+    return out
+
+
+def _rolling_extreme(m: np.ndarray, window: int, op: np.ufunc, fill: float) -> np.ndarray:
+    """Rolling max/min along axis 1 in O(n) (van Herk / Gil-Werman).
+
+    Each row is front-padded with `window - 1` neutral values so windows never
+    reach into another symbol, then split into blocks of `window`; the
+    extreme of any window is op(suffix-scan of its first block, prefix-scan
+    of its last block).
+    """
+    g, length = m.shape
+    total = length + window - 1
+    blocks = -(-total // window)
+    padded = np.full((g, blocks * window), fill)
+    padded[:, window - 1 : total] = np.where(np.isnan(m), fill, m)
+    b = padded.reshape(g, blocks, window)
+    prefix = op.accumulate(b, axis=2).reshape(g, blocks * window)
+    suffix = op.accumulate(b[:, :, ::-1], axis=2)[:, :, ::-1].reshape(g, blocks * window)
+    start = np.arange(length)
+    out = op(suffix[:, start], prefix[:, start + window - 1])
+    _, n = _window_sums(m, window)
+    out[n < window] = np.nan
+    return out
+
+
+def rolling_max(m: np.ndarray, window: int) -> np.ndarray:
+    return _rolling_extreme(m, window, np.maximum, -np.inf)
+
+
+def rolling_min(m: np.ndarray, window: int) -> np.ndarray:
+    return _rolling_extreme(m, window, np.minimum, np.inf)
+
+
+def ewm(m: np.ndarray, alpha: float, init: np.ndarray | None = None) -> np.ndarray:
+    """Recursive exponential average along axis 1 (pandas `adjust=False`).
+
+    Loops over positions, vectorised across symbols, so cost is one NumPy
+    op per row of history. NaNs carry the previous value forward. `init`
+    seeds the value before position 0 (NaN = start from the first value).
+    """
+    out = np.empty_like(m)
+    prev = np.full(m.shape[0], np.nan) if init is None else init.astype(float).copy()
+    for t in range(m.shape[1]):
+        x = m[:, t]
+        prev = np.where(
+            np.isnan(x), prev, np.where(np.isnan(prev), x, alpha * x + (1 - alpha) * prev)
+        )
+        out[:, t] = prev
+    return out
+
+
+def _last(out: np.ndarray, init: np.ndarray) -> np.ndarray:
+    return out[:, -1] if out.shape[1] else init
+
+
+def _valid_count(m: np.ndarray) -> np.ndarray:
+    return np.cumsum(~np.isnan(m), axis=1)
+
+
+def shift(m: np.ndarray, periods: int) -> np.ndarray:
+    out = np.full_like(m, np.nan)
+    out[:, periods:] = m[:, :-periods]
+    return out
+
+
+def returns(m: np.ndarray, periods: int = 1) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return m / shift(m, periods) - 1
+
+
+class _Intermediates:
+    """Lazily computed arrays shared by the features of one `advance` call.
+
+    `m` holds `h` history columns followed by the new rows; results cover
+    the new columns only.
+    """
+
+    def __init__(
+        self,
+        m: np.ndarray,
+        h: int,
+        init: dict[str, np.ndarray],
+        n_before: np.ndarray,
+        min_periods: dict[str, int],
+    ):
+        self.m, self.h, self.init, self.min_periods = m, h, init, min_periods
+        self.seen = n_before[:, None] + _valid_count(m[:, h:])
+        self._cache: dict[tuple, object] = {}
+
+    def _cached(self, key: tuple, fn: Callable[[], object]):
+        if key not in self._cache:
+            self._cache[key] = fn()
+        return self._cache[key]
+
+    def series(self, name: str) -> np.ndarray:
+        if name == "close":
+            return self.m
+        if name == "return_1":
+            return self._cached(("series", name), lambda: returns(self.m))
+        raise KeyError(name)
+
+    def _prefix(self, name: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Cumulative sums (x, x^2, count) of a series, shifted per symbol for precision."""
+
+        def build():
+            x = self.series(name)
+            first = x[np.arange(x.shape[0]), np.argmax(~np.isnan(x), axis=1)][:, None]
+            x = x - np.where(np.isnan(first), 0.0, first)
+            valid = ~np.isnan(x)
+            x = np.where(valid, x, 0.0)
+            sums = []
+            for v in (x, x * x, valid):
+                c = np.zeros((x.shape[0], x.shape[1] + 1))
+                np.cumsum(v, axis=1, out=c[:, 1:])
+                sums.append(c)
+            return first, *sums
+
+        return self._cached(("prefix", name), build)
+
+    def window_stats(self, name: str, window: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Rolling (mean, sample variance, count) of a series over the new columns."""
+
+        def build():
+            first, c1, c2, k = self._prefix(name)
+            end = np.arange(self.h + 1, self.m.shape[1] + 1)
+            start = np.maximum(end - window, 0)
+            s1, s2, n = c1[:, end] - c1[:, start], c2[:, end] - c2[:, start], k[:, end] - k[:, start]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = s1 / n + np.where(np.isnan(first), 0.0, first)
+                var = np.maximum((s2 - s1 * s1 / n) / (n - 1), 0.0)
+            return mean, var, n
+
+        return self._cached(("window", name, window), build)
+
+    def rolling_max(self, window: int) -> np.ndarray:
+        return self._cached(("max", window), lambda: rolling_max(self.m, window)[:, self.h :])
+
+    def rolling_min(self, window: int) -> np.ndarray:
+        return self._cached(("min", window), lambda: rolling_min(self.m, window)[:, self.h :])
+
+
+def _sma(ctx: _Intermediates, name: str, window: int):
+    mean, _, n = ctx.window_stats("close", window)
+    out = mean.copy()
+    out[n < ctx.min_periods.get(name, window)] = np.nan
+    return out, {}
+
+
+def _std(ctx: _Intermediates, name: str, window: int, series: str = "close", scale: float = 1.0):
+    _, var, n = ctx.window_stats(series, window)
+    out = np.sqrt(var) * scale
+    out[n < max(2, ctx.min_periods.get(name, window))] = np.nan
+    return out, {}
+
+
+def _volatility(ctx: _Intermediates, name: str, window: int):
+    return _std(ctx, name, window, "return_1", np.sqrt(TRADING_DAYS))
+
+
+def _ema(ctx: _Intermediates, name: str, window: int):
+    init = ctx.init[f"{name}__ema"]
+    out = ewm(ctx.m[:, ctx.h :], 2 / (window + 1), init)
+    state = {f"{name}__ema": _last(out, init).copy()}
+    out[ctx.seen < ctx.min_periods.get(name, window)] = np.nan
+    return out, state
+
+
+def _rsi(ctx: _Intermediates, name: str, window: int):
+    diff = (ctx.m - shift(ctx.m, 1))[:, ctx.h :]
+    missing = np.isnan(diff)
+    gain_init, loss_init = ctx.init[f"{name}__gain"], ctx.init[f"{name}__loss"]
+    gain = ewm(np.where(missing, np.nan, np.maximum(diff, 0.0)), 1 / window, gain_init)
+    loss = ewm(np.where(missing, np.nan, np.maximum(-diff, 0.0)), 1 / window, loss_init)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = 100 - 100 / (1 + gain / loss)
+    out[(loss == 0) & ~np.isnan(gain)] = 100.0
+    out[ctx.seen - 1 < ctx.min_periods.get(name, window)] = np.nan
+    return out, {
+        f"{name}__gain": _last(gain, gain_init),
+        f"{name}__loss": _last(loss, loss_init),
+    }
+
+
+def _max(ctx: _Intermediates, name: str, window: int):
+    return ctx.rolling_max(window), {}
+
+
+def _min(ctx: _Intermediates, name: str, window: int):
+    return ctx.rolling_min(window), {}
+
+
+def _drawdown(ctx: _Intermediates, name: str, window: int):
+    return ctx.m[:, ctx.h :] / ctx.rolling_max(window) - 1, {}
+
+
+def _return(ctx: _Intermediates, name: str, window: int):
+    if window == 1:
+        return ctx.series("return_1")[:, ctx.h :], {}
+    return returns(ctx.m, window)[:, ctx.h :], {}
+
+
+# Per kind: `compute(ctx, name, window) -> (values, recurrent state)`,
+# `history(window)` trailing closes needed to resume from a checkpoint,
+# `warmup(window)` rows before the first value, and the recurrent `state`
+# suffixes saved in checkpoints.
+FEATURE_KINDS = {
+    "sma": {"compute": _sma, "history": lambda w: w, "warmup": lambda w: w, "state": ()},
+    "ema": {"compute": _ema, "history": lambda w: 1, "warmup": lambda w: w, "state": ("ema",)},
+    "std": {"compute": _std, "history": lambda w: w, "warmup": lambda w: w, "state": ()},
+    "volatility": {
+        "compute": _volatility,
+        "history": lambda w: w + 1,
+        "warmup": lambda w: w + 1,
+        "state": (),
+    },
+    "rsi": {
+        "compute": _rsi,
+        "history": lambda w: 1,
+        "warmup": lambda w: w + 1,
+        "state": ("gain", "loss"),
+    },
+    "max": {"compute": _max, "history": lambda w: w, "warmup": lambda w: w, "state": ()},
+    "min": {"compute": _min, "history": lambda w: w, "warmup": lambda w: w, "state": ()},
+    "drawdown": {"compute": _drawdown, "history": lambda w: w, "warmup": lambda w: w, "state": ()},
+    "return": {"compute": _return, "history": lambda w: w + 1, "warmup": lambda w: w + 1, "state": ()},
+}
+
+
+def _kind(name: str) -> tuple[dict, int]:
+    kind, window = parse_feature(name)
+    return FEATURE_KINDS[kind], window
+
+
+def history_length(features: tuple[str, ...] | list[str]) -> int:
+    """Trailing closes per symbol needed to continue `features` from a checkpoint."""
+    return max([1, *(spec["history"](w) for spec, w in map(_kind, features))])
+
+
+def warmup_rows(features: tuple[str, ...] | list[str]) -> int:
+    """Rows of history before every feature in `features` is computed over a full window."""
+    return max([1, *(spec["warmup"](w) for spec, w in map(_kind, features))])
+
+
+def lookback_days(features: tuple[str, ...] | list[str]) -> int:
+    """Calendar days of history to read so every feature is warm on the first output day."""
+    return -(-warmup_rows(features) * 365 // TRADING_DAYS) + LOOKBACK_SLACK_DAYS
+
+
+def _recurrent_columns(name: str) -> tuple[str, ...]:
+    spec, _ = _kind(name)
+    return tuple(f"{name}__{suffix}" for suffix in spec["state"])
+
+
+def empty_state(features: tuple[str, ...] | list[str]) -> pd.DataFrame:
+    """Checkpoint for symbols with no history.
+
+    One row per symbol: last trade date, observations seen, the trailing
+    closes (`history`, oldest first) and the EMA/RSI recurrences.
+    """
+    columns = ["symbol", "last_date", "n_obs", "history"]
+    for name in features:
+        columns.extend(_recurrent_columns(name))
+    return pd.DataFrame({c: pd.Series(dtype=object) for c in columns})
+
+
+def advance(
+    state: pd.DataFrame,
+    df: pd.DataFrame,
+    features: tuple[str, ...] | list[str] = DEFAULT_FEATURES,
+    *,
+    symbol_col: str = "symbol",
+    date_col: str = "trade_date",
+    value_col: str = "close",
+    min_periods: dict[str, int] | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Compute `features` for the rows of `df`, continuing from checkpoint `state`.
+
+    `df` must be sorted by symbol then date and hold only dates after each
+    symbol's `last_date`. Starting from `empty_state` is a full recompute.
+    Cost is O(symbols x (history + new rows)) regardless of how far back the
+    checkpoint reaches. Returns (`df` with feature columns, next checkpoint).
+    """
+    for name in features:
+        parse_feature(name)
+    h = history_length(features)
+
+    # Group on integer codes when the symbol column is Categorical; only the
+    # distinct symbols are ever materialised as strings.
+    keys = df[symbol_col]
+    is_categorical = isinstance(keys.dtype, pd.CategoricalDtype)
+    local_group, pos, _, width = group_layout(
+        keys.cat.codes.to_numpy() if is_categorical else keys.to_numpy()
+    )
+    starts = np.flatnonzero(pos == 0)
+    new_symbols = keys.iloc[starts].to_numpy(dtype=object)
+    symbols = np.union1d(state["symbol"].to_numpy(dtype=object), new_symbols)
+    n_groups = len(symbols)
+    old_idx = np.searchsorted(symbols, state["symbol"].to_numpy(dtype=object))
+
+    # History, right-aligned so the newest close sits just before the new rows.
+    hist = np.full((n_groups, h), np.nan)
+    lengths = np.fromiter((min(len(x), h) for x in state["history"]), int, len(state))
+    if lengths.sum():
+        flat = np.concatenate([np.asarray(x, dtype=float)[len(x) - n:] for x, n in zip(state["history"], lengths)])
+        rows = np.repeat(old_idx, lengths)
+        offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        hist[rows, h - np.repeat(lengths, lengths) + np.arange(len(flat)) - offsets] = flat
+
+    n_before = np.zeros(n_groups)
+    n_before[old_idx] = state["n_obs"].to_numpy(dtype=float)
+    init = {}
+    for name in features:
+        for col in _recurrent_columns(name):
+            init[col] = np.full(n_groups, np.nan)
+            init[col][old_idx] = state[col].to_numpy(dtype=float)
+
+    group = np.searchsorted(symbols, new_symbols)[local_group]
+    closes = df[value_col].to_numpy(dtype="float64")
+    m = np.hstack([hist, to_matrix(closes, group, pos, (n_groups, width))])
+
+    ctx = _Intermediates(m, h, init, n_before, min_periods or {})
+    out = df.copy()
+    recurrent: dict[str, np.ndarray] = {}
+    for name in features:
+        spec, window = _kind(name)
+        values, st = spec["compute"](ctx, name, window)
+        out[name] = values[group, pos]
+        recurrent.update(st)
+
+    # Next checkpoint: the last `h` valid closes of history + new rows per symbol.
+    valid = ~np.isnan(m)
+    rank = valid.sum(axis=1, keepdims=True) - np.cumsum(valid, axis=1)
+    keep = valid & (rank < h)
+    counts = keep.sum(axis=1)
+    flat = m[keep]
+    last_date = np.full(n_groups, None, dtype=object)
+    last_date[old_idx] = state["last_date"].to_numpy(dtype=object)
+    if len(df):
+        last = np.r_[starts[1:] - 1, len(df) - 1]
+        last_date[group[last]] = df[date_col].iloc[last].to_numpy(dtype=object)
+    next_state = pd.DataFrame(
+        {
+            "symbol": symbols,
+            "last_date": last_date,
+            "n_obs": (n_before + np.bincount(group, minlength=n_groups)).astype("int64"),
+            "history": np.split(flat, np.cumsum(counts)[:-1]) if n_groups else [],
+            **recurrent,
+        }
+    )
+    return out, next_state
+
+
+def compute_features(
+    df: pd.DataFrame,
+    features: tuple[str, ...] | list[str] = DEFAULT_FEATURES,
+    *,
+    symbol_col: str = "symbol",
+    date_col: str = "trade_date",
+    value_col: str = "close",
+    min_periods: dict[str, int] | None = None,
+) -> pd.DataFrame:
+    """Add `features` as columns to `df`, which must be sorted by symbol then date."""
+    out, _ = advance(
+        empty_state(features),
+        df,
+        features,
+        symbol_col=symbol_col,
+        date_col=date_col,
+        value_col=value_col,
+        min_periods=min_periods,
+    )
+    return out
+
+
+def shard_of(symbols: pd.Series, n_shards: int) -> np.ndarray:
+    """Stable shard per row: crc32 of the symbol modulo `n_shards`."""
+    if not isinstance(symbols.dtype, pd.CategoricalDtype):
+        symbols = symbols.astype("category")
+    buckets = np.fromiter(
+        (zlib.crc32(str(c).encode()) % n_shards for c in symbols.cat.categories),
+        np.int64,
+        len(symbols.cat.categories),
+    )
+    return buckets[symbols.cat.codes.to_numpy()]
+
+
+def _write_ipc(df: pd.DataFrame, path: str) -> str:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return path
+
+
+def _read_ipc(path: str) -> pa.Table:
+    """Memory-map an Arrow IPC file; its columns point into the page cache."""
+    return pa.ipc.open_file(pa.memory_map(path)).read_all()
+
+
+def _advance_shard(
+    shard: int,
+    state_path: str,
+    rows_path: str,
+    features: tuple[str, ...],
+    min_periods: dict[str, int] | None,
+    shard_writer: Callable[[int, pd.DataFrame], None] | None,
+) -> tuple[str | None, str]:
+    """Worker: advance one shard, reading and writing Arrow IPC files by path."""
+    out, next_state = advance(
+        _read_ipc(state_path).to_pandas(),
+        _read_ipc(rows_path).to_pandas(),
+        features,
+        min_periods=min_periods,
+    )
+    workdir = os.path.dirname(rows_path)
+    state_out = _write_ipc(next_state, os.path.join(workdir, f"state_out_{shard}.arrow"))
+    if shard_writer is not None:
+        shard_writer(shard, out.drop(columns="_row"))
+        return None, state_out
+    features_out = os.path.join(workdir, f"features_out_{shard}.arrow")
+    return _write_ipc(out[["_row", *features]], features_out), state_out
+
+
+def advance_parallel(
+    state: pd.DataFrame,
+    df: pd.DataFrame,
+    features: tuple[str, ...] | list[str] = DEFAULT_FEATURES,
+    *,
+    workers: int,
+    shard_writer: Callable[[int, pd.DataFrame], None] | None = None,
+    symbol_col: str = "symbol",
+    date_col: str = "trade_date",
+    value_col: str = "close",
+    min_periods: dict[str, int] | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """`advance` with symbols hash-sharded across `workers` processes.
+
+    Shards travel to and from workers as Arrow IPC files in a temporary
+    directory, memory-mapped on read; only their paths are pickled. Feature
+    columns are scattered back into `df` row order and
+    the per-shard checkpoints are merged in symbol order, so the result
+    matches `advance`. With `shard_writer` (a picklable callable taking the
+    shard number and its rows), each worker writes its own output instead
+    and the returned frame has no feature columns.
+    """
+    features = tuple(features)
+    if workers <= 1:
+        out, next_state = advance(
+            state,
+            df,
+            features,
+            symbol_col=symbol_col,
+            date_col=date_col,
+            value_col=value_col,
+            min_periods=min_periods,
+        )
+        if shard_writer is not None:
+            shard_writer(0, out)
+            return df, next_state
+        return out, next_state
+
+    rows = df[[symbol_col, date_col, value_col]].rename(
+        columns={symbol_col: "symbol", date_col: "trade_date", value_col: "close"}
+    )
+    rows["_row"] = np.arange(len(rows))
+    row_shard = shard_of(rows["symbol"], workers)
+    state_shard = shard_of(state["symbol"].astype(str), workers) if len(state) else np.zeros(0, int)
+
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory(prefix="features-") as workdir:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            futures = [
+                pool.submit(
+                    _advance_shard,
+                    k,
+                    _write_ipc(state[state_shard == k], os.path.join(workdir, f"state_{k}.arrow")),
+                    _write_ipc(rows[row_shard == k], os.path.join(workdir, f"rows_{k}.arrow")),
+                    features,
+                    min_periods,
+                    shard_writer,
+                )
+                for k in range(workers)
+            ]
+            results = [f.result() for f in futures]
+
+        out = df.copy() if shard_writer is None else df
+        if shard_writer is None:
+            columns = {name: np.full(len(df), np.nan) for name in features}
+            for features_path, _ in results:
+                part = _read_ipc(features_path)
+                row_ids = part.column("_row").to_numpy()
+                for name in features:
+                    columns[name][row_ids] = part.column(name).to_numpy()
+            for name in features:
+                out[name] = columns[name]
+        next_state = pd.concat(
+            [_read_ipc(state_path).to_pandas() for _, state_path in results],
+            ignore_index=True,
+        ).sort_values("symbol", ignore_index=True)
+    return out, next_state
@@ -0,0 +1,21 @@
+"""Google Cloud Storage client helpers."""
+
+import google.auth
+from google.auth.transport.requests import AuthorizedSession
+from google.cloud import storage
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
+
+
+def pooled_storage_client(pool_size: int = 10) -> storage.Client:
+    """`storage.Client` whose HTTP connection pool fits `pool_size` concurrent requests.
+
+    The default pool keeps 10 connections; threads beyond that open and drop
+    a fresh TLS connection per request. The client is given its own
+    authorized session with a larger pool instead.
+    """
+    if pool_size <= DEFAULT_POOLSIZE:
+        return storage.Client()
+    credentials, _ = google.auth.default(scopes=storage.Client.SCOPE)
+    session = AuthorizedSession(credentials)
+    session.mount("https://", HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+    return storage.Client(credentials=credentials, _http=session)
@@ -0,0 +1,133 @@
+"""Direct Parquet reads from the lake, without a BigQuery job.
+
+Paths are fsspec URLs (`gs://bucket/prefix/` through gcsfs, or a local
+directory). Hive partition directories (`key=value/`) are pruned from the
+file listing before any file is opened, and row filters are pushed down to
+Parquet row-group statistics, so reading a few symbols only fetches the footers
+and the row groups that can hold them.
+"""
+
+import bisect
+from datetime import date
+
+import fsspec
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+
+def open_dataset(url: str, partition_keys: dict[str, pa.DataType]) -> ds.FileSystemDataset:
+    """Parquet dataset under `url` with hive partition keys typed by `partition_keys`.
+
+    Only the listing is read here; files are opened when scanned.
+    """
+    fs, path = fsspec.core.url_to_fs(url)
+    return ds.dataset(
+        path,
+        filesystem=fs,
+        format="parquet",
+        partitioning=ds.partitioning(
+            pa.schema(list(partition_keys.items())), flavor="hive"
+        ),
+    )
+
+
+def _partition_value(fragment: ds.ParquetFileFragment, key: str):
+    return ds.get_partition_keys(fragment.partition_expression).get(key)
+
+
+def _min_value(fragment: ds.ParquetFileFragment, column: str):
+    """Smallest `column` value in the file from row-group statistics (None if absent)."""
+    fragment.ensure_complete_metadata()
+    mins = []
+    for row_group in fragment.row_groups:
+        stats = (row_group.statistics or {}).get(column)
+        if not stats or stats.get("min") is None:
+            return None
+        mins.append(stats["min"])
+    return min(mins) if mins else None
+
+
+def covering_snapshots(
+    dataset: ds.FileSystemDataset,
+    *,
+    snapshot_key: str,
+    date_column: str,
+    start: date,
+    end: date,
+    partition_filter: pc.Expression | None = None,
+) -> ds.FileSystemDataset:
+    """Newest snapshot partitions that together hold `date_column` from `start` to `end`.
+
+    For layouts where each `snapshot_key=` partition (e.g. `as_of=`) holds a
+    trailing window of rows: starts from the newest snapshot on or before `end`
+    and steps back to older ones, using each file's earliest `date_column`
+    (from row-group statistics), until `start` is covered. Snapshots before
+    `start` cannot hold rows in range and are never candidates.
+    """
+    snapshot = ds.field(snapshot_key)
+    expr = (snapshot >= pa.scalar(start)) & (snapshot <= pa.scalar(end))
+    if partition_filter is not None:
+        expr = expr & partition_filter
+
+    by_snapshot: dict = {}
+    for fragment in dataset.get_fragments(filter=expr):
+        by_snapshot.setdefault(_partition_value(fragment, snapshot_key), []).append(
+            fragment
+        )
+
+    keys = sorted(by_snapshot)
+    selected, covered_from = [], None
+    i = len(keys) - 1
+    while i >= 0:
+        fragments = by_snapshot[keys[i]]
+        selected.extend(fragments)
+        earliest = [_min_value(f, date_column) for f in fragments]
+        if any(m is None for m in earliest):
+            # No statistics: coverage unknown, step to the next older snapshot.
+            i -= 1
+            continue
+        covered_from = min(earliest if covered_from is None else [covered_from, *earliest])
+        if covered_from <= start:
+            break
+        # Jump to the oldest snapshot still reaching `covered_from`, skipping the
+        # overlapping ones in between.
+        j = bisect.bisect_left(keys, covered_from)
+        i = j if j < i else i - 1
+    return ds.FileSystemDataset(
+        selected,
+        schema=dataset.schema,
+        format=dataset.format,
+        filesystem=dataset.filesystem,
+    )
+
+
+def partitions_between(
+    dataset: ds.FileSystemDataset,
+    *,
+    key: str,
+    start: date,
+    end: date,
+    partition_filter: pc.Expression | None = None,
+) -> ds.FileSystemDataset:
+    """Files whose `key=` partition (e.g. `trade_date=`) falls in `start`..`end`.
+
+    For layouts with one partition per date, where no file covers another's rows.
+    """
+    field = ds.field(key)
+    expr = (field >= pa.scalar(start)) & (field <= pa.scalar(end))
+    if partition_filter is not None:
+        expr = expr & partition_filter
+    return ds.FileSystemDataset(
+        list(dataset.get_fragments(filter=expr)),
+        schema=dataset.schema,
+        format=dataset.format,
+        filesystem=dataset.filesystem,
+    )
+
+
+def file_keys(dataset: ds.FileSystemDataset) -> list[str]:
+    """`path:size:mtime` per file, which changes whenever a file is rewritten
+    (GCS reports the object's last update time)."""
+    infos = dataset.filesystem.get_file_info(dataset.files)
+    return [f"{i.path}:{i.size}:{i.mtime_ns}" for i in infos]
@@ -0,0 +1,107 @@
+"""Parquet writer settings shared by every stage that writes to the lake.
+
+Files are sorted, carry column statistics and a page index, and declare their
+sort order in row-group metadata so BigQuery external tables and pyarrow
+readers can skip row groups and pages that cannot match a filter.
+"""
+
+import os
+from collections.abc import Sequence
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+COMPRESSION = os.getenv("PARQUET_COMPRESSION", "snappy")
+ROW_GROUP_ROWS = int(os.getenv("PARQUET_ROW_GROUP_ROWS", str(128 * 1024)))
+DATA_PAGE_SIZE = 1 << 20
+
+
+def writer_options(
+    schema: pa.Schema,
+    *,
+    sort_by: Sequence[str] = (),
+    dictionary_columns: Sequence[str] = (),
+) -> dict:
+    """Keyword arguments for `pq.ParquetWriter` / `pq.write_table`."""
+    return {
+        "compression": COMPRESSION,
+        "use_dictionary": list(dictionary_columns) if dictionary_columns else True,
+        "write_statistics": True,
+        "write_page_index": True,
+        "data_page_size": DATA_PAGE_SIZE,
+        "sorting_columns": (
+            pq.SortingColumn.from_ordering(schema, [(c, "ascending") for c in sort_by])
+            if sort_by
+            else None
+        ),
+    }
+
+
+def open_writer(
+    sink,
+    schema: pa.Schema,
+    *,
+    sort_by: Sequence[str] = (),
+    dictionary_columns: Sequence[str] = (),
+) -> pq.ParquetWriter:
+    """ParquetWriter for streaming writes; callers must sort each batch by `sort_by`."""
+    return pq.ParquetWriter(
+        sink,
+        schema,
+        **writer_options(schema, sort_by=sort_by, dictionary_columns=dictionary_columns),
+    )
+
+
+def sort_table(table: pa.Table | pa.RecordBatch, sort_by: Sequence[str]):
+    """Sort by `sort_by` (ascending); dictionary columns sort by their values."""
+    if not sort_by:
+        return table
+    keys = {}
+    for c in sort_by:
+        col = table.column(c)
+        if pa.types.is_dictionary(col.type):
+            col = pc.cast(col, col.type.value_type)
+        keys[c] = col
+    keys = pa.table(keys) if isinstance(table, pa.Table) else pa.record_batch(keys)
+    indices = pc.sort_indices(keys, sort_keys=[(c, "ascending") for c in sort_by])
+    return table.take(indices)
+
+
+def write_table(
+    table: pa.Table,
+    where,
+    *,
+    sort_by: Sequence[str] = (),
+    dictionary_columns: Sequence[str] = (),
+    row_group_size: int = ROW_GROUP_ROWS,
+) -> None:
+    """Sort `table` by `sort_by` and write it to a path or file-like `where`."""
+    table = sort_table(table, sort_by)
+    pq.write_table(
+        table,
+        where,
+        row_group_size=row_group_size,
+        **writer_options(
+            table.schema, sort_by=sort_by, dictionary_columns=dictionary_columns
+        ),
+    )
+
+
+def to_parquet_bytes(
+    table: pa.Table,
+    *,
+    sort_by: Sequence[str] = (),
+    dictionary_columns: Sequence[str] = (),
+    row_group_size: int = ROW_GROUP_ROWS,
+) -> bytes:
+    """Same as `write_table`, returned as bytes for `Blob.upload_from_string`."""
+    buf = pa.BufferOutputStream()
+    write_table(
+        table,
+        buf,
+        sort_by=sort_by,
+        dictionary_columns=dictionary_columns,
+        row_group_size=row_group_size,
+    )
+    return buf.getvalue().to_pybytes()
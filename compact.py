@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""Roll daily bronze/silver partitions up into monthly or yearly Parquet files.
+
+Compacted files live under `compacted/` in the same bucket, one per period:
+
+    gs://<bucket>/compacted/<dataset prefix>period=2024-01/<dataset>-2024-01.parquet
+
+The daily partition key (e.g. `issued_date`) is materialised as a column so the
+BigQuery views in infra/ can union compacted and daily data. Those views prefer
+a date's daily file whenever one exists (a source not yet deleted, or a
+re-ingest after compaction), so compacted rows show only for dates whose daily
+files `--delete-sources` removed, and a date is never served twice.
+infra/compaction.tf runs this monthly for the closed month.
+A manifest per period (outside the external-table roots) records the source
+objects and generations that went into each compacted file.
+
+`--conform-only` instead rewrites daily files written before the dataset had a
+declared schema (e.g. Massive `window_start` as INT64 and plain-string
+`ticker`, FRED `date` as a timestamp) in place, so external tables over the
+daily files see a single schema.
+"""
+
+import io
+import json
+import logging
+import os
+import re
+from datetime import date, datetime
+
+import click
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from google.api_core.exceptions import NotFound, PreconditionFailed
+from google.cloud import storage
+
+from common import parquet
+
+PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT", "macrocontext")
+COMPACTED_PREFIX = "compacted"
+MANIFEST_PREFIX = "_manifests/compaction"
+
+
+def _conform_massive(table: pa.Table, series: str) -> pa.Table:
+    # Older daily files were written with pandas-inferred types.
+    from ingestors import massive
+
+    return massive._conform(table, massive.BRONZE_SCHEMAS.get(series))
+
+
+def _conform_fred(table: pa.Table, series: str) -> pa.Table:
+    # Older daily files were written by pandas, with `date` as timestamp[ns].
+    from ingestors import fred
+
+    schema = fred.BRONZE_SCHEMA
+    return pa.Table.from_arrays(
+        [pc.cast(table.column(f.name), f.type) for f in schema], schema=schema
+    )
+
+
+# `compact` is False for datasets that only support --conform-only.
+DATASET_CONFIG = {
+    "bronze_massive": {
+        "bucket": os.getenv("BRONZE_BUCKET", f"{PROJECT_ID}-bronze"),
+        "prefix": "provider=massive/series={series}/frequency={frequency}/",
+        "date_key": "issued_date",
+        "sort_by": ("ticker", "window_start"),
+        "dictionary_columns": ("ticker",),
+        "conform": _conform_massive,
+        "compact": True,
+    },
+    # Every FRED series and frequency at once: a conform pass is a one-off
+    # migration, and FRED bronze is too small to need compaction.
+    "bronze_fred": {
+        "bucket": os.getenv("BRONZE_BUCKET", f"{PROJECT_ID}-bronze"),
+        "prefix": "provider=fred/",
+        "date_key": "issued_date",
+        "sort_by": ("date",),
+        "dictionary_columns": (),
+        "conform": _conform_fred,
+        "compact": False,
+    },
+    "silver_gold_to_spx": {
+        "bucket": os.getenv("SILVER_BUCKET", f"{PROJECT_ID}-silver"),
+        "prefix": "indicator=gold_to_spx/frequency={frequency}/",
+        "date_key": "as_of",
+        "sort_by": ("dt",),
+        "dictionary_columns": (),
+        "conform": None,
+        "compact": True,
+    },
+}
+
+
+def _period_of(d: date, period: str) -> str:
+    return f"{d.year}" if period == "year" else f"{d.year}-{d.month:02}"
+
+
+def _period_closed(key: str, today: date) -> bool:
+    """A period is closed once today falls after it; open periods are never compacted."""
+    if len(key) == 4:
+        return today.year > int(key)
+    year, month = map(int, key.split("-"))
+    return (today.year, today.month) > (year, month)
+
+
+def _list_daily_sources(
+    client: storage.Client, bucket: str, prefix: str, date_key: str
+) -> dict[date, storage.Blob]:
+    """Latest daily Parquet object per partition date under `prefix`.
+
+    Reruns may leave several objects for one date (e.g. bronze `ingest_date=`
+    sub-partitions); the lexicographically last path wins.
+    """
+    pattern = re.compile(rf"(?:^|/){date_key}=(\d{{4}}-\d{{2}}-\d{{2}})/")
+    latest: dict[date, storage.Blob] = {}
+    for blob in client.list_blobs(bucket, prefix=prefix):
+        if not blob.name.endswith(".parquet"):
+            continue
+        m = pattern.search(blob.name)
+        if not m:
+            continue
+        d = datetime.strptime(m.group(1), "%Y-%m-%d").date()
+        if d not in latest or blob.name > latest[d].name:
+            latest[d] = blob
+    return latest
+
+
+def _read_parquet(blob: storage.Blob) -> pa.Table:
+    return pq.read_table(io.BytesIO(blob.download_as_bytes()))
+
+
+def _conform_daily(
+    client: storage.Client,
+    dataset: str,
+    config: dict,
+    prefix: str,
+    *,
+    series: str,
+    start: date | None,
+    end: date | None,
+    dry_run: bool,
+) -> None:
+    """Rewrite every daily file under `prefix` whose schema differs from the declared one.
+
+    Unlike compaction this covers all objects for a date (older `ingest_date=`
+    copies included), since the external table reads them all.
+    """
+    date_key = config["date_key"]
+    pattern = re.compile(rf"(?:^|/){date_key}=(\d{{4}}-\d{{2}}-\d{{2}})/")
+    rewritten = 0
+    for blob in client.list_blobs(config["bucket"], prefix=prefix):
+        m = pattern.search(blob.name)
+        if not blob.name.endswith(".parquet") or not m:
+            continue
+        d = datetime.strptime(m.group(1), "%Y-%m-%d").date()
+        if (start and d < start) or (end and d > end):
+            continue
+        table = _read_parquet(blob)
+        conformed = config["conform"](table, series)
+        if conformed.schema.remove_metadata().equals(table.schema.remove_metadata()):
+            continue
+        logging.info(f"[{dataset}] {blob.name}: rewriting to the declared schema")
+        if dry_run:
+            continue
+        sort_by = tuple(c for c in config["sort_by"] if c in conformed.schema.names)
+        try:
+            # Generation match: never overwrite a file re-ingested since it was read.
+            blob.upload_from_string(
+                parquet.to_parquet_bytes(
+                    conformed,
+                    sort_by=sort_by,
+                    dictionary_columns=config["dictionary_columns"],
+                ),
+                content_type="application/octet-stream",
+                if_generation_match=blob.generation,
+            )
+            rewritten += 1
+        except PreconditionFailed:
+            logging.warning(f"[{dataset}] Kept {blob.name} (changed since it was read)")
+    logging.info(f"[{dataset}] Rewrote {rewritten} daily files")
+
+
+def _compact_period(
+    client: storage.Client,
+    dataset: str,
+    config: dict,
+    prefix: str,
+    period_key: str,
+    sources: dict[date, storage.Blob],
+    *,
+    series: str,
+    delete_sources: bool,
+    dry_run: bool,
+) -> None:
+    bucket = client.bucket(config["bucket"])
+    date_key = config["date_key"]
+    period_dir = f"{prefix}period={period_key}/"
+    out_blob = bucket.blob(
+        f"{COMPACTED_PREFIX}/{period_dir}{dataset}-{period_key}.parquet"
+    )
+    manifest_blob = bucket.blob(f"{MANIFEST_PREFIX}/{period_dir}manifest.json")
+
+    source_list = [
+        {"name": sources[d].name, "generation": sources[d].generation, date_key: d.isoformat()}
+        for d in sorted(sources)
+    ]
+    try:
+        manifest = json.loads(manifest_blob.download_as_bytes())
+    except NotFound:
+        manifest = None
+    if manifest and all(s in manifest["sources"] for s in source_list):
+        logging.info(f"[{dataset}] {period_key}: up to date ({len(source_list)} sources)")
+        # Compacted by an earlier run that kept its sources.
+        if delete_sources and not dry_run:
+            _delete_sources(dataset, sources)
+        return
+
+    logging.info(f"[{dataset}] {period_key}: compacting {len(source_list)} daily files")
+    if dry_run:
+        return
+
+    tables = []
+    for d in sorted(sources):
+        t = _read_parquet(sources[d])
+        if config["conform"] is not None:
+            t = config["conform"](t, series)
+        t = t.append_column(date_key, pa.array([d] * t.num_rows, type=pa.date32()))
+        tables.append(t)
+
+    # Fold in an earlier compaction of this period (its daily sources may be gone);
+    # dates present in the new daily sources replace its rows.
+    out_generation = 0
+    try:
+        out_blob.reload()
+        out_generation = out_blob.generation
+        previous = _read_parquet(out_blob)
+        keep = pc.invert(
+            pc.is_in(
+                previous.column(date_key),
+                value_set=pa.array(sorted(sources), type=pa.date32()),
+            )
+        )
+        previous = previous.filter(keep)
+        if previous.num_rows:
+            tables.insert(0, previous)
+    except NotFound:
+        pass
+
+    table = pa.concat_tables(tables, promote_options="permissive")
+    sort_by = tuple(c for c in (*config["sort_by"], date_key) if c in table.schema.names)
+    data = parquet.to_parquet_bytes(
+        table, sort_by=sort_by, dictionary_columns=config["dictionary_columns"]
+    )
+    try:
+        # Single-object write: readers see either the old or the new compacted file.
+        out_blob.upload_from_string(
+            data,
+            content_type="application/octet-stream",
+            if_generation_match=out_generation,
+        )
+    except PreconditionFailed:
+        raise SystemExit(
+            f"[{dataset}] {period_key}: compacted file changed concurrently; rerun"
+        )
+
+    manifest_sources = (manifest["sources"] if manifest else []) + [
+        s for s in source_list if not manifest or s not in manifest["sources"]
+    ]
+    manifest_blob.upload_from_string(
+        json.dumps(
+            {
+                "dataset": dataset,
+                "period": period_key,
+                "output": out_blob.name,
+                "output_generation": out_blob.generation,
+                "rows": table.num_rows,
+                "sources": manifest_sources,
+                "compacted_at": datetime.now().isoformat(timespec="seconds"),
+            },
+            indent=2,
+        ),
+        content_type="application/json",
+    )
+    logging.info(
+        f"[{dataset}] {period_key}: wrote {table.num_rows} rows to "
+        f"gs://{config['bucket']}/{out_blob.name}"
+    )
+
+    if delete_sources:
+        _delete_sources(dataset, sources)
+
+
+def _delete_sources(dataset: str, sources: dict[date, storage.Blob]) -> None:
+    for d in sorted(sources):
+        try:
+            # Generation match: never delete a daily file rewritten since it was read.
+            sources[d].delete(if_generation_match=sources[d].generation)
+        except (NotFound, PreconditionFailed):
+            logging.warning(f"[{dataset}] Kept {sources[d].name} (changed or gone)")
+
+
+def run(
+    *,
+    dataset: str,
+    period: str = "month",
+    series: str = "us_stocks_sip",
+    frequency: str = "daily",
+    start: date | None = None,
+    end: date | None = None,
+    delete_sources: bool = False,
+    conform_only: bool = False,
+    dry_run: bool = False,
+) -> None:
+    config = DATASET_CONFIG[dataset]
+    prefix = config["prefix"].format(series=series, frequency=frequency)
+    today = datetime.now().date()
+    if conform_only and config["conform"] is None:
+        raise SystemExit(f"{dataset} has no declared schema to conform to")
+    if not conform_only and not config["compact"]:
+        raise SystemExit(f"{dataset} is not compacted; use --conform-only")
+
+    client = storage.Client()
+    try:
+        if conform_only:
+            _conform_daily(
+                client,
+                dataset,
+                config,
+                prefix,
+                series=series,
+                start=start,
+                end=end,
+                dry_run=dry_run,
+            )
+            return
+        sources = _list_daily_sources(client, config["bucket"], prefix, config["date_key"])
+        by_period: dict[str, dict[date, storage.Blob]] = {}
+        for d, blob in sources.items():
+            if (start and d < start) or (end and d > end):
+                continue
+            by_period.setdefault(_period_of(d, period), {})[d] = blob
+
+        for key in sorted(by_period):
+            if not _period_closed(key, today):
+                logging.info(f"[{dataset}] {key}: period still open, skipping")
+                continue
+            _compact_period(
+                client,
+                dataset,
+                config,
+                prefix,
+                key,
+                by_period[key],
+                series=series,
+                delete_sources=delete_sources,
+                dry_run=dry_run,
+            )
+    finally:
+        client.close()
+
+
+@click.command()
+@click.option(
+    "--dataset",
+    type=click.Choice(sorted(DATASET_CONFIG)),
+    required=True,
+    help="Dataset to compact.",
+)
+@click.option(
+    "--period",
+    type=click.Choice(["month", "year"]),
+    default="month",
+    help="Roll-up granularity. Default: month.",
+)
+@click.option(
+    "--series",
+    default="us_stocks_sip",
+    envvar="SERIES",
+    help="Series (bronze datasets only). Default: us_stocks_sip.",
+)
+@click.option(
+    "--frequency",
+    default="daily",
+    help="Frequency partition to compact. Default: daily.",
+)
+@click.option(
+    "--start",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="Only daily partitions on or after this date (YYYY-MM-DD).",
+)
+@click.option(
+    "--end",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="Only daily partitions on or before this date (YYYY-MM-DD).",
+)
+@click.option(
+    "--delete-sources/--keep-sources",
+    default=False,
+    help="Delete daily files once their period is compacted. Default: keep.",
+)
+@click.option(
+    "--conform-only",
+    is_flag=True,
+    default=False,
+    help="Rewrite daily files to the declared schema in place instead of compacting.",
+)
+@click.option("--dry-run", is_flag=True, default=False, help="List what would be compacted.")
+def cli(
+    dataset: str,
+    period: str,
+    series: str,
+    frequency: str,
+    start: datetime | None,
+    end: datetime | None,
+    delete_sources: bool,
+    conform_only: bool,
+    dry_run: bool,
+) -> None:
+    """Compact daily partitions into monthly/yearly Parquet files."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
+    run(
+        dataset=dataset,
+        period=period,
+        series=series,
+        frequency=frequency,
+        start=start.date() if start else None,
+        end=end.date() if end else None,
+        delete_sources=delete_sources,
+        conform_only=conform_only,
+        dry_run=dry_run,
+    )
@@ -0,0 +1,263 @@
+"""Price-ratio indicators for many base/quote pairs at once.
+
+Every symbol is read once and pivoted into a single (dates x symbols) price
+matrix. Each pair is a column gather (base / quote), and SMAs, trend and run
+ids are computed across all pairs together, so cost grows with the number of
+symbols and dates, not with pairs x queries.
+
+`advance_ratios` continues from a per-pair checkpoint (SMA history, current
+trend, run id and run start), so a daily run only processes the new day. A
+run's id is its start date (YYYYMMDD). A recompute only sees the runs inside
+its window, so its first run starts at the window edge; given `seeds` (an
+earlier checkpoint whose date falls inside the window) that run takes the
+recorded start instead, and ids match the incremental path.
+"""
+
+import logging
+import re
+
+import numpy as np
+import pandas as pd
+
+from common import features as feature_engine
+
+TREND_FEATURES = ("sma_50", "sma_200")
+OUTPUT_COLUMNS = [
+    "dt",
+    "indicator",
+    "base_symbol",
+    "quote_symbol",
+    "base_close",
+    "quote_close",
+    "value",
+    "inverse_value",
+    "sma_50",
+    "sma_200",
+    "trend",
+    "trend_run_id",
+]
+# Per-pair trend run carried in the checkpoint next to the SMA history.
+TREND_STATE_COLUMNS = ("trend", "trend_run_id", "run_start")
+PAIR_PATTERN = re.compile(r"^([a-z0-9_]+)=([^/\s]+)/([^/\s]+)$")
+
+
+def parse_pairs(spec: str) -> list[tuple[str, str, str]]:
+    """`gold_to_spx=GLD/SPY,tlt_to_spx=TLT/SPY` -> [(indicator, base, quote), ...]."""
+    pairs = []
+    for item in (p.strip() for p in spec.split(",")):
+        if not item:
+            continue
+        m = PAIR_PATTERN.match(item)
+        if not m:
+            raise ValueError(f"Bad pair {item!r}; expected <indicator>=<BASE>/<QUOTE>")
+        pairs.append(m.groups())
+    if len({p[0] for p in pairs}) != len(pairs):
+        raise ValueError(f"Duplicate indicator names in {spec!r}")
+    return pairs
+
+
+def symbols_of(pairs: list[tuple[str, str, str]]) -> list[str]:
+    return sorted({s for _, base, quote in pairs for s in (base, quote)})
+
+
+def price_matrix(prices: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(dates, symbols, dates x symbols closes) from long `symbol, dt, close` rows.
+
+    Duplicate (dt, symbol) rows keep the last one, like `pivot_table(aggfunc="last")`.
+    """
+    dt_codes, dates = pd.factorize(prices["dt"], sort=True)
+    sym_codes, symbols = pd.factorize(prices["symbol"], sort=True)
+    matrix = np.full((len(dates), len(symbols)), np.nan)
+    matrix[dt_codes, sym_codes] = prices["close"].to_numpy(dtype="float64")
+    return np.asarray(dates, dtype=object), np.asarray(symbols, dtype=object), matrix
+
+
+def empty_state() -> pd.DataFrame:
+    """Checkpoint for pairs with no history.
+
+    One row per pair (`symbol` holds the indicator name): the SMA inputs kept
+    by `features.empty_state`, plus the current trend, its run id and the
+    date that run started.
+    """
+    state = feature_engine.empty_state(TREND_FEATURES)
+    for col in TREND_STATE_COLUMNS:
+        state[col] = pd.Series(dtype=object)
+    return state
+
+
+def advance_ratios(
+    state: pd.DataFrame,
+    prices: pd.DataFrame,
+    pairs: list[tuple[str, str, str]],
+    seeds: pd.DataFrame | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Ratio, SMA50/SMA200, trend and trend run id per pair and date, from `state`.
+
+    Each pair runs over the dates on which its base or quote traded, after
+    the pair's checkpoint date. Rows before SMA200 is available are dropped
+    and do not start runs. A symbol absent from `prices` is treated like a
+    day it did not trade: its pairs get rows only where the other leg traded
+    (with a NaN ratio, as in a longer run), or none, keeping their
+    checkpoint. Only every symbol being absent is an error.
+
+    `seeds` (checkpoint rows: `symbol`, `last_date`, `trend`, `run_start`)
+    continue the runs of pairs starting from `state` without one: see
+    `_seed_first_runs`. Returns (OUTPUT_COLUMNS sorted by indicator then dt,
+    next checkpoint).
+    """
+    dates, symbols, matrix = price_matrix(prices)
+    required = symbols_of(pairs)
+    missing = sorted(set(required) - set(symbols))
+    if len(missing) == len(required):
+        raise SystemExit(f"Missing required symbols {missing}. Found: {list(symbols)}")
+    if missing:
+        affected = [name for name, b, q in pairs if b in missing or q in missing]
+        logging.warning(f"No prices for {missing}; affects {', '.join(affected)}")
+
+    # Absent symbols gather an all-NaN column.
+    matrix = np.column_stack([matrix, np.full(len(dates), np.nan)])
+    col = {s: i for i, s in enumerate(symbols)}
+    names = np.array([p[0] for p in pairs], dtype=object)
+    base = matrix[:, [col.get(p[1], len(symbols)) for p in pairs]]
+    quote = matrix[:, [col.get(p[2], len(symbols)) for p in pairs]]
+
+    # Long layout, pair-major: one row per pair and date either leg traded,
+    # after the pair's checkpoint.
+    prev = state.set_index("symbol")
+    traded = (~np.isnan(base) | ~np.isnan(quote)).T
+    for p, name in enumerate(names):
+        if name in prev.index and pd.notna(prev.at[name, "last_date"]):
+            traded[p] &= dates > prev.at[name, "last_date"]
+    pair_idx, t_idx = np.nonzero(traded)
+    base_close = base[t_idx, pair_idx]
+    quote_close = quote[t_idx, pair_idx]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        value = base_close / quote_close
+        inverse_value = quote_close / base_close
+
+    long = pd.DataFrame(
+        {
+            "symbol": pd.Categorical.from_codes(pair_idx, categories=names),
+            "dt": dates[t_idx],
+            "close": value,
+        }
+    )
+    sma, next_state = feature_engine.advance(
+        state.drop(columns=list(TREND_STATE_COLUMNS)),
+        long,
+        TREND_FEATURES,
+        date_col="dt",
+    )
+    sma_50 = sma["sma_50"].to_numpy()
+    sma_200 = sma["sma_200"].to_numpy()
+
+    # Runs only span rows with both SMAs' windows available.
+    keep = ~np.isnan(sma_200)
+    p, dt = pair_idx[keep], long["dt"].to_numpy(dtype=object)[keep]
+    up = ~np.isnan(sma_50[keep]) & (sma_50[keep] >= sma_200[keep])
+
+    last = prev.reindex(names)
+    prev_trend = last["trend"].to_numpy(dtype=object)
+    prev_start = last["run_start"].to_numpy(dtype=object)
+
+    first = np.r_[True, p[1:] != p[:-1]] if len(p) else np.zeros(0, bool)
+    starts_run = np.where(
+        first,
+        pd.isna(prev_trend[p]) | (up != (prev_trend[p] == "up")),
+        np.r_[True, up[1:] != up[:-1]] if len(p) else first,
+    )
+    anchor = np.maximum.accumulate(np.where(starts_run | first, np.arange(len(p)), 0))
+    run_start = np.where(starts_run[anchor], dt[anchor], prev_start[p])
+    if seeds is not None and len(p):
+        fresh = pd.isna(prev_trend[p])
+        run_start = _seed_first_runs(names, p, dt, up, fresh, run_start, seeds)
+    run_id = _run_ids(run_start)
+
+    out = pd.DataFrame(
+        {
+            "dt": dt,
+            "indicator": names[p],
+            "base_symbol": np.array([x[1] for x in pairs], dtype=object)[p],
+            "quote_symbol": np.array([x[2] for x in pairs], dtype=object)[p],
+            "base_close": base_close[keep],
+            "quote_close": quote_close[keep],
+            "value": value[keep],
+            "inverse_value": inverse_value[keep],
+            "sma_50": sma_50[keep],
+            "sma_200": sma_200[keep],
+            "trend": np.where(up, "up", "down"),
+            "trend_run_id": run_id.astype("int64"),
+        }
+    )[OUTPUT_COLUMNS]
+
+    # Carry each pair's trend run forward; pairs without new rows keep theirs.
+    trend = prev.reindex(next_state["symbol"])[list(TREND_STATE_COLUMNS)]
+    trend = trend.astype(object).reset_index(drop=True)
+    if len(p):
+        ends = np.r_[np.flatnonzero(first)[1:] - 1, len(p) - 1]
+        at = np.searchsorted(next_state["symbol"].to_numpy(dtype=object), names[p[ends]])
+        trend.loc[at, "trend"] = out["trend"].to_numpy(dtype=object)[ends]
+        trend.loc[at, "trend_run_id"] = run_id[ends]
+        trend.loc[at, "run_start"] = run_start[ends]
+    for c in TREND_STATE_COLUMNS:
+        next_state[c] = trend[c].to_numpy(dtype=object)
+    return out, next_state
+
+
+def _seed_first_runs(
+    names: np.ndarray,
+    p: np.ndarray,
+    dt: np.ndarray,
+    up: np.ndarray,
+    fresh: np.ndarray,
+    run_start: np.ndarray,
+    seeds: pd.DataFrame,
+) -> np.ndarray:
+    """Replace the start of each fresh pair's first run with its seed's.
+
+    A pair without a checkpoint starts its first run on its first row, which
+    for a windowed recompute is just the window edge. If the seed's
+    `last_date` falls inside that first run with the seed's trend, the run
+    is the one the seed recorded, so it keeps the recorded `run_start`.
+    """
+    seeds = seeds.set_index("symbol")
+    run_start = run_start.copy()
+    bounds = np.r_[np.flatnonzero(np.r_[True, p[1:] != p[:-1]]), len(p)]
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        name = names[p[a]]
+        if not fresh[a] or name not in seeds.index:
+            continue
+        seed = seeds.loc[name]
+        if pd.isna(seed["run_start"]) or pd.isna(seed["last_date"]):
+            continue
+        in_first = run_start[a:b] == run_start[a]
+        on_seed_day = pd.to_datetime(dt[a:b]) == pd.Timestamp(seed["last_date"])
+        hit = np.flatnonzero(in_first & on_seed_day)
+        if (
+            hit.size
+            and up[a + hit[0]] == (seed["trend"] == "up")
+            and pd.Timestamp(seed["run_start"]) < pd.Timestamp(run_start[a])
+        ):
+            run_start[a:b][in_first] = seed["run_start"]
+    return run_start
+
+
+def _run_ids(run_start: np.ndarray) -> np.ndarray:
+    """Run start dates as YYYYMMDD integers."""
+    ts = pd.to_datetime(pd.Series(run_start, dtype=object))
+    return (ts.dt.year * 10000 + ts.dt.month * 100 + ts.dt.day).to_numpy(dtype="int64")
+
+
+def compute_ratios(
+    prices: pd.DataFrame,
+    pairs: list[tuple[str, str, str]],
+    seeds: pd.DataFrame | None = None,
+) -> pd.DataFrame:
+    """Ratio, SMA50/SMA200, trend and trend run id per pair and date.
+
+    A full recompute: `advance_ratios` from `empty_state`, so each pair's
+    first run starts on its first row with SMA200 available unless `seeds`
+    place it.
+    """
+    out, _ = advance_ratios(empty_state(), prices, pairs, seeds)
+    return out
@@ -1,4 +1,7 @@
+import hashlib
+import io
 import os
+import re
 from datetime import date, datetime, timedelta
 import logging
 
@@ -6,17 +9,36 @@ import click
 import gcsfs
 import pandas as pd
 import pyarrow as pa
+import pyarrow.dataset as ds
 import pyarrow.parquet as pq
 from google.cloud import bigquery
 
+from common import bq, cache, lake
+from common import features as feature_engine
+from indicators import ratios
+
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
 PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT", "macrocontext")
 SILVER_DATA_LAKE = os.getenv("SILVER_DATA_LAKE", "silver_lake")
-SILVER_BQ_TABLE = os.getenv("SILVER_BQ_TABLE", "silver_us_stocks_sip_ext")
 SILVER_BUCKET = os.getenv("SILVER_BUCKET", f"{PROJECT_ID}-silver")
+# Layout stock_features_daily writes (its SILVER_LAYOUT): as_of snapshots, or
+# trade_date partitions under stock_features/ once migrated to them.
+SILVER_LAYOUT = os.getenv("SILVER_LAYOUT", "as_of")
+SILVER_BQ_TABLE = os.getenv(
+    "SILVER_BQ_TABLE",
+    "silver_us_stocks_sip_features" if SILVER_LAYOUT == "trade_date" else "silver_us_stocks_sip_ext",
+)
+# "lake" reads the processor's Parquet directly instead of querying BigQuery.
+SILVER_SOURCE = os.getenv("SILVER_SOURCE", "bigquery")
+SILVER_LAKE_ROOT = os.getenv(
+    "SILVER_LAKE_ROOT",
+    f"gs://{SILVER_BUCKET}/stock_features/series=us_stocks_sip/"
+    if SILVER_LAYOUT == "trade_date"
+    else f"gs://{SILVER_BUCKET}/series=us_stocks_sip/",
+)
 
 SYMBOL_GOLD = os.getenv("SYMBOL_GOLD", "GLD")
 SYMBOL_SPX = os.getenv("SYMBOL_SPX", "SPY")
@@ -25,14 +47,44 @@ DT_COL = os.getenv("DT_COL", "trade_date")
 SYMBOL_COL = os.getenv("SYMBOL_COL", "symbol")
 CLOSE_COL = os.getenv("CLOSE_COL", "close")
 
-LOOKBACK_DAYS = int(os.getenv("LOOKBACK_DAYS", "420"))
+# Comma-separated <indicator>=<BASE>/<QUOTE> pairs, e.g. add copper_to_gold=CPER/GLD.
+RATIO_PAIRS = os.getenv("RATIO_PAIRS", f"gold_to_spx={SYMBOL_GOLD}/{SYMBOL_SPX}")
+# Silver column names predating multi-pair support.
+LEGACY_COLUMNS = {"gold_to_spx": {"base_close": "gold_close", "quote_close": "spx_close"}}
+
+# fsspec URL (local dir or gs://) of the indicator result cache; unset disables it.
+INDICATOR_CACHE = os.getenv("INDICATOR_CACHE")
+
+# Incremental runs resume from the latest per-pair checkpoint this recent.
+MAX_GAP_DAYS = int(os.getenv("MAX_GAP_DAYS", "7"))
+STATE_PREFIX = "_state/indicator=spx_gold_daily/frequency=daily"
+
+# Unset: derived from the SMA windows' warm-up (see common/features.py).
+LOOKBACK_DAYS = int(os.getenv("LOOKBACK_DAYS")) if os.getenv("LOOKBACK_DAYS") else None
 
 
 def run(
     *,
     end_dt: date | None = None,
-    lookback_days: int = LOOKBACK_DAYS,
-) -> None:
+    start_dt: date | None = None,
+    lookback_days: int | None = LOOKBACK_DAYS,
+    pairs: list[tuple[str, str, str]] | None = None,
+    source: str = SILVER_SOURCE,
+    cache_url: str | None = INDICATOR_CACHE,
+    incremental: bool = False,
+    max_gap_days: int = MAX_GAP_DAYS,
+) -> pd.DataFrame:
+    """Write indicators as of `end_dt`, or for every day in `start_dt`..`end_dt`.
+
+    A range is one query (from `start_dt - lookback_days`) and one
+    computation; every day's partitions are then uploaded in a single batch.
+    With `incremental`, only days after the latest checkpoint are read and
+    trend run ids continue from it. A full recompute reads back to the
+    latest older checkpoint instead and continues the runs it recorded. With `cache_url`, a rerun on unchanged
+    inputs reuses the stored result. Returns the rows written.
+    """
+    if pairs is None:
+        pairs = ratios.parse_pairs(RATIO_PAIRS)
     if end_dt is None:
         rd = os.environ.get("REPORT_DATE")
         end_dt = (
@@ -41,125 +93,353 @@ def run(
             else datetime.now().date()
         )
 
-    raw = _pull_daily_prices(end_dt, lookback_days)
-    indicator_df = _calculate_gold_to_spx(raw)
-    _write_indicator(indicator_df, end_dt)
-
+    if lookback_days is None:
+        lookback_days = feature_engine.lookback_days(ratios.TREND_FEATURES)
 
-def _pull_daily_prices(end_dt: date, lookback_days: int) -> pd.DataFrame:
-    start_dt = end_dt - timedelta(days=lookback_days)
-    bq = bigquery.Client(project=PROJECT_ID)
+    fs = gcsfs.GCSFileSystem()
     try:
-        sql = f"""
-        SELECT
-          {SYMBOL_COL} AS symbol,
-          SAFE_CAST({DT_COL} AS DATE) AS dt,
-          SAFE_CAST({CLOSE_COL} AS FLOAT64) AS close
-        FROM `{PROJECT_ID}`.`{SILVER_DATA_LAKE}`.`{SILVER_BQ_TABLE}`
-        WHERE {SYMBOL_COL} IN UNNEST(@symbols)
-          AND frequency IN ('daily', 'Daily')
-          AND SAFE_CAST({DT_COL} AS DATE) BETWEEN @start_dt AND @end_dt
-          AND {CLOSE_COL} IS NOT NULL
-        ORDER BY dt, symbol
-        """
-
-        job_config = bigquery.QueryJobConfig(
-            query_parameters=[
-                bigquery.ArrayQueryParameter("symbols", "STRING", [SYMBOL_SPX, SYMBOL_GOLD]),
-                bigquery.ScalarQueryParameter("start_dt", "DATE", start_dt),
-                bigquery.ScalarQueryParameter("end_dt", "DATE", end_dt),
-            ]
+        checkpoint = None
+        if incremental:
+            checkpoint = _load_state(fs, start_dt or end_dt, pairs, max_gap_days)
+        seeds = None
+        if checkpoint is None:
+            read_from = (start_dt or end_dt) - timedelta(days=lookback_days)
+            state, state_digest = ratios.empty_state(), None
+            recorded = _load_run_seeds(fs, start_dt or end_dt, pairs)
+            if recorded is not None:
+                # Read back far enough that the seeds' dates have warm SMAs.
+                seeds, state_digest = recorded
+                oldest = pd.Timestamp(seeds["last_date"].min()).date()
+                seeded_from = oldest - timedelta(days=lookback_days)
+                read_from = min(read_from, seeded_from)
+        else:
+            state_as_of, state, state_digest = checkpoint
+            read_from = state_as_of + timedelta(days=1)
+
+        indicator_df, next_state = _compute_indicators(
+            source, read_from, end_dt, pairs, cache_url, state, state_digest, seeds
         )
-
-        df = bq.query(sql, job_config=job_config).to_dataframe()
-        if df.empty:
-            raise SystemExit(
-                "No rows returned from Silver. Check SILVER_BQ_TABLE / columns / symbols / dates."
-            )
-        return df
+        if start_dt is None:
+            written = _write_indicator(indicator_df, end_dt)
+        else:
+            written = _write_indicator_range(indicator_df, start_dt, end_dt)
+        _store_state(fs, next_state, end_dt, pairs)
     finally:
-        bq.close()
-
-
-def _calculate_gold_to_spx(df: pd.DataFrame) -> pd.DataFrame:
-    wide = (
-        df.pivot_table(index="dt", columns="symbol", values="close", aggfunc="last")
-        .sort_index()
-        .reset_index()
+        fs.close()
+    return written
+
+
+def _pull_daily_prices(start_dt: date, end_dt: date, symbols: list[str]) -> pd.DataFrame:
+    sql = f"""
+    SELECT
+      {SYMBOL_COL} AS symbol,
+      SAFE_CAST({DT_COL} AS DATE) AS dt,
+      SAFE_CAST({CLOSE_COL} AS FLOAT64) AS close
+    FROM `{PROJECT_ID}`.`{SILVER_DATA_LAKE}`.`{SILVER_BQ_TABLE}`
+    WHERE {SYMBOL_COL} IN UNNEST(@symbols)
+      AND frequency IN ('daily', 'Daily')
+      AND SAFE_CAST({DT_COL} AS DATE) BETWEEN @start_dt AND @end_dt
+      AND {CLOSE_COL} IS NOT NULL
+    ORDER BY dt, symbol
+    """
+    df = bq.query_dataframe(
+        sql,
+        [
+            bigquery.ArrayQueryParameter("symbols", "STRING", symbols),
+            bigquery.ScalarQueryParameter("start_dt", "DATE", start_dt),
+            bigquery.ScalarQueryParameter("end_dt", "DATE", end_dt),
+        ],
+        project=PROJECT_ID,
+    )
+    if df.empty:
+        raise SystemExit(
+            "No rows returned from Silver. Check SILVER_BQ_TABLE / columns / symbols / dates."
+        )
+    return df
+
+
+def _compute_indicators(
+    source: str,
+    start_dt: date,
+    end_dt: date,
+    pairs: list[tuple[str, str, str]],
+    cache_url: str | None,
+    state: pd.DataFrame,
+    state_digest: str | None,
+    seeds: pd.DataFrame | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """`advance_ratios` over prices from `start_dt`..`end_dt`, through the cache if set.
+
+    The cache key covers the inputs (silver row digest for BigQuery, file
+    ETags for the lake, which is known before any row is read), the
+    checkpoint (or the run seeds' checkpoint), the range, the pairs and the
+    code computing them, so upstream changes miss. Returns (indicator rows, next checkpoint).
+    """
+    symbols = ratios.symbols_of(pairs)
+    if source == "lake":
+        snapshots = _lake_snapshots(start_dt, end_dt)
+        raw = None
+        inputs = lake.file_keys(snapshots) if cache_url else None
+    else:
+        raw = _pull_daily_prices(start_dt, end_dt, symbols)
+        inputs = cache.frame_digest(raw) if cache_url else None
+
+    key = None
+    if cache_url:
+        code = cache.file_digest([ratios.__file__, feature_engine.__file__])
+        key = cache.fingerprint(
+            source, inputs, state_digest, symbols, start_dt, end_dt, pairs, code
+        )
+        hit = cache.load(cache_url, key)
+        hit_state = cache.load(cache_url, cache.fingerprint(key, "state"))
+        if hit is not None and hit_state is not None:
+            logging.info(f"Indicator cache hit {key[:12]} ({len(hit)} rows)")
+            return hit, hit_state
+
+    if raw is None:
+        raw = _read_lake_prices(snapshots, start_dt, end_dt, symbols)
+    df, next_state = ratios.advance_ratios(state, raw, pairs, seeds)
+    if key is not None:
+        cache.store(cache_url, key, df)
+        cache.store(cache_url, cache.fingerprint(key, "state"), next_state)
+        logging.info(f"Indicator cache stored {key[:12]}")
+    return df, next_state
+
+
+def _state_path(as_of: date) -> str:
+    return f"{SILVER_BUCKET}/{STATE_PREFIX}/as_of={as_of:%Y-%m-%d}/state.parquet"
+
+
+def _pairs_spec(pairs: list[tuple[str, str, str]]) -> str:
+    return ",".join(f"{name}={base}/{quote}" for name, base, quote in pairs)
+
+
+def _checkpoints(fs: gcsfs.GCSFileSystem, before: date) -> dict[date, str]:
+    """Checkpoint paths by as_of date, for dates before `before`."""
+    pattern = re.compile(r"/as_of=(\d{4}-\d{2}-\d{2})/state\.parquet$")
+    candidates = {}
+    for path in fs.glob(f"{SILVER_BUCKET}/{STATE_PREFIX}/as_of=*/state.parquet"):
+        m = pattern.search(path)
+        if m:
+            as_of = datetime.strptime(m.group(1), "%Y-%m-%d").date()
+            if as_of < before:
+                candidates[as_of] = path
+    return candidates
+
+
+def _load_run_seeds(
+    fs: gcsfs.GCSFileSystem, before: date, pairs: list[tuple[str, str, str]]
+) -> tuple[pd.DataFrame, str] | None:
+    """Trend runs recorded in the latest checkpoint before `before`, whatever
+    its age, as (seeds for `ratios.advance_ratios`, digest).
+
+    Only pairs defined the same way as in `pairs` are kept. A full recompute
+    that reads back to the seeds' dates continues their runs, so its run ids
+    match the incremental path's.
+    """
+    candidates = _checkpoints(fs, before)
+    if not candidates:
+        return None
+    data = fs.cat_file(candidates[max(candidates)])
+    table = pq.read_table(io.BytesIO(data))
+    saved = (table.schema.metadata or {}).get(b"pairs", b"").decode()
+    same = set(ratios.parse_pairs(saved)) & set(pairs) if saved else set()
+    seeds = table.to_pandas()
+    seeds = seeds[seeds["symbol"].isin({name for name, _, _ in same})]
+    seeds = seeds[seeds["run_start"].notna()]
+    if seeds.empty:
+        return None
+    return seeds[["symbol", "last_date", "trend", "run_start"]], hashlib.sha256(data).hexdigest()
+
+
+def _load_state(
+    fs: gcsfs.GCSFileSystem,
+    before: date,
+    pairs: list[tuple[str, str, str]],
+    max_gap_days: int,
+) -> tuple[date, pd.DataFrame, str] | None:
+    """Latest checkpoint before `before` as (as_of, state, digest), or None
+    if a full recompute is needed."""
+    candidates = _checkpoints(fs, before)
+    if not candidates:
+        logging.info("No indicator checkpoint found; running a full recompute")
+        return None
+
+    as_of = max(candidates)
+    if (before - as_of).days > max_gap_days:
+        logging.warning(
+            f"Checkpoint {as_of} is more than {max_gap_days} days old; running a full recompute"
+        )
+        return None
+    data = fs.cat_file(candidates[as_of])
+    table = pq.read_table(io.BytesIO(data))
+    saved = (table.schema.metadata or {}).get(b"pairs", b"").decode()
+    if saved != _pairs_spec(pairs):
+        logging.warning(f"Checkpoint {as_of} has pairs [{saved}]; running a full recompute")
+        return None
+    logging.info(f"Resuming from checkpoint {as_of} ({table.num_rows} pairs)")
+    return as_of, table.to_pandas(), hashlib.sha256(data).hexdigest()
+
+
+def _store_state(
+    fs: gcsfs.GCSFileSystem,
+    state: pd.DataFrame,
+    as_of: date,
+    pairs: list[tuple[str, str, str]],
+) -> None:
+    table = pa.Table.from_pandas(state, preserve_index=False)
+    table = table.replace_schema_metadata(
+        {**(table.schema.metadata or {}), b"pairs": _pairs_spec(pairs).encode()}
+    )
+    buf = io.BytesIO()
+    pq.write_table(table, buf)
+    fs.pipe_file(_state_path(as_of), buf.getvalue())
+
+
+def _lake_snapshots(start_dt: date, end_dt: date) -> ds.FileSystemDataset:
+    """Files under SILVER_LAKE_ROOT that hold every trade date in range.
+
+    trade_date layout: the partitions in range. as_of layout: each file holds
+    a trailing window, so only the newest as_of partitions (up to `end_dt`)
+    that reach back to `start_dt` are kept.
+    """
+    daily = ds.field("frequency").isin(["daily", "Daily"])
+    if SILVER_LAYOUT == "trade_date":
+        dataset = lake.open_dataset(
+            SILVER_LAKE_ROOT, {"frequency": pa.string(), DT_COL: pa.date32()}
+        )
+        return lake.partitions_between(
+            dataset, key=DT_COL, start=start_dt, end=end_dt, partition_filter=daily
+        )
+    dataset = lake.open_dataset(
+        SILVER_LAKE_ROOT, {"frequency": pa.string(), "as_of": pa.date32()}
+    )
+    return lake.covering_snapshots(
+        dataset,
+        snapshot_key="as_of",
+        date_column=DT_COL,
+        start=start_dt,
+        end=end_dt,
+        partition_filter=daily,
     )
 
-    if SYMBOL_GOLD not in wide.columns or SYMBOL_SPX not in wide.columns:
-        raise SystemExit(f"Missing required symbols. Found columns: {list(wide.columns)}")
-
-    wide = wide.rename(columns={SYMBOL_GOLD: "gold_close", SYMBOL_SPX: "spx_close"})
-    wide["value"] = wide["gold_close"] / wide["spx_close"]
-    wide["inverse_value"] = wide["spx_close"] / wide["gold_close"]
-
-    wide["sma_50"] = wide["value"].rolling(50, min_periods=50).mean()
-    wide["sma_200"] = wide["value"].rolling(200, min_periods=200).mean()
-
-    wide["trend"] = [
-        "up" if (pd.notna(a) and pd.notna(b) and a >= b) else "down"
-        for a, b in zip(wide["sma_50"], wide["sma_200"])
-    ]
-
-    wide["trend_run_id"] = (wide["trend"] != wide["trend"].shift(1)).cumsum().astype(int)
 
-    wide["indicator"] = "gold_to_spx"
-    wide["base_symbol"] = SYMBOL_GOLD
-    wide["quote_symbol"] = SYMBOL_SPX
+def _read_lake_prices(
+    snapshots: ds.FileSystemDataset, start_dt: date, end_dt: date, symbols: list[str]
+) -> pd.DataFrame:
+    """Same rows as `_pull_daily_prices`, read from `snapshots` without BigQuery.
+
+    The symbol/date filter skips row groups by their statistics. A date found
+    in several as_of snapshots keeps the newest one. In the trade_date layout
+    the date is the partition key, not a file column.
+    """
+    dt = ds.field(DT_COL).cast(pa.date32())
+    # trade_date partitions hold one date each; ordering by it is a no-op there.
+    snapshot = "as_of" if "as_of" in snapshots.schema.names else DT_COL
+    table = snapshots.to_table(
+        columns={
+            "symbol": ds.field(SYMBOL_COL).cast(pa.string()),
+            "dt": dt,
+            "close": ds.field(CLOSE_COL).cast(pa.float64()),
+            "as_of": ds.field(snapshot),
+        },
+        filter=ds.field(SYMBOL_COL).isin(symbols)
+        & (dt >= pa.scalar(start_dt))
+        & (dt <= pa.scalar(end_dt))
+        & ds.field(CLOSE_COL).is_valid(),
+    )
+    df = bq.to_dataframe(
+        table.sort_by([("as_of", "ascending"), ("dt", "ascending"), ("symbol", "ascending")])
+    )
+    if df.empty:
+        raise SystemExit(
+            f"No rows found under {SILVER_LAKE_ROOT}. Check columns / symbols / dates."
+        )
+    df = df.drop_duplicates(["symbol", "dt"], keep="last").drop(columns="as_of")
+    return df.sort_values(["dt", "symbol"], ignore_index=True)
 
-    out = wide[pd.notna(wide["sma_200"])].copy()
 
-    return out[
-        [
-            "dt",
-            "indicator",
-            "base_symbol",
-            "quote_symbol",
-            "gold_close",
-            "spx_close",
-            "value",
-            "inverse_value",
-            "sma_50",
-            "sma_200",
-            "trend",
-            "trend_run_id",
-        ]
-    ]
-
-
-def _gcs_output_path(dt: date) -> str:
-    fname = f"gold_to_spx_{dt.isoformat()}.parquet"
+def _gcs_output_path(dt: date, indicator: str = "gold_to_spx") -> str:
+    fname = f"{indicator}_{dt.isoformat()}.parquet"
     return (
         f"gs://{SILVER_BUCKET}/"
-        f"indicator=gold_to_spx/"
+        f"indicator={indicator}/"
         f"frequency=daily/"
         f"as_of={dt.isoformat()}/"
         f"{fname}"
     )
 
 
-def _write_indicator(df: pd.DataFrame, dt: date) -> None:
-    day = df[df["dt"] == dt].copy()
+def _indicator_files(rows: pd.DataFrame) -> dict[str, bytes]:
+    """Parquet bytes per (dt, indicator) partition for the given indicator rows."""
+    files = {}
+    for (dt, indicator), part in rows.groupby(["dt", "indicator"], sort=True):
+        part = part.rename(columns=LEGACY_COLUMNS.get(indicator, {}))
+        buf = io.BytesIO()
+        pq.write_table(
+            pa.Table.from_pandas(part, preserve_index=False), buf, compression="snappy"
+        )
+        files[_gcs_output_path(dt, indicator)] = buf.getvalue()
+    return files
+
+
+def _upload(files: dict[str, bytes]) -> None:
+    # One filesystem; gcsfs uploads a dict passed to pipe() concurrently.
+    fs = gcsfs.GCSFileSystem()
+    try:
+        fs.pipe(files)
+    finally:
+        fs.close()
+
+
+def _write_indicator(df: pd.DataFrame, dt: date) -> pd.DataFrame:
+    """Write each indicator's row for `dt` to its own silver partition."""
+    day = df[df["dt"] == dt]
+    missing = sorted(set(df["indicator"]) - set(day["indicator"]))
+
+    files = _indicator_files(day)
+    _upload(files)
+    for out_path in files:
+        print("Wrote", out_path)
+    print(day.to_string(index=False))
+
     if day.empty:
         raise SystemExit(
             f"No computed indicator row for dt={dt.isoformat()} "
             "(not enough history or missing prices)."
         )
+    if missing:
+        logging.warning(
+            f"No row for {', '.join(missing)} on dt={dt.isoformat()} "
+            "(not enough history or missing prices)"
+        )
+    return day
 
-    fs = gcsfs.GCSFileSystem()
-    try:
-        out_path = _gcs_output_path(dt)
-        table = pa.Table.from_pandas(day, preserve_index=False)
 
-        with fs.open(out_path, "wb") as f:
-            pq.write_table(table, f, compression="snappy")
+def _write_indicator_range(df: pd.DataFrame, start_dt: date, end_dt: date) -> pd.DataFrame:
+    """Write every indicator partition for trading days in `start_dt`..`end_dt`."""
+    rows = df[(df["dt"] >= start_dt) & (df["dt"] <= end_dt)]
+    if rows.empty:
+        raise SystemExit(
+            f"No computed indicator rows for {start_dt}..{end_dt} "
+            "(not enough history or missing prices)."
+        )
+    files = _indicator_files(rows)
+    logging.info(
+        f"Uploading {len(files)} partitions for {rows['dt'].nunique()} days "
+        f"({start_dt}..{end_dt})"
+    )
+    _upload(files)
+    for indicator, n in rows.groupby("indicator")["dt"].nunique().items():
+        logging.info(f"{indicator}: {n} days written")
+    return rows
 
-        print("Wrote", out_path)
-        print(day.to_string(index=False))
-    finally:
-        fs.close()
+
+def _parse_pairs(_ctx, _param, value: str) -> list[tuple[str, str, str]]:
+    try:
+        return ratios.parse_pairs(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
 
 
 @click.command()
@@ -169,16 +449,79 @@ def _write_indicator(df: pd.DataFrame, dt: date) -> None:
     default=None,
     help="As-of date (YYYY-MM-DD). Default: REPORT_DATE env or today.",
 )
+@click.option(
+    "--start",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="First as-of date of a range (YYYY-MM-DD, inclusive). Requires --end.",
+)
+@click.option(
+    "--end",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="Last as-of date of a range (YYYY-MM-DD, inclusive). Requires --start.",
+)
 @click.option(
     "--lookback-days",
     type=int,
     default=LOOKBACK_DAYS,
-    help=f"Days of history to read. Default: {LOOKBACK_DAYS}",
+    help="Days of history to read. Default: derived from the SMA windows.",
+)
+@click.option(
+    "--pairs",
+    default=RATIO_PAIRS,
+    envvar="RATIO_PAIRS",
+    callback=_parse_pairs,
+    help=f"Comma-separated <indicator>=<BASE>/<QUOTE> ratios. Default: {RATIO_PAIRS}",
+)
+@click.option(
+    "--source",
+    type=click.Choice(["bigquery", "lake"]),
+    default=SILVER_SOURCE,
+    envvar="SILVER_SOURCE",
+    help="Read silver prices via the BigQuery external table or straight from "
+    f"the Parquet files under SILVER_LAKE_ROOT. Default: {SILVER_SOURCE}.",
+)
+@click.option(
+    "--cache-dir",
+    "cache_url",
+    default=INDICATOR_CACHE,
+    envvar="INDICATOR_CACHE",
+    help="Local directory or gs:// URL caching computed indicators by input "
+    "fingerprint (LRU, RESULT_CACHE_MAX_BYTES). Default: off.",
+)
+@click.option(
+    "--incremental/--full-recompute",
+    default=False,
+    envvar="INCREMENTAL",
+    help="Continue SMAs and trend run ids from the previous checkpoint and read "
+    "only new silver days; falls back to a full recompute when the checkpoint is "
+    "missing or stale. Default: full recompute.",
 )
 def cli(
     report_date: datetime | None,
-    lookback_days: int,
+    start: datetime | None,
+    end: datetime | None,
+    lookback_days: int | None,
+    pairs: list[tuple[str, str, str]],
+    source: str,
+    cache_url: str | None,
+    incremental: bool,
 ) -> None:
-    """Compute gold-to-SPX indicator from silver to silver indicator parquet."""
-    end_dt = report_date.date() if report_date else None
-    run(end_dt=end_dt, lookback_days=lookback_days)
+    """Compute price-ratio indicators (default gold-to-SPX) from silver to silver indicator parquet."""
+    if (start is None) != (end is None):
+        raise click.UsageError("Provide both --start and --end")
+    if start is not None and report_date is not None:
+        raise click.UsageError("Use --report-date or --start/--end, not both")
+    if start is not None and start > end:
+        raise click.UsageError("Date range is empty")
+    end_dt = (end or report_date).date() if (end or report_date) else None
+    run(
+        end_dt=end_dt,
+        start_dt=start.date() if start else None,
+        lookback_days=lookback_days,
+        pairs=pairs,
+        source=source,
+        cache_url=cache_url,
+        incremental=incremental,
+    )
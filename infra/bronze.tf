@@ -67,3 +67,95 @@ resource "google_project_iam_member" "biglake_metadata_viewer" {
   role    = "roles/bigquery.metadataViewer"
   member  = "serviceAccount:${google_bigquery_connection.lake_connection.cloud_resource[0].service_account_id}"
 }
+
+# Compacted bronze (see compact.py): one file per series/frequency/period, with
+# issued_date stored as a column.
+# gs://<project>-bronze/compacted/provider=massive/series=.../frequency=daily/period=2024-01/...
+# The schema is declared (ingestors/massive.py BRONZE_SCHEMAS, INT64 volume) since
+# the root is empty until the first compaction; hive keys are still detected.
+resource "google_bigquery_table" "bronze_massive_compacted_ext" {
+  project             = var.project_id
+  dataset_id          = google_bigquery_dataset.bronze_catalog.dataset_id
+  table_id            = "bronze_massive_compacted_ext"
+  deletion_protection = false
+
+  schema = jsonencode([
+    { name = "ticker", type = "STRING" },
+    { name = "volume", type = "INT64" },
+    { name = "open", type = "FLOAT64" },
+    { name = "close", type = "FLOAT64" },
+    { name = "high", type = "FLOAT64" },
+    { name = "low", type = "FLOAT64" },
+    { name = "window_start", type = "TIMESTAMP" },
+    { name = "transactions", type = "INT64" },
+    { name = "issued_date", type = "DATE" },
+  ])
+
+  external_data_configuration {
+    source_format = "PARQUET"
+    autodetect    = false
+    connection_id = google_bigquery_connection.lake_connection.name
+
+    source_uris = [
+      "gs://${google_storage_bucket.bronze.name}/compacted/provider=massive/*"
+    ]
+
+    hive_partitioning_options {
+      mode                     = "AUTO"
+      source_uri_prefix         = "gs://${google_storage_bucket.bronze.name}/compacted/provider=massive/"
+      require_partition_filter = false
+    }
+  }
+}
+
+# Daily + compacted bronze. Per issued_date, a daily file wins over the compacted
+# copy: it is either one of the compaction's own sources (identical rows) or a
+# re-ingest written after the period was compacted. Compacted rows show only for
+# dates whose daily files compact --delete-sources has removed.
+resource "google_bigquery_table" "bronze_massive" {
+  project             = var.project_id
+  dataset_id          = google_bigquery_dataset.bronze_catalog.dataset_id
+  table_id            = "bronze_massive"
+  deletion_protection = false
+
+  view {
+    use_legacy_sql = false
+    query          = <<-SQL
+      SELECT * EXCEPT (series, frequency, period, issued_date), series, frequency, issued_date
+      FROM `${var.project_id}.${google_bigquery_dataset.bronze_catalog.dataset_id}.${google_bigquery_table.bronze_massive_compacted_ext.table_id}` c
+      WHERE NOT EXISTS (
+        SELECT 1
+        FROM `${var.project_id}.${google_bigquery_dataset.bronze_catalog.dataset_id}.${google_bigquery_table.bronze_provider_ext["massive"].table_id}` d
+        WHERE d.issued_date >= DATE '1970-01-01'  -- require_partition_filter
+          AND d.series = c.series
+          AND d.frequency = c.frequency
+          AND d.issued_date = c.issued_date
+      )
+      UNION ALL
+      SELECT * EXCEPT (series, frequency, issued_date, ingest_date), series, frequency, issued_date
+      FROM `${var.project_id}.${google_bigquery_dataset.bronze_catalog.dataset_id}.${google_bigquery_table.bronze_provider_ext["massive"].table_id}`
+    SQL
+  }
+}
+
+# FRED bronze holds only new or revised observations per issued_date (see
+# ingestors/fred.py); this view is the current value per observation date.
+resource "google_bigquery_table" "bronze_fred" {
+  project             = var.project_id
+  dataset_id          = google_bigquery_dataset.bronze_catalog.dataset_id
+  table_id            = "bronze_fred"
+  deletion_protection = false
+
+  view {
+    use_legacy_sql = false
+    query          = <<-SQL
+      SELECT series, frequency, date, value, issued_date
+      FROM `${var.project_id}.${google_bigquery_dataset.bronze_catalog.dataset_id}.${google_bigquery_table.bronze_provider_ext["fred"].table_id}`
+      WHERE issued_date >= DATE '1970-01-01'  -- require_partition_filter
+      QUALIFY ROW_NUMBER() OVER (
+        PARTITION BY series, frequency, date
+        ORDER BY issued_date DESC, ingest_date DESC
+      ) = 1
+    SQL
+  }
+}
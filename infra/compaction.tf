@@ -0,0 +1,81 @@
+# --- COMPACTION ---
+# Cloud Run Jobs for compact.py, triggered monthly by Cloud Scheduler. Rolls the
+# month just closed into one file per period. With var.serve_compacted (jobs read
+# the bronze_massive / silver_<indicator> views) it also deletes the daily files;
+# until then they are kept for the jobs reading the daily external tables.
+
+locals {
+  compaction_datasets = {
+    bronze_massive     = "compact-bronze-massive"
+    silver_gold_to_spx = "compact-silver-gold-to-spx"
+  }
+}
+
+resource "google_cloud_run_v2_job" "compaction" {
+  for_each = local.compaction_datasets
+  name     = each.value
+  location = var.region
+  deletion_protection  = var.env == "prod"
+  template {
+    task_count = 1
+    template {
+      containers {
+        name  = "compact"
+        image = "${local.pipeline_image_base}/processors:${var.pipeline_image_tag}"
+        command = ["python", "mc.py"]
+        args = [
+          "compact", "--dataset", each.key, "--period", "month",
+          var.serve_compacted ? "--delete-sources" : "--keep-sources",
+        ]
+        env {
+          name  = "GOOGLE_CLOUD_PROJECT"
+          value = var.project_id
+        }
+        env {
+          name  = "BRONZE_BUCKET"
+          value = google_storage_bucket.bronze.name
+        }
+        env {
+          name  = "SILVER_BUCKET"
+          value = google_storage_bucket.silver.name
+        }
+        resources {
+          limits = {
+            cpu    = "1"
+            memory = "2Gi"
+          }
+        }
+      }
+      timeout      = "3600s"
+      max_retries  = 2
+      service_account = google_service_account.pipeline.email
+    }
+  }
+}
+
+resource "google_cloud_scheduler_job" "compaction" {
+  for_each         = local.compaction_datasets
+  name             = each.value
+  region           = var.region
+  schedule         = "0 6 2 * *"  # 6 AM UTC on the 2nd, once last month is closed
+  time_zone        = "UTC"
+  attempt_deadline = "320s"
+
+  http_target {
+    http_method = "POST"
+    uri         = "https://run.googleapis.com/v2/projects/${var.project_id}/locations/${var.region}/jobs/${google_cloud_run_v2_job.compaction[each.key].name}:run"
+    oidc_token {
+      service_account_email = google_service_account.pipeline.email
+    }
+  }
+
+  depends_on = [google_project_service.cloud_scheduler]
+}
+
+resource "google_cloud_run_v2_job_iam_member" "scheduler_compaction" {
+  for_each = local.compaction_datasets
+  location = google_cloud_run_v2_job.compaction[each.key].location
+  name     = google_cloud_run_v2_job.compaction[each.key].name
+  role     = "roles/run.invoker"
+  member   = "serviceAccount:${google_service_account.pipeline.email}"
+}
@@ -12,7 +12,7 @@ resource "google_cloud_run_v2_job" "spx_gold_daily" {
         name  = "spx-gold"
         image = "${local.pipeline_image_base}/indicators:${var.pipeline_image_tag}"
         command = ["python", "mc.py"]
-        args    = ["indicators", "spx_gold_daily"]
+        args    = ["indicators", "spx_gold_daily", "--incremental"]
         env {
           name  = "GOOGLE_CLOUD_PROJECT"
           value = var.project_id
@@ -27,7 +27,12 @@ resource "google_cloud_run_v2_job" "spx_gold_daily" {
         }
         env {
           name  = "SILVER_BQ_TABLE"
-          value = "silver_us_stocks_sip_ext"
+          value = var.silver_layout == "trade_date" ? "silver_us_stocks_sip_features" : "silver_us_stocks_sip_ext"
+        }
+        # Must match the processor's layout (processors.tf).
+        env {
+          name  = "SILVER_LAYOUT"
+          value = var.silver_layout
         }
         resources {
           limits = {
@@ -12,7 +12,7 @@ resource "google_cloud_run_v2_job" "fred" {
         name  = "fred"
         image = "${local.pipeline_image_base}/ingestors:${var.pipeline_image_tag}"
         command = ["python", "mc.py"]
-        args    = ["ingestors", "fred"]
+        args    = ["ingestors", "fred", "--series-file", "ingestors/fred_series.txt"]
         env {
           name  = "GOOGLE_CLOUD_PROJECT"
           value = var.project_id
@@ -62,7 +62,7 @@ resource "google_cloud_run_v2_job" "massive" {
         name  = "massive"
         image = "${local.pipeline_image_base}/ingestors:${var.pipeline_image_tag}"
         command = ["python", "mc.py"]
-        args    = ["ingestors", "massive"]
+        args    = ["ingestors", "massive", "--streaming"]
         env {
           name  = "GOOGLE_CLOUD_PROJECT"
           value = var.project_id
@@ -12,7 +12,7 @@ resource "google_cloud_run_v2_job" "stock_features_daily" {
         name  = "stock-features"
         image = "${local.pipeline_image_base}/processors:${var.pipeline_image_tag}"
         command = ["python", "mc.py"]
-        args    = ["processors", "stock_features_daily"]
+        args    = ["processors", "stock_features_daily", "--incremental"]
         env {
           name  = "GOOGLE_CLOUD_PROJECT"
           value = var.project_id
@@ -27,7 +27,16 @@ resource "google_cloud_run_v2_job" "stock_features_daily" {
         }
         env {
           name  = "BRONZE_BQ_TABLE"
-          value = "bronze_massive_ext"
+          value = var.serve_compacted ? "bronze_massive" : "bronze_massive_ext"
+        }
+        env {
+          name  = "SILVER_LAYOUT"
+          value = var.silver_layout
+        }
+        # Keep in step with the CPU limit below; os.cpu_count() reports host CPUs.
+        env {
+          name  = "PROCESSOR_WORKERS"
+          value = "2"
         }
         resources {
           limits = {
@@ -34,7 +34,7 @@ resource "google_cloud_run_v2_job" "spx_gold_trend" {
         }
         env {
           name  = "SILVER_BQ_INDICATOR_TABLE"
-          value = "silver_gold_to_spx_ext"
+          value = var.serve_compacted ? "silver_gold_to_spx" : "silver_gold_to_spx_ext"
         }
         env {
           name  = "INSTANCE_CONNECTION_NAME"
@@ -44,6 +44,61 @@ resource "google_bigquery_table" "silver_series_ext" {
   }
 }
 
+# Delta-only feature layout (stock_features_daily --layout trade_date): one file
+# per trading day, rewritten only when its rows change.
+# gs://{project}-silver/
+#   stock_features/
+#     series=us_stocks_sip/
+#       frequency=daily/
+#         trade_date=2026-02-02/
+#           stock_features_daily-2026-02-02.parquet
+resource "google_bigquery_table" "silver_series_features_ext" {
+  for_each   = var.silver_series
+  project    = var.project_id
+  dataset_id = google_bigquery_dataset.silver_catalog.dataset_id
+  table_id   = "silver_${each.key}_features_ext"
+
+  external_data_configuration {
+    source_format = "PARQUET"
+    autodetect    = true
+    connection_id = google_bigquery_connection.lake_connection.name
+
+    source_uris = [
+      "gs://${google_storage_bucket.silver.name}/stock_features/series=${each.key}/*"
+    ]
+
+    hive_partitioning_options {
+      mode                     = "AUTO"
+      source_uri_prefix         = "gs://${google_storage_bucket.silver.name}/stock_features/series=${each.key}/"
+      require_partition_filter = true
+    }
+  }
+}
+
+# One row per symbol and trade date. Each trade_date partition holds a single file
+# (rewritten in place), so there is no as_of column; if an object ever lingers
+# next to it, the newest file name wins.
+resource "google_bigquery_table" "silver_series_features" {
+  for_each            = var.silver_series
+  project             = var.project_id
+  dataset_id          = google_bigquery_dataset.silver_catalog.dataset_id
+  table_id            = "silver_${each.key}_features"
+  deletion_protection = false
+
+  view {
+    use_legacy_sql = false
+    query          = <<-SQL
+      SELECT *
+      FROM `${var.project_id}.${google_bigquery_dataset.silver_catalog.dataset_id}.${google_bigquery_table.silver_series_features_ext[each.key].table_id}`
+      WHERE TRUE
+      QUALIFY ROW_NUMBER() OVER (
+        PARTITION BY frequency, trade_date, symbol
+        ORDER BY _FILE_NAME DESC
+      ) = 1
+    SQL
+  }
+}
+
 # gs://{project}-silver/
 #   indicator=gold_to_spx/
 #     frequency=daily/
@@ -78,3 +133,82 @@ resource "google_storage_bucket_iam_member" "biglake_read_silver" {
   role   = "roles/storage.objectViewer"
   member = "serviceAccount:${google_bigquery_connection.lake_connection.cloud_resource[0].service_account_id}"
 }
+
+# Close-price column names for indicators that keep pre-RATIO_PAIRS names
+# (indicators/spx_gold_daily.py LEGACY_COLUMNS).
+locals {
+  silver_indicator_close_columns = {
+    gold_to_spx = ["gold_close", "spx_close"]
+  }
+}
+
+# Compacted indicators (see compact.py): one file per indicator/frequency/period,
+# with as_of stored as a column. The schema is declared (indicators/ratios.py
+# OUTPUT_COLUMNS) since the root is empty until the first compaction.
+resource "google_bigquery_table" "silver_indicator_compacted_ext" {
+  for_each            = var.silver_indicators
+  project             = var.project_id
+  dataset_id          = google_bigquery_dataset.silver_catalog.dataset_id
+  table_id            = "silver_${each.key}_compacted_ext"
+  deletion_protection = false
+
+  schema = jsonencode([
+    { name = "dt", type = "DATE" },
+    { name = "indicator", type = "STRING" },
+    { name = "base_symbol", type = "STRING" },
+    { name = "quote_symbol", type = "STRING" },
+    { name = lookup(local.silver_indicator_close_columns, each.key, ["base_close", "quote_close"])[0], type = "FLOAT64" },
+    { name = lookup(local.silver_indicator_close_columns, each.key, ["base_close", "quote_close"])[1], type = "FLOAT64" },
+    { name = "value", type = "FLOAT64" },
+    { name = "inverse_value", type = "FLOAT64" },
+    { name = "sma_50", type = "FLOAT64" },
+    { name = "sma_200", type = "FLOAT64" },
+    { name = "trend", type = "STRING" },
+    { name = "trend_run_id", type = "INT64" },
+    { name = "as_of", type = "DATE" },
+  ])
+
+  external_data_configuration {
+    source_format = "PARQUET"
+    autodetect    = false
+    connection_id = google_bigquery_connection.lake_connection.name
+
+    source_uris = [
+      "gs://${google_storage_bucket.silver.name}/compacted/indicator=${each.key}/*"
+    ]
+
+    hive_partitioning_options {
+      mode                     = "AUTO"
+      source_uri_prefix         = "gs://${google_storage_bucket.silver.name}/compacted/indicator=${each.key}/"
+      require_partition_filter = false
+    }
+  }
+}
+
+# Daily + compacted indicator rows. Per as_of, a daily file wins over the
+# compacted copy (see bronze_massive in bronze.tf).
+resource "google_bigquery_table" "silver_indicator" {
+  for_each            = var.silver_indicators
+  project             = var.project_id
+  dataset_id          = google_bigquery_dataset.silver_catalog.dataset_id
+  table_id            = "silver_${each.key}"
+  deletion_protection = false
+
+  view {
+    use_legacy_sql = false
+    query          = <<-SQL
+      SELECT * EXCEPT (frequency, period, as_of), frequency, as_of
+      FROM `${var.project_id}.${google_bigquery_dataset.silver_catalog.dataset_id}.${google_bigquery_table.silver_indicator_compacted_ext[each.key].table_id}` c
+      WHERE NOT EXISTS (
+        SELECT 1
+        FROM `${var.project_id}.${google_bigquery_dataset.silver_catalog.dataset_id}.${google_bigquery_table.silver_indicator_ext[each.key].table_id}` d
+        WHERE d.as_of >= DATE '1970-01-01'  -- require_partition_filter
+          AND d.frequency = c.frequency
+          AND d.as_of = c.as_of
+      )
+      UNION ALL
+      SELECT * EXCEPT (frequency, as_of), frequency, as_of
+      FROM `${var.project_id}.${google_bigquery_dataset.silver_catalog.dataset_id}.${google_bigquery_table.silver_indicator_ext[each.key].table_id}`
+    SQL
+  }
+}
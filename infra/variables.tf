@@ -46,5 +46,21 @@ variable "silver_series" {
 variable "silver_indicators" {
   type        = set(string)
   default     = ["gold_to_spx"]
-  description = "Silver indicator names (e.g. from indicator jobs)"
+  description = "Silver indicator names (e.g. from indicator jobs); add one per RATIO_PAIRS entry"
+}
+
+variable "silver_layout" {
+  type        = string
+  default     = "as_of"
+  description = "Stock features silver layout written by the processor and read by the indicator: as_of snapshots, or per-trade_date partitions. Switch to trade_date only after make migrate-silver-layout has written the history."
+  validation {
+    condition     = contains(["as_of", "trade_date"], var.silver_layout)
+    error_message = "silver_layout must be as_of or trade_date."
+  }
+}
+
+variable "serve_compacted" {
+  type        = bool
+  default     = false
+  description = "Point jobs at the daily+compacted views and let scheduled compaction delete daily files. Enable once compaction has run once (make compact-bronze compact-silver)."
 }
@@ -1,44 +1,211 @@
+import json
 import os
-from datetime import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from urllib.parse import urlencode
+from urllib.request import urlopen
 import logging
 
 import click
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 from fredapi import Fred
+from google.api_core.exceptions import NotFound
 from google.cloud import storage
 
+from common import gcs, parquet
+
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
-def run(
+BRONZE_SCHEMA = pa.schema([("date", pa.date32()), ("value", pa.float64())])
+
+# FRED allows 120 requests per minute per API key.
+FRED_REQUESTS_PER_MINUTE = int(os.getenv("FRED_REQUESTS_PER_MINUTE", "120"))
+
+# Incremental runs re-request this many days before the last stored
+# observation so recent revisions are picked up; a revision older than that
+# triggers a full re-pull (see _earliest_revision).
+REVISION_WINDOW_DAYS = int(os.getenv("FRED_REVISION_WINDOW_DAYS", "365"))
+STATE_PREFIX = "_state/provider=fred"
+
+
+def _to_bronze_table(data: pd.Series) -> pa.Table:
+    """Observations as a date-sorted table; FRED's missing values become nulls."""
+    return pa.table(
+        {
+            "date": pa.array(pd.DatetimeIndex(data.index).date, type=pa.date32()),
+            "value": pa.array(data.to_numpy(dtype="float64"), from_pandas=True),
+        },
+        schema=BRONZE_SCHEMA,
+    )
+
+
+class _TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._capacity, self._tokens + (now - self._updated) * self._rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self._rate
+            time.sleep(wait)
+
+
+def _read_series_file(path: str) -> list[str]:
+    """Series IDs from a text file: one per line, `#` starts a comment."""
+    with open(path) as f:
+        ids = [line.split("#", 1)[0].strip() for line in f]
+    return list(dict.fromkeys(i for i in ids if i))
+
+
+def _state_blob(storage_client: storage.Client, bronze_bucket: str, series_id: str) -> storage.Blob:
+    # Kept in bronze (outside the external-table root): the landing zone is write-once.
+    return storage_client.bucket(bronze_bucket).blob(
+        f"{STATE_PREFIX}/series={series_id}/state.json"
+    )
+
+
+def _load_state(blob: storage.Blob) -> dict | None:
+    try:
+        return json.loads(blob.download_as_bytes())
+    except NotFound:
+        return None
+
+
+def _changed_observations(data: pd.Series, previous: dict[str, float | None]) -> pd.Series:
+    """Observations that are new or differ from the stored revision window."""
+    keys = pd.DatetimeIndex(data.index).strftime("%Y-%m-%d")
+    prev = pd.Series(previous, dtype="float64").reindex(keys).to_numpy()
+    cur = data.to_numpy(dtype="float64")
+    known = keys.isin(list(previous))
+    same = known & ((prev == cur) | (np.isnan(prev) & np.isnan(cur)))
+    return data[~same]
+
+
+def _fetch_observations(fred: Fred, series_id: str, **params) -> list[dict]:
+    """Raw `series/observations` rows, for output types fredapi cannot parse."""
+    query = urlencode(
+        {"series_id": series_id, "api_key": fred.api_key, "file_type": "json", **params}
+    )
+    with urlopen(f"{fred.root_url}/series/observations?{query}") as response:
+        return json.loads(response.read())["observations"]
+
+
+def _earliest_revision(
+    fred: Fred, limiter: _TokenBucket, series_id: str, since: str, window_start: date
+) -> datetime | None:
+    """Earliest observation before `window_start` that FRED revised after `since`.
+
+    Takes the vintages issued after `since` and asks only for the observations
+    before the window that they revised (output_type=3), so an unrevised
+    history costs nothing. Revisions inside the window are found by comparing
+    the window fetch with the stored window values.
+    """
+    limiter.acquire()
+    vintages = [v for v in fred.get_series_vintage_dates(series_id) if v > pd.Timestamp(since)]
+    if not vintages:
+        return None
+    limiter.acquire()
+    revised = _fetch_observations(
+        fred,
+        series_id,
+        observation_end=(window_start - timedelta(days=1)).isoformat(),
+        vintage_dates=",".join(f"{v:%Y-%m-%d}" for v in vintages),
+        output_type=3,
+    )
+    if not revised:
+        return None
+    return datetime.strptime(min(row["date"] for row in revised), "%Y-%m-%d")
+
+
+def _ingest_series(
+    fred: Fred,
+    storage_client: storage.Client,
+    limiter: _TokenBucket,
     *,
-    api_key: str,
     landing_zone_bucket: str,
     bronze_bucket: str,
-    series_id: str = "STLFSI3",
-    resolution: str = "daily",
-    report_date: datetime | None = None,
-) -> None:
-    today = report_date.strftime("%Y-%m-%d") if report_date else datetime.now().strftime("%Y-%m-%d")
-    storage_client = storage.Client()
-    try:
-        fred = Fred(api_key=api_key)
-        data = fred.get_series(series_id)
-        info = fred.get_series_info(series_id)
+    series_id: str,
+    today: str,
+    full_refresh: bool = False,
+    revision_window_days: int = REVISION_WINDOW_DAYS,
+) -> bool:
+    """Ingest one series incrementally. Returns False if FRED reports no update.
 
-        landing_zone_blob_path = (
-            f"provider=fred/series={series_id}/frequency={info['frequency_short']}/"
-            f"issued_date={info['last_updated'][:10]}/ingest_date={today}/"
-            f"{info['id']}-{info['last_updated']}.csv"
+    Per-series state (last `last_updated`, last observation date and the
+    values inside the revision window) lives in the bronze bucket. When
+    `last_updated` is unchanged nothing is fetched beyond the series info.
+    Otherwise only observations from `revision_window_days` before the last
+    stored date are requested; the landing zone gets that raw response and
+    bronze gets only rows that are new or revised. If FRED revised an
+    observation older than that window since the last run, the full history
+    is re-pulled and written instead. Readers take the value from the latest
+    `issued_date` per observation date (the bronze_fred view).
+    """
+    state_blob = _state_blob(storage_client, bronze_bucket, series_id)
+    state = None if full_refresh else _load_state(state_blob)
+
+    limiter.acquire()
+    info = fred.get_series_info(series_id)
+    if state is not None and state["last_updated"] == info["last_updated"]:
+        logging.info(f"{series_id}: unchanged since {info['last_updated']}, skipping")
+        return False
+
+    observation_start = None
+    if state is not None:
+        observation_start = (
+            datetime.strptime(state["last_observation_date"], "%Y-%m-%d")
+            - timedelta(days=revision_window_days)
+        ).date()
+        revised_from = _earliest_revision(
+            fred, limiter, series_id, state["last_updated"][:10], observation_start
         )
-        bucket = storage_client.bucket(landing_zone_bucket)
-        blob = bucket.blob(landing_zone_blob_path)
-        blob.upload_from_string(data.to_csv(), content_type="application/octet-stream")
-        print(f"Successfully uploaded {series_id} to {landing_zone_blob_path}")
+        if revised_from is not None:
+            logging.info(
+                f"{series_id}: revised back to {revised_from.date()}, before the "
+                f"{revision_window_days}-day window; re-pulling full history"
+            )
+            state, observation_start = None, None
+    limiter.acquire()
+    data = fred.get_series(series_id, observation_start=observation_start)
+    delta = _changed_observations(data, state["window"]) if state is not None else data
+    logging.info(
+        f"{series_id}: fetched {len(data)} observations"
+        f"{f' from {observation_start}' if observation_start else ''}, "
+        f"{len(delta)} new or revised"
+    )
+
+    landing_zone_blob_path = (
+        f"provider=fred/series={series_id}/frequency={info['frequency_short']}/"
+        f"issued_date={info['last_updated'][:10]}/ingest_date={today}/"
+        f"{info['id']}-{info['last_updated']}.csv"
+    )
+    bucket = storage_client.bucket(landing_zone_bucket)
+    blob = bucket.blob(landing_zone_blob_path)
+    blob.upload_from_string(data.to_csv(), content_type="application/octet-stream")
+    logging.info(f"Successfully uploaded {series_id} to {landing_zone_blob_path}")
 
-        df = data.to_frame(name="value").reset_index()
-        df.columns = ["date", "value"]
+    if len(delta):
+        table = _to_bronze_table(delta)
         bronze_blob_path = (
             f"provider=fred/series={series_id}/frequency={info['frequency_short']}/"
             f"issued_date={info['last_updated'][:10]}/ingest_date={today}/"
@@ -47,9 +214,114 @@ def run(
         bucket = storage_client.bucket(bronze_bucket)
         blob = bucket.blob(bronze_blob_path)
         blob.upload_from_string(
-            df.to_parquet(index=False), content_type="application/octet-stream"
+            parquet.to_parquet_bytes(table, sort_by=("date",)),
+            content_type="application/octet-stream",
         )
-        print(f"Successfully uploaded {series_id} to {bronze_blob_path}")
+        logging.info(f"Successfully uploaded {series_id} to {bronze_blob_path}")
+
+    dates = pd.DatetimeIndex(data.index)
+    last_observation = dates.max() if len(dates) else None
+    if state is not None and (
+        last_observation is None
+        or last_observation.strftime("%Y-%m-%d") < state["last_observation_date"]
+    ):
+        last_observation = pd.Timestamp(state["last_observation_date"])
+    window_start = last_observation - timedelta(days=revision_window_days)
+    in_window = data[dates >= window_start]
+    window = dict(state["window"]) if state is not None else {}
+    window.update(
+        {
+            d.strftime("%Y-%m-%d"): (None if pd.isna(v) else float(v))
+            for d, v in in_window.items()
+        }
+    )
+    state_blob.upload_from_string(
+        json.dumps(
+            {
+                "series_id": series_id,
+                "last_updated": info["last_updated"],
+                "last_observation_date": last_observation.strftime("%Y-%m-%d"),
+                "window": {
+                    k: v
+                    for k, v in sorted(window.items())
+                    if k >= window_start.strftime("%Y-%m-%d")
+                },
+            },
+            indent=2,
+        ),
+        content_type="application/json",
+    )
+    return True
+
+
+def run(
+    *,
+    api_key: str,
+    landing_zone_bucket: str,
+    bronze_bucket: str,
+    series_id: str = "STLFSI3",
+    series_ids: list[str] | None = None,
+    resolution: str = "daily",
+    report_date: datetime | None = None,
+    concurrency: int = 1,
+    requests_per_minute: int = FRED_REQUESTS_PER_MINUTE,
+    full_refresh: bool = False,
+    revision_window_days: int = REVISION_WINDOW_DAYS,
+) -> None:
+    """Ingest `series_id`, or every ID in `series_ids` concurrently.
+
+    All series share one GCS client and one token bucket that keeps FRED
+    API calls under `requests_per_minute`. Series are ingested incrementally
+    (see `_ingest_series`) unless `full_refresh` is set. Failures are
+    collected and reported once every series has been attempted.
+    """
+    today = report_date.strftime("%Y-%m-%d") if report_date else datetime.now().strftime("%Y-%m-%d")
+    if series_ids is None:
+        series_ids = [series_id]
+    concurrency = max(1, min(concurrency, len(series_ids)))
+    limiter = _TokenBucket(
+        rate=requests_per_minute / 60, capacity=max(1, min(concurrency, requests_per_minute))
+    )
+    storage_client = gcs.pooled_storage_client(pool_size=max(10, concurrency * 2))
+    try:
+        fred = Fred(api_key=api_key)
+
+        def ingest_one(sid: str) -> bool:
+            return _ingest_series(
+                fred,
+                storage_client,
+                limiter,
+                landing_zone_bucket=landing_zone_bucket,
+                bronze_bucket=bronze_bucket,
+                series_id=sid,
+                today=today,
+                full_refresh=full_refresh,
+                revision_window_days=revision_window_days,
+            )
+
+        if len(series_ids) == 1:
+            ingest_one(series_ids[0])
+            return
+
+        logging.info(f"Ingesting {len(series_ids)} FRED series with concurrency={concurrency}")
+        unchanged: list[str] = []
+        failed: list[str] = []
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {executor.submit(ingest_one, sid): sid for sid in series_ids}
+            for future in as_completed(futures):
+                sid = futures[future]
+                try:
+                    if not future.result():
+                        unchanged.append(sid)
+                except Exception as e:
+                    logging.error(f"Error ingesting {sid}: {type(e).__name__}: {e}")
+                    failed.append(sid)
+        logging.info(
+            f"Ingested {len(series_ids) - len(unchanged) - len(failed)} series, "
+            f"unchanged {len(unchanged)}, failed {len(failed)}"
+        )
+        if failed:
+            raise SystemExit("Failed series: " + ", ".join(sorted(failed)))
     finally:
         storage_client.close()
 
@@ -68,7 +340,42 @@ def run(
     envvar="SERIES_ID",
     help="FRED series ID. Default: STLFSI3.",
 )
-def cli(limit: int | None, report_date: datetime | None, series_id: str) -> None:
+@click.option(
+    "--series-file",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    envvar="FRED_SERIES_FILE",
+    help="File of FRED series IDs (one per line) to ingest instead of --series-id.",
+)
+@click.option(
+    "--concurrency",
+    type=int,
+    default=8,
+    envvar="FRED_CONCURRENCY",
+    help="Series fetched in parallel with --series-file. Default: 8.",
+)
+@click.option(
+    "--full-refresh",
+    is_flag=True,
+    default=False,
+    help="Ignore stored state and re-fetch each series' full history.",
+)
+@click.option(
+    "--revision-window-days",
+    type=click.IntRange(min=0),
+    default=REVISION_WINDOW_DAYS,
+    envvar="FRED_REVISION_WINDOW_DAYS",
+    help=f"Days before the last stored observation re-requested on incremental runs. Default: {REVISION_WINDOW_DAYS}.",
+)
+def cli(
+    limit: int | None,
+    report_date: datetime | None,
+    series_id: str,
+    series_file: str | None,
+    concurrency: int,
+    full_refresh: bool,
+    revision_window_days: int,
+) -> None:
     """Ingest data from FRED API to landing zone and bronze."""
     api_key = os.environ.get("FRED_API_KEY")
     assert api_key, "Set FRED_API_KEY in .env or environment"
@@ -77,12 +384,17 @@ def cli(limit: int | None, report_date: datetime | None, series_id: str) -> None
     bronze = os.environ.get("BRONZE_BUCKET")
     assert bronze, "Set BRONZE_BUCKET in .env or environment"
     resolution = os.environ.get("RESOLUTION", "daily")
-    logging.info(f"{series_id}")
+    series_ids = _read_series_file(series_file) if series_file else None
+    logging.info(f"{series_ids or series_id}")
     run(
         api_key=api_key,
         landing_zone_bucket=landing_zone,
         bronze_bucket=bronze,
         series_id=series_id,
+        series_ids=series_ids,
         resolution=resolution,
-        report_date=report_date
+        report_date=report_date,
+        concurrency=concurrency,
+        full_refresh=full_refresh,
+        revision_window_days=revision_window_days,
     )
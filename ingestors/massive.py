@@ -1,26 +1,127 @@
+import io
+import json
 import os
+import queue
 import tempfile
-from datetime import date, datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
 import logging
 
 import boto3
 import botocore
+import botocore.exceptions
 import click
-import pandas as pd
+from boto3.s3.transfer import TransferConfig
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+from google.api_core.exceptions import NotFound, PreconditionFailed
 from google.cloud import storage
+from google.cloud.storage import transfer_manager
+
+import compact
+from common import gcs, parquet
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
 SOURCE_BUCKET_NAME = "flatfiles"
-REPORT_AGGREGATIONS_MAP = {"daily": "day_aggs_v1"}
+MANIFEST_PREFIX = "_manifests"
+REPORT_AGGREGATIONS_MAP = {"daily": "day_aggs_v1", "minute": "minute_aggs_v1"}
+
+# Streaming mode: size of each decoded CSV block (one Parquet row group per
+# block) and of each resumable upload chunk (must be a multiple of 256 KiB).
+STREAM_BLOCK_SIZE = int(os.getenv("STREAM_BLOCK_SIZE", str(16 << 20)))
+# Minute files are ~400x a daily file and sorted by ticker, so smaller blocks
+# give row groups of a few hundred tickers each: reading one ticker's day
+# touches one or two row groups instead of the whole file.
+STREAM_BLOCK_SIZE_MAP = {"minute": int(os.getenv("MINUTE_STREAM_BLOCK_SIZE", str(4 << 20)))}
+# Resolutions too large to load into memory; always ingested in streaming mode.
+STREAMING_ONLY_RESOLUTIONS = {"minute"}
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(8 << 20)))
+
+# File mode: objects at least this large are downloaded with parallel ranged
+# GETs and uploaded to the landing zone as concurrent multipart chunks.
+PARALLEL_TRANSFER_THRESHOLD = int(
+    os.getenv("PARALLEL_TRANSFER_THRESHOLD", str(64 << 20))
+)
+PARALLEL_TRANSFER_WORKERS = int(os.getenv("PARALLEL_TRANSFER_WORKERS", "8"))
+
+
+def _aggs_schema(volume_type: pa.DataType) -> pa.Schema:
+    """Bronze schema for Massive *_aggs_v1 flat files."""
+    return pa.schema(
+        [
+            ("ticker", pa.dictionary(pa.int32(), pa.string())),
+            ("volume", volume_type),
+            ("open", pa.float64()),
+            ("close", pa.float64()),
+            ("high", pa.float64()),
+            ("low", pa.float64()),
+            # Source files carry epoch nanoseconds; bars start on whole minutes,
+            # so microseconds (BigQuery TIMESTAMP precision) lose nothing.
+            ("window_start", pa.timestamp("us", tz="UTC")),
+            ("transactions", pa.int64()),
+        ]
+    )
+
+
+# Declared bronze schemas per series. Series not listed fall back to
+# whatever pyarrow infers from the CSV.
+BRONZE_SCHEMAS = {
+    "us_stocks_sip": _aggs_schema(pa.int64()),
+    "us_options_opra": _aggs_schema(pa.int64()),
+    "global_crypto": _aggs_schema(pa.float64()),
+    "global_forex": _aggs_schema(pa.float64()),
+}
+BRONZE_SORT_BY = ("ticker", "window_start")
+BRONZE_DICTIONARY_COLUMNS = ("ticker",)
 
 
 def _report_aggregation_stub(resolution: str) -> str:
     return REPORT_AGGREGATIONS_MAP[resolution]
 
 
+def _bronze_schema(series_id: str) -> pa.Schema | None:
+    schema = BRONZE_SCHEMAS.get(series_id)
+    if schema is None:
+        logging.warning(f"No bronze schema declared for {series_id}; inferring types")
+    return schema
+
+
+def _csv_convert_options(schema: pa.Schema | None) -> pacsv.ConvertOptions:
+    if schema is None:
+        return pacsv.ConvertOptions()
+    return pacsv.ConvertOptions(
+        column_types={
+            f.name: pa.int64() if pa.types.is_timestamp(f.type) else f.type
+            for f in schema
+        },
+        include_columns=schema.names,
+    )
+
+
+def _conform(batch: pa.RecordBatch | pa.Table, schema: pa.Schema | None):
+    """Cast parsed CSV columns to the declared bronze schema."""
+    if schema is None:
+        return batch
+    columns = []
+    for f in schema:
+        col = batch.column(f.name)
+        if pa.types.is_timestamp(f.type) and pa.types.is_integer(col.type):
+            col = pc.cast(col, pa.timestamp("ns", tz=f.type.tz))
+        columns.append(pc.cast(col, f.type))
+    if isinstance(batch, pa.Table):
+        return pa.Table.from_arrays(columns, schema=schema)
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def _sort_columns(schema: pa.Schema) -> tuple[str, ...]:
+    return tuple(c for c in BRONZE_SORT_BY if c in schema.names)
+
+
 def _massive_object_key(series_id: str, resolution: str, report_date: date) -> str:
     return (
         f"{series_id}/{resolution}/{report_date.year}/{report_date.month:02}/"
@@ -40,6 +141,459 @@ def _gcp_blob_path(
     )
 
 
+def _manifest_blob_path(
+    series_id: str, resolution: str, report_date: date, etag: str = ""
+) -> str:
+    """Landing-zone manifest for one source object version.
+
+    Named by the source ETag so manifests are write-once, like everything else
+    in the landing zone. Without `etag`, returns the per-date prefix.
+    """
+    fmt_report_date = f"{report_date.year}-{report_date.month:02}-{report_date.day:02}"
+    prefix = (
+        f"{MANIFEST_PREFIX}/provider=massive/series={series_id}/frequency={resolution}/"
+        f"issued_date={fmt_report_date}/"
+    )
+    return f"{prefix}{etag}.json" if etag else prefix
+
+
+def _load_manifest(blob: storage.Blob) -> dict | None:
+    try:
+        return json.loads(blob.download_as_bytes())
+    except NotFound:
+        return None
+
+
+def _bronze_live(storage_client: storage.Client, manifest: dict, report_date: date) -> bool:
+    """Whether the manifest's bronze object is still served: either the daily
+    file itself or, once `compact --delete-sources` removed it, the monthly or
+    yearly compacted file whose manifest lists it as a source."""
+    bucket = storage_client.bucket(manifest["bronze_bucket"])
+    if bucket.blob(manifest["bronze_blob"]).exists():
+        return True
+    prefix = manifest["bronze_blob"].split("issued_date=")[0]
+    for period in ("month", "year"):
+        compaction = _load_manifest(
+            bucket.blob(
+                f"{compact.MANIFEST_PREFIX}/{prefix}"
+                f"period={compact._period_of(report_date, period)}/manifest.json"
+            )
+        )
+        if compaction and any(
+            s["name"] == manifest["bronze_blob"] for s in compaction["sources"]
+        ):
+            return True
+    return False
+
+
+def _write_manifest(blob: storage.Blob, manifest: dict, *, overwrite: bool = False) -> None:
+    """Create the manifest; with `overwrite` (a re-ingest of a version that
+    already has one: forced, or its bronze object gone), replace it."""
+    try:
+        blob.upload_from_string(
+            json.dumps(manifest, indent=2, sort_keys=True),
+            content_type="application/json",
+            if_generation_match=None if overwrite else 0,
+        )
+    except PreconditionFailed:
+        # A concurrent run ingested the same source version; its manifest stands.
+        logging.info(f"Manifest already exists: {blob.name}")
+
+
+def _remove_superseded(
+    storage_client: storage.Client,
+    landing_zone_bucket: str,
+    manifest_prefix: str,
+    current: dict,
+    replaced: dict | None = None,
+) -> None:
+    """Delete bronze objects produced from older versions of the same source file.
+
+    `replaced` is the manifest a forced re-ingest overwrote: same source
+    version, but its bronze object may sit under an earlier ingest_date.
+    Landing-zone copies are kept (immutable archive); only bronze is pruned so
+    the external table sees a single partition per issued_date.
+    """
+    previous_manifests = [replaced] if replaced else []
+    for blob in storage_client.list_blobs(landing_zone_bucket, prefix=manifest_prefix):
+        if not blob.name.endswith(f"/{current['etag']}.json"):
+            previous_manifests.append(_load_manifest(blob))
+    for previous in previous_manifests:
+        if not previous or previous["bronze_blob"] == current["bronze_blob"]:
+            continue
+        bronze = storage_client.bucket(previous["bronze_bucket"]).blob(
+            previous["bronze_blob"]
+        )
+        try:
+            bronze.delete()
+            logging.info(
+                f"Removed superseded bronze file: {previous['bronze_bucket']}/{previous['bronze_blob']}"
+            )
+        except NotFound:
+            pass
+
+
+class _TeeReader(io.RawIOBase):
+    """Readable stream that copies every byte it reads from `source` to `sink`."""
+
+    def __init__(self, source, sink) -> None:
+        self._source = source
+        self._sink = sink
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._source.read(size)
+        if data:
+            self._sink.write(data)
+        return data
+
+    def readinto(self, b) -> int:
+        data = self.read(len(b))
+        b[: len(data)] = data
+        return len(data)
+
+    def drain(self) -> None:
+        """Copy whatever the consumer left unread (e.g. a gzip trailer) to `sink`."""
+        while self.read(UPLOAD_CHUNK_SIZE):
+            pass
+
+
+class _BackgroundWriter(io.RawIOBase):
+    """Write-only stream that hands data to a thread writing to `sink`.
+
+    Writes are coalesced into `chunk_size` pieces and at most `max_pending`
+    pieces are queued, so the producer only blocks when the upload falls
+    behind and memory stays bounded. Upload errors are re-raised to the
+    producer on its next write or on `finish()`.
+    """
+
+    def __init__(self, sink, chunk_size: int = UPLOAD_CHUNK_SIZE, max_pending: int = 2) -> None:
+        self._sink = sink
+        self._chunk_size = chunk_size
+        self._buffer = bytearray()
+        self._written = 0
+        self._error: BaseException | None = None
+        self._queue: queue.Queue[bytes | None] = queue.Queue(max_pending)
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        if self._error is not None:
+            raise self._error
+        self._buffer += b
+        self._written += len(b)
+        if len(self._buffer) >= self._chunk_size:
+            self._queue.put(bytes(self._buffer))
+            self._buffer.clear()
+        return len(b)
+
+    def tell(self) -> int:
+        return self._written
+
+    def flush(self) -> None:
+        pass
+
+    def _drain(self) -> None:
+        while (data := self._queue.get()) is not None:
+            if self._error is None:
+                try:
+                    self._sink.write(data)
+                except BaseException as e:
+                    self._error = e
+
+    def finish(self, *, abort: bool = False) -> None:
+        """Flush the tail and wait for the thread. With `abort`, drop pending data."""
+        if self._buffer and not abort:
+            self._queue.put(bytes(self._buffer))
+        self._buffer.clear()
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None and not abort:
+            raise self._error
+
+
+def _ingest_streaming(
+    s3,
+    source_object_key: str,
+    landing_zone_blob: storage.Blob,
+    bronze_blob: storage.Blob,
+    schema: pa.Schema | None = None,
+    block_size: int = STREAM_BLOCK_SIZE,
+) -> int:
+    """Stream S3 gzip CSV → landing zone (raw) and bronze (Parquet) in one pass.
+
+    The source body is read once; every compressed chunk is forwarded to a
+    resumable landing-zone upload while the decoder turns it into record
+    batches that are written as Parquet row groups into a resumable bronze
+    upload. Both uploads run on their own threads, so the landing upload
+    starts while the download is in flight and overlaps parsing and the
+    bronze upload. Nothing is buffered beyond one CSV block and a few upload
+    chunks, so peak memory does not depend on file size. If anything fails,
+    both uploads are cancelled and no partial object is committed. Returns
+    rows written.
+
+    Each row group is sorted by ticker; Massive files are already ordered by
+    ticker, so row-group statistics stay disjoint across the file.
+    """
+    body = s3.get_object(Bucket=SOURCE_BUCKET_NAME, Key=source_object_key)["Body"]
+    rows = 0
+    try:
+        with (
+            landing_zone_blob.open(
+                "wb",
+                chunk_size=UPLOAD_CHUNK_SIZE,
+                content_type="application/octet-stream",
+                ignore_flush=True,
+            ) as landing_out,
+            bronze_blob.open(
+                "wb",
+                chunk_size=UPLOAD_CHUNK_SIZE,
+                content_type="application/octet-stream",
+                ignore_flush=True,
+            ) as bronze_out,
+        ):
+            landing_async = _BackgroundWriter(landing_out)
+            bronze_async = _BackgroundWriter(bronze_out)
+            try:
+                tee = _TeeReader(body, landing_async)
+                reader = pacsv.open_csv(
+                    pa.input_stream(tee, compression="gzip"),
+                    read_options=pacsv.ReadOptions(block_size=block_size),
+                    convert_options=_csv_convert_options(schema),
+                )
+                out_schema = schema or reader.schema
+                sort_by = _sort_columns(out_schema)
+                last_ticker = None
+                with parquet.open_writer(
+                    bronze_async,
+                    out_schema,
+                    sort_by=sort_by,
+                    dictionary_columns=BRONZE_DICTIONARY_COLUMNS,
+                ) as writer:
+                    for batch in reader:
+                        batch = parquet.sort_table(_conform(batch, schema), sort_by)
+                        if batch.num_rows and "ticker" in batch.schema.names:
+                            tickers = batch.column("ticker")
+                            first, last = str(tickers[0]), str(tickers[-1])
+                            if last_ticker is not None and first < last_ticker:
+                                logging.warning(
+                                    f"{source_object_key}: source not ordered by ticker; "
+                                    "row-group statistics will overlap"
+                                )
+                            last_ticker = max(last, last_ticker or last)
+                        writer.write_batch(batch)
+                        rows += batch.num_rows
+                tee.drain()
+            except BaseException:
+                landing_async.finish(abort=True)
+                bronze_async.finish(abort=True)
+                raise
+            landing_async.finish()
+            bronze_async.finish()
+    finally:
+        body.close()
+    return rows
+
+
+def _upload_landing_file(blob: storage.Blob, filename: str, size: int) -> None:
+    if size >= PARALLEL_TRANSFER_THRESHOLD:
+        transfer_manager.upload_chunks_concurrently(
+            filename,
+            blob,
+            content_type="application/octet-stream",
+            chunk_size=UPLOAD_CHUNK_SIZE * 4,
+            max_workers=PARALLEL_TRANSFER_WORKERS,
+            worker_type=transfer_manager.THREAD,
+        )
+    else:
+        blob.upload_from_filename(filename, content_type="application/octet-stream")
+
+
+def _ingest_file(
+    s3,
+    source_object_key: str,
+    size: int,
+    landing_zone_blob: storage.Blob,
+    bronze_blob: storage.Blob,
+    schema: pa.Schema | None = None,
+) -> None:
+    """Download to a temp file, then upload raw and Parquet copies concurrently.
+
+    Large files are fetched with parallel ranged GETs and sent to the landing
+    zone as concurrent multipart chunks; parsing and the bronze upload run
+    while the landing upload is in progress.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".csv.gz") as tmpfile:
+        s3.download_fileobj(
+            SOURCE_BUCKET_NAME,
+            source_object_key,
+            tmpfile,
+            Config=TransferConfig(
+                multipart_threshold=PARALLEL_TRANSFER_THRESHOLD,
+                max_concurrency=PARALLEL_TRANSFER_WORKERS,
+            ),
+        )
+        tmpfile.flush()
+        logging.info(
+            f"Massive source file downloaded: {SOURCE_BUCKET_NAME}/{source_object_key}"
+        )
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            landing = pool.submit(_upload_landing_file, landing_zone_blob, tmpfile.name, size)
+            try:
+                with open(tmpfile.name, "rb") as f:
+                    table = _conform(
+                        pacsv.read_csv(
+                            pa.input_stream(f, compression="gzip"),
+                            convert_options=_csv_convert_options(schema),
+                        ),
+                        schema,
+                    )
+                bronze_blob.upload_from_string(
+                    parquet.to_parquet_bytes(
+                        table,
+                        sort_by=_sort_columns(table.schema),
+                        dictionary_columns=BRONZE_DICTIONARY_COLUMNS,
+                    ),
+                    content_type="application/octet-stream",
+                )
+            finally:
+                landing.result()
+
+
+def _s3_client(
+    aws_access_key_id: str, aws_secret_access_key: str, pool_size: int = 10
+):
+    session = boto3.Session(
+        aws_access_key_id=aws_access_key_id,
+        aws_secret_access_key=aws_secret_access_key,
+    )
+    return session.client(
+        "s3",
+        endpoint_url="https://files.massive.com",
+        config=botocore.config.Config(
+            signature_version="s3v4",
+            max_pool_connections=pool_size,
+        ),
+    )
+
+
+def _is_missing_source(e: Exception) -> bool:
+    """True for S3 404s (weekends, holidays, not-yet-published days)."""
+    if not isinstance(e, botocore.exceptions.ClientError):
+        return False
+    return e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey")
+
+
+def _ingest_date(
+    s3,
+    storage_client: storage.Client,
+    *,
+    landing_zone_bucket: str,
+    bronze_bucket: str,
+    series_id: str,
+    resolution: str,
+    report_date: date,
+    streaming: bool,
+    force: bool = False,
+) -> bool:
+    """Ingest one report date. Returns False if skipped as unchanged.
+
+    The source object is HEADed first; if a manifest for its ETag already
+    exists, the size matches and its bronze object is still live (as a daily
+    file or folded into a compacted one), the download and both uploads are
+    skipped.
+    """
+    agg = _report_aggregation_stub(resolution)
+    source_object_key = _massive_object_key(series_id, agg, report_date)
+
+    head = s3.head_object(Bucket=SOURCE_BUCKET_NAME, Key=source_object_key)
+    etag = head["ETag"].strip('"')
+    size = head["ContentLength"]
+    manifest_blob = storage_client.bucket(landing_zone_bucket).blob(
+        _manifest_blob_path(series_id, resolution, report_date, etag)
+    )
+    existing = _load_manifest(manifest_blob)
+    if not force:
+        manifest = existing
+        if (
+            manifest is not None
+            and manifest.get("size") == size
+            # A later version may have replaced this one's bronze output.
+            and _bronze_live(storage_client, manifest, report_date)
+        ):
+            logging.info(
+                f"Unchanged since {manifest['ingested_at']}, skipping: "
+                f"{SOURCE_BUCKET_NAME}/{source_object_key} (etag={etag})"
+            )
+            return False
+
+    landing_zone_blob_path = _gcp_blob_path(
+        series_id, resolution, report_date, ".csv.gz"
+    )
+    bronze_blob_path = _gcp_blob_path(series_id, resolution, report_date, ".parquet")
+    schema = _bronze_schema(series_id)
+
+    if streaming or resolution in STREAMING_ONLY_RESOLUTIONS:
+        rows = _ingest_streaming(
+            s3,
+            source_object_key,
+            storage_client.bucket(landing_zone_bucket).blob(landing_zone_blob_path),
+            storage_client.bucket(bronze_bucket).blob(bronze_blob_path),
+            schema=schema,
+            block_size=STREAM_BLOCK_SIZE_MAP.get(resolution, STREAM_BLOCK_SIZE),
+        )
+        logging.info(
+            f"Landing Zone file uploaded: {landing_zone_bucket}/{landing_zone_blob_path}"
+        )
+        logging.info(
+            f"Bronze file uploaded ({rows} rows): {bronze_bucket}/{bronze_blob_path}"
+        )
+    else:
+        _ingest_file(
+            s3,
+            source_object_key,
+            size,
+            storage_client.bucket(landing_zone_bucket).blob(landing_zone_blob_path),
+            storage_client.bucket(bronze_bucket).blob(bronze_blob_path),
+            schema=schema,
+        )
+        logging.info(
+            f"Landing Zone file uploaded: {landing_zone_bucket}/{landing_zone_blob_path}"
+        )
+        logging.info(f"Bronze file uploaded: {bronze_bucket}/{bronze_blob_path}")
+
+    # Written last: a manifest only exists once both objects are committed.
+    manifest = {
+        "source_bucket": SOURCE_BUCKET_NAME,
+        "source_key": source_object_key,
+        "etag": etag,
+        "size": size,
+        "last_modified": head["LastModified"].isoformat(),
+        "landing_zone_bucket": landing_zone_bucket,
+        "landing_zone_blob": landing_zone_blob_path,
+        "bronze_bucket": bronze_bucket,
+        "bronze_blob": bronze_blob_path,
+        "ingested_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    # A stale manifest (bronze gone or size changed) must be replaced too, or
+    # every later run re-ingests and prunes against the stale one.
+    _write_manifest(manifest_blob, manifest, overwrite=existing is not None)
+    _remove_superseded(
+        storage_client,
+        landing_zone_bucket,
+        _manifest_blob_path(series_id, resolution, report_date),
+        manifest,
+        replaced=existing,
+    )
+    return True
+
+
 def run(
     *,
     landing_zone_bucket: str,
@@ -49,63 +603,96 @@ def run(
     series_id: str = "us_stocks_sip",
     resolution: str = "daily",
     report_date: date | None = None,
+    report_dates: list[date] | None = None,
+    streaming: bool = False,
+    concurrency: int = 1,
+    force: bool = False,
 ) -> None:
-    if report_date is None:
-        report_date = datetime.now().date()
+    """Ingest one report date, or every date in `report_dates` concurrently.
 
-    storage_client = storage.Client()
-    session = boto3.Session(
-        aws_access_key_id=aws_access_key_id,
-        aws_secret_access_key=aws_secret_access_key,
-    )
-    s3 = session.client(
-        "s3",
-        endpoint_url="https://files.massive.com",
-        config=botocore.config.Config(signature_version="s3v4"),
+    All dates share one pooled S3 client and one GCS client. With a single
+    date any error aborts the run; with several, dates that have no source
+    file (weekends, holidays) are skipped and other failures are collected
+    and reported once every date has been attempted. Dates whose source
+    ETag matches an existing manifest are skipped unless `force` is set.
+    """
+    if report_dates is None:
+        report_dates = [report_date or datetime.now().date()]
+    concurrency = max(1, min(concurrency, len(report_dates)))
+
+    # download_fileobj opens up to 10 ranged GETs per file.
+    s3 = _s3_client(
+        aws_access_key_id, aws_secret_access_key, pool_size=max(10, concurrency * 10)
     )
+    storage_client = gcs.pooled_storage_client(pool_size=max(10, concurrency * 2))
 
-    try:
-        agg = _report_aggregation_stub(resolution)
-        source_object_key = _massive_object_key(series_id, agg, report_date)
+    def ingest_one(rd: date) -> bool:
+        return _ingest_date(
+            s3,
+            storage_client,
+            landing_zone_bucket=landing_zone_bucket,
+            bronze_bucket=bronze_bucket,
+            series_id=series_id,
+            resolution=resolution,
+            report_date=rd,
+            streaming=streaming,
+            force=force,
+        )
 
-        with tempfile.TemporaryFile() as tmpfile:
+    try:
+        if len(report_dates) == 1:
+            rd = report_dates[0]
             try:
-                s3.download_fileobj(SOURCE_BUCKET_NAME, source_object_key, tmpfile)
-                logging.info(
-                    f"Massive source file downloaded: {SOURCE_BUCKET_NAME}/{source_object_key}"
-                )
-
-                tmpfile.seek(0)
-                landing_zone_blob_path = _gcp_blob_path(
-                    series_id, resolution, report_date, ".csv.gz"
-                )
-                bucket = storage_client.bucket(landing_zone_bucket)
-                blob = bucket.blob(landing_zone_blob_path)
-                blob.upload_from_file(tmpfile)
-                logging.info(
-                    f"Landing Zone file uploaded: {landing_zone_bucket}/{landing_zone_blob_path}"
-                )
-
-                tmpfile.seek(0)
-                df = pd.read_csv(tmpfile, compression="gzip")
-                bronze_blob_path = _gcp_blob_path(
-                    series_id, resolution, report_date, ".parquet"
-                )
-                bucket = storage_client.bucket(bronze_bucket)
-                blob = bucket.blob(bronze_blob_path)
-                blob.upload_from_string(
-                    df.to_parquet(index=False), content_type="application/octet-stream"
-                )
-                logging.info(f"Bronze file uploaded: {bronze_bucket}/{bronze_blob_path}")
+                ingest_one(rd)
             except Exception as e:
+                source_object_key = _massive_object_key(
+                    series_id, _report_aggregation_stub(resolution), rd
+                )
                 raise SystemExit(
                     f"Error ingesting file ({source_object_key}): {type(e).__name__}: {e}"
                 ) from e
+            return
+
+        logging.info(
+            f"Ingesting {len(report_dates)} dates with concurrency={concurrency}"
+        )
+        unchanged: list[date] = []
+        skipped: list[date] = []
+        failed: list[date] = []
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {executor.submit(ingest_one, rd): rd for rd in report_dates}
+            for future in as_completed(futures):
+                rd = futures[future]
+                try:
+                    if not future.result():
+                        unchanged.append(rd)
+                except Exception as e:
+                    if _is_missing_source(e):
+                        logging.warning(f"Skipping {rd}: no source file")
+                        skipped.append(rd)
+                    else:
+                        logging.error(f"Error ingesting {rd}: {type(e).__name__}: {e}")
+                        failed.append(rd)
+
+        ingested = len(report_dates) - len(unchanged) - len(skipped) - len(failed)
+        logging.info(
+            f"Ingested {ingested} dates, unchanged {len(unchanged)}, "
+            f"skipped {len(skipped)}, failed {len(failed)}"
+        )
+        if failed:
+            raise SystemExit(
+                "Failed dates: " + ", ".join(d.isoformat() for d in sorted(failed))
+            )
     finally:
         storage_client.close()
         s3.close()
 
 
+def _date_range(start: date, end: date) -> list[date]:
+    """Inclusive list of calendar dates from `start` to `end`."""
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
 @click.command()
 @click.option(
     "--report-date",
@@ -113,6 +700,30 @@ def run(
     default=None,
     help="Report date (YYYY-MM-DD). Default: today.",
 )
+@click.option(
+    "--start",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="First report date of a range (YYYY-MM-DD, inclusive). Requires --end.",
+)
+@click.option(
+    "--end",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="Last report date of a range (YYYY-MM-DD, inclusive). Requires --start.",
+)
+@click.option(
+    "--dates",
+    default=None,
+    help="Comma-separated report dates (YYYY-MM-DD,...).",
+)
+@click.option(
+    "--concurrency",
+    type=int,
+    default=4,
+    envvar="MASSIVE_CONCURRENCY",
+    help="Dates ingested in parallel when several are given. Default: 4.",
+)
 @click.option("--limit", type=int, default=None, help="Not used for massive")
 @click.option(
     "--series-id",
@@ -120,7 +731,37 @@ def run(
     envvar="SERIES_ID",
     help="Massive series ID. Default: us_stocks_sip.",
 )
-def cli(report_date: datetime | None, limit: int | None, series_id: str) -> None:
+@click.option(
+    "--resolution",
+    type=click.Choice(sorted(REPORT_AGGREGATIONS_MAP)),
+    default="daily",
+    envvar="RESOLUTION",
+    help="Bar resolution. Minute bars are always streamed. Default: daily.",
+)
+@click.option(
+    "--streaming/--no-streaming",
+    default=False,
+    envvar="STREAMING",
+    help="Stream gzip CSV → Parquet row groups with bounded memory. Default: off.",
+)
+@click.option(
+    "--force",
+    is_flag=True,
+    default=False,
+    help="Re-ingest even if the source ETag matches an existing manifest.",
+)
+def cli(
+    report_date: datetime | None,
+    start: datetime | None,
+    end: datetime | None,
+    dates: str | None,
+    concurrency: int,
+    limit: int | None,
+    series_id: str,
+    resolution: str,
+    streaming: bool,
+    force: bool,
+) -> None:
     """Ingest data from Massive S3 to landing zone and bronze."""
     landing_zone = os.environ.get("LANDING_ZONE_BUCKET")
     assert landing_zone, "Set LANDING_ZONE_BUCKET in .env or environment"
@@ -130,7 +771,24 @@ def cli(report_date: datetime | None, limit: int | None, series_id: str) -> None
     assert aws_key, "Set MASSIVE_ACCESS_KEY_ID in .env or environment"
     aws_secret = os.environ.get("MASSIVE_SECRET_ACCESS_KEY")
     assert aws_secret, "Set MASSIVE_SECRET_ACCESS_KEY in .env or environment"
-    resolution = os.environ.get("RESOLUTION", "daily")
+
+    if (start is None) != (end is None):
+        raise click.UsageError("Provide both --start and --end")
+    report_dates: list[date] | None = None
+    if start is not None:
+        report_dates = _date_range(start.date(), end.date())
+    if dates:
+        report_dates = (report_dates or []) + [
+            datetime.strptime(d.strip(), "%Y-%m-%d").date()
+            for d in dates.split(",")
+            if d.strip()
+        ]
+    if report_dates is not None:
+        if report_date is not None:
+            raise click.UsageError("Use --report-date or --start/--end/--dates, not both")
+        report_dates = sorted(set(report_dates))
+        if not report_dates:
+            raise click.UsageError("Date range is empty")
 
     rd = report_date.date() if report_date else None
     run(
@@ -141,4 +799,8 @@ def cli(report_date: datetime | None, limit: int | None, series_id: str) -> None
         series_id=series_id,
         resolution=resolution,
         report_date=rd,
+        report_dates=report_dates,
+        streaming=streaming,
+        concurrency=concurrency,
+        force=force,
     )
@@ -8,6 +8,7 @@ from processors import processors
 from indicators import indicators
 from publishers import publishers
 from backfill import cli as backfill_cli
+from compact import cli as compact_cli
 
 
 @click.group()
@@ -21,6 +22,7 @@ cli.add_command(processors)
 cli.add_command(indicators)
 cli.add_command(publishers)
 cli.add_command(backfill_cli, "backfill")
+cli.add_command(compact_cli, "compact")
 
 
 if __name__ == "__main__":
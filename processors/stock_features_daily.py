@@ -1,11 +1,21 @@
+import hashlib
+import io
 import os
 import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta
+from functools import partial
 
 import click
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from google.cloud import bigquery, storage
 
+from common import bq, gcs, parquet
+from common import features as feature_engine
+
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
@@ -17,62 +27,174 @@ SILVER_BUCKET = os.getenv("SILVER_BUCKET", f"{PROJECT_ID}-silver")
 
 SERIES = os.getenv("SERIES", "us_stocks_sip")
 FREQUENCY = os.getenv("FREQUENCY", "daily")
-LOOKBACK_DAYS = int(os.getenv("LOOKBACK_DAYS", "400"))
+# Unset: derived from the requested features' warm-up (see common/features.py).
+LOOKBACK_DAYS = int(os.getenv("LOOKBACK_DAYS")) if os.getenv("LOOKBACK_DAYS") else None
 
 SYMBOL_COL = os.getenv("SYMBOL_COL", "ticker")
 CLOSE_COL = os.getenv("CLOSE_COL", "close")
 ISSUED_DATE_COL = os.getenv("ISSUED_DATE_COL", "issued_date")
 
+FEATURES = os.getenv("FEATURES", ",".join(feature_engine.DEFAULT_FEATURES))
+# Historical silver output computed sma_50 with min_periods=1; keep it stable.
+MIN_PERIODS = {"sma_50": 1}
+# Older checkpoints than this (calendar days) trigger a full recompute. Bronze
+# trade dates this recent that a checkpoint never absorbed (late or failed
+# ingests) trigger one too.
+MAX_GAP_DAYS = int(os.getenv("MAX_GAP_DAYS", "7"))
+STATE_PREFIX = f"_state/processor=stock_features_daily/series={SERIES}/frequency={FREQUENCY}"
+
+# as_of: one file per run holding the whole computed window (default).
+# trade_date: one file per trading day, rewritten only when its rows change.
+# Readers (indicators/spx_gold_daily.py) take the same SILVER_LAYOUT setting.
+SILVER_LAYOUT = os.getenv("SILVER_LAYOUT", "as_of")
+PARTITION_PREFIX = f"stock_features/series={SERIES}/frequency={FREQUENCY}/"
+WRITE_CONCURRENCY = int(os.getenv("WRITE_CONCURRENCY", "8"))
+
+# Feature computation is sharded by symbol across this many processes once the
+# input is large enough to amortise starting them.
+WORKERS = int(os.getenv("PROCESSOR_WORKERS", str(os.cpu_count() or 1)))
+PARALLEL_MIN_ROWS = int(os.getenv("PARALLEL_MIN_ROWS", "200000"))
+
 
 def run(
     *,
     end_dt: date | None = None,
-    lookback_days: int = LOOKBACK_DAYS,
+    start_dt: date | None = None,
+    lookback_days: int | None = LOOKBACK_DAYS,
+    features: tuple[str, ...] = feature_engine.DEFAULT_FEATURES,
+    incremental: bool = False,
+    max_gap_days: int = MAX_GAP_DAYS,
+    layout: str = SILVER_LAYOUT,
+    workers: int = WORKERS,
+    shard_files: bool = False,
 ) -> None:
+    """Compute features as of `end_dt`, or for every day in `start_dt`..`end_dt`.
+
+    A range reads bronze once, from `start_dt - lookback_days` to `end_dt`,
+    and writes each day's output from that single computation. With
+    `shard_files` (as_of layout, single date) every worker writes its own
+    part file instead of the parent writing one file. An incremental run with
+    no bronze rows after its checkpoint is a no-op.
+    """
     if end_dt is None:
         end_dt = datetime.today().date()
-    start_dt = end_dt - timedelta(days=lookback_days)
+    if lookback_days is None:
+        lookback_days = feature_engine.lookback_days(features)
+        logging.info(f"Lookback for {', '.join(features)}: {lookback_days} days")
 
-    logging.info(f"Reading data from {start_dt} to {end_dt}")
-    df = _read_market_data(start_dt, end_dt)
-    logging.info(f"Recv'd. {len(df)} rows")
+    storage_client = gcs.pooled_storage_client(WRITE_CONCURRENCY)
+    try:
+        checkpoint, seen = None, set()
+        if incremental and start_dt is None:
+            checkpoint = _load_checkpoint(storage_client, end_dt, features, max_gap_days)
+        if checkpoint is not None:
+            state_as_of, state, seen = checkpoint
+            df = _read_delta(state_as_of, seen, end_dt, max_gap_days)
+            if df is None:
+                checkpoint, seen = None, set()
+            elif df.empty:
+                logging.info(f"No bronze rows after checkpoint {state_as_of}; nothing to do")
+                return
+            else:
+                # Symbols a full recompute would no longer see start over.
+                state = state[state["last_date"] >= end_dt - timedelta(days=lookback_days)]
+        if checkpoint is None:
+            read_from = (start_dt or end_dt) - timedelta(days=lookback_days)
+            state = feature_engine.empty_state(features)
+            logging.info(f"Reading data from {read_from} to {end_dt}")
+            df = _read_market_data(read_from, end_dt)
+            if df.empty:
+                raise SystemExit("No rows returned from Bronze")
+        logging.info(f"Recv'd. {len(df)} rows")
 
-    blob_path = _gcp_blob_path(end_dt)
-    logging.info(f"Storing to silver: {blob_path}")
-    _store_to_silver(df, blob_path)
+        df = df.sort_values(["symbol", "trade_date"], ignore_index=True)
+        workers = workers if len(df) >= PARALLEL_MIN_ROWS else 1
+        if workers > 1:
+            logging.info(f"Computing features across {workers} processes")
+        shard_writer = partial(_write_shard, end_dt) if shard_files else None
+        df, next_state = feature_engine.advance_parallel(
+            state,
+            df,
+            features,
+            workers=workers,
+            shard_writer=shard_writer,
+            min_periods=MIN_PERIODS,
+        )
+
+        if shard_files:
+            logging.info(f"Stored {max(workers, 1)} part files for as_of={end_dt}")
+        elif layout == "trade_date":
+            first = _first_complete_date(df, features, resumed=checkpoint is not None)
+            if first is not None and start_dt is not None:
+                first = max(first, start_dt)
+            _store_partitions(storage_client, df, first)
+        elif start_dt is None:
+            blob_path = _gcp_blob_path(end_dt)
+            logging.info(f"Storing to silver: {blob_path}")
+            _store_to_silver(storage_client, df, blob_path)
+        else:
+            _store_as_of_range(storage_client, df, start_dt, end_dt, lookback_days)
+        # Checkpoint at the last trade date absorbed, not end_dt: bronze days
+        # that land after this run are still read by the next one.
+        last = df["trade_date"].max()
+        seen = {
+            d
+            for d in seen | set(df["trade_date"].unique())
+            if d > last - timedelta(days=max_gap_days)
+        }
+        _store_checkpoint(storage_client, next_state, last, features, seen)
+    finally:
+        storage_client.close()
     logging.info("Done")
     print(df.tail())
 
 
 def _read_market_data(start_dt: date, end_dt: date) -> pd.DataFrame:
-    bq = bigquery.Client(project=PROJECT_ID)
-    try:
-        sql = f"""
-        SELECT
-          {SYMBOL_COL} AS symbol,
-          SAFE_CAST({ISSUED_DATE_COL} AS DATE) AS trade_date,
-          SAFE_CAST({CLOSE_COL} AS FLOAT64) AS close
-        FROM `{PROJECT_ID}`.`{BRONZE_DATA_LAKE}`.`{BRONZE_BQ_TABLE}`
-        WHERE series = @series
-          AND frequency = @frequency
-          AND SAFE_CAST({ISSUED_DATE_COL} AS DATE) BETWEEN @start_dt AND @end_dt
-          AND {CLOSE_COL} IS NOT NULL
-        ORDER BY symbol, trade_date
-        """
-        job_config = bigquery.QueryJobConfig(
-            query_parameters=[
-                bigquery.ScalarQueryParameter("series", "STRING", SERIES),
-                bigquery.ScalarQueryParameter("frequency", "STRING", FREQUENCY),
-                bigquery.ScalarQueryParameter("start_dt", "DATE", start_dt),
-                bigquery.ScalarQueryParameter("end_dt", "DATE", end_dt),
-            ]
+    sql = f"""
+    SELECT
+      {SYMBOL_COL} AS symbol,
+      SAFE_CAST({ISSUED_DATE_COL} AS DATE) AS trade_date,
+      SAFE_CAST({CLOSE_COL} AS FLOAT64) AS close
+    FROM `{PROJECT_ID}`.`{BRONZE_DATA_LAKE}`.`{BRONZE_BQ_TABLE}`
+    WHERE series = @series
+      AND frequency = @frequency
+      AND SAFE_CAST({ISSUED_DATE_COL} AS DATE) BETWEEN @start_dt AND @end_dt
+      AND {CLOSE_COL} IS NOT NULL
+    ORDER BY symbol, trade_date
+    """
+    return bq.query_dataframe(
+        sql,
+        [
+            bigquery.ScalarQueryParameter("series", "STRING", SERIES),
+            bigquery.ScalarQueryParameter("frequency", "STRING", FREQUENCY),
+            bigquery.ScalarQueryParameter("start_dt", "DATE", start_dt),
+            bigquery.ScalarQueryParameter("end_dt", "DATE", end_dt),
+        ],
+        project=PROJECT_ID,
+        dictionary_columns=("symbol",),
+    )
+
+
+def _read_delta(
+    as_of: date, seen: set[date], end_dt: date, recheck_days: int
+) -> pd.DataFrame | None:
+    """Bronze rows after checkpoint `as_of`, or None when a full recompute is needed.
+
+    The last `recheck_days` up to `as_of` are re-read too: a trade date there
+    that the checkpoint never absorbed (ingested late, or missing when it was
+    written) means the checkpointed state skipped it.
+    """
+    df = _read_market_data(as_of - timedelta(days=max(recheck_days, 1) - 1), end_dt)
+    late = sorted(
+        d for d in df["trade_date"].unique() if d <= as_of and d not in seen
+    )
+    if late:
+        logging.warning(
+            f"Bronze has trade dates checkpoint {as_of} did not absorb "
+            f"({', '.join(map(str, late))}); running a full recompute"
         )
-        df = bq.query(sql, job_config=job_config).to_dataframe()
-        if df.empty:
-            raise SystemExit("No rows returned from Bronze")
-        return df
-    finally:
-        bq.close()
+        return None
+    return df[df["trade_date"] > as_of].reset_index(drop=True)
 
 
 def _gcp_blob_path(end_date: date) -> str:
@@ -83,26 +205,222 @@ def _gcp_blob_path(end_date: date) -> str:
     )
 
 
-def _store_to_silver(df: pd.DataFrame, to: str) -> None:
-    df = df.sort_values(["symbol", "trade_date"])
-    df["sma_50"] = df.groupby("symbol")["close"].transform(
-        lambda s: s.rolling(50, min_periods=1).mean()
+def _checkpoint_blob_path(as_of: date) -> str:
+    return f"{STATE_PREFIX}/as_of={as_of:%Y-%m-%d}/state.parquet"
+
+
+def _load_checkpoint(
+    storage_client: storage.Client,
+    end_dt: date,
+    features: tuple[str, ...],
+    max_gap_days: int,
+) -> tuple[date, pd.DataFrame, set[date]] | None:
+    """Latest checkpoint before `end_dt` with the recent trade dates it absorbed,
+    or None if a full recompute is needed."""
+    pattern = re.compile(r"/as_of=(\d{4}-\d{2}-\d{2})/state\.parquet$")
+    candidates = {}
+    for blob in storage_client.list_blobs(SILVER_BUCKET, prefix=f"{STATE_PREFIX}/"):
+        m = pattern.search(blob.name)
+        if m:
+            as_of = datetime.strptime(m.group(1), "%Y-%m-%d").date()
+            if as_of < end_dt:
+                candidates[as_of] = blob
+    if not candidates:
+        logging.info("No checkpoint found; running a full recompute")
+        return None
+
+    as_of = max(candidates)
+    if (end_dt - as_of).days > max_gap_days:
+        logging.warning(
+            f"Checkpoint {as_of} is more than {max_gap_days} days old; running a full recompute"
+        )
+        return None
+    table = pq.read_table(io.BytesIO(candidates[as_of].download_as_bytes()))
+    metadata = table.schema.metadata or {}
+    saved = metadata.get(b"features", b"").decode()
+    if saved != ",".join(features):
+        logging.warning(
+            f"Checkpoint {as_of} has features [{saved}]; running a full recompute"
+        )
+        return None
+    if b"trade_dates" not in metadata:
+        logging.warning(f"Checkpoint {as_of} predates trade date tracking; running a full recompute")
+        return None
+    seen = {
+        datetime.strptime(d, "%Y-%m-%d").date()
+        for d in metadata[b"trade_dates"].decode().split(",")
+        if d
+    }
+    logging.info(f"Resuming from checkpoint {as_of} ({table.num_rows} symbols)")
+    return as_of, table.to_pandas(), seen
+
+
+def _store_checkpoint(
+    storage_client: storage.Client,
+    state: pd.DataFrame,
+    as_of: date,
+    features: tuple[str, ...],
+    trade_dates: set[date],
+) -> None:
+    table = pa.Table.from_pandas(state, preserve_index=False)
+    table = table.replace_schema_metadata(
+        {
+            **(table.schema.metadata or {}),
+            b"features": ",".join(features).encode(),
+            b"trade_dates": ",".join(f"{d:%Y-%m-%d}" for d in sorted(trade_dates)).encode(),
+        }
     )
-    df["sma_200"] = df.groupby("symbol")["close"].transform(
-        lambda s: s.rolling(200, min_periods=200).mean()
+    buf = io.BytesIO()
+    pq.write_table(table, buf)
+    blob = storage_client.bucket(SILVER_BUCKET).blob(_checkpoint_blob_path(as_of))
+    blob.upload_from_string(buf.getvalue(), content_type="application/octet-stream")
+
+
+def _store_to_silver(storage_client: storage.Client, df: pd.DataFrame, to: str) -> None:
+    # Sorted row groups let direct readers (common/lake.py) skip other symbols.
+    bucket = storage_client.bucket(SILVER_BUCKET)
+    blob = bucket.blob(to)
+    blob.upload_from_string(
+        parquet.to_parquet_bytes(
+            pa.Table.from_pandas(df, preserve_index=False),
+            sort_by=("symbol", "trade_date"),
+            dictionary_columns=("symbol",),
+        ),
+        content_type="application/octet-stream",
     )
 
+
+def _write_shard(as_of: date, shard: int, df: pd.DataFrame) -> None:
+    """Runs in a feature worker: write that shard's rows as one part of the as_of file."""
+    path = _gcp_blob_path(as_of).replace(".parquet", f"-part-{shard:03}.parquet")
     storage_client = storage.Client()
     try:
-        bucket = storage_client.bucket(SILVER_BUCKET)
-        blob = bucket.blob(to)
-        blob.upload_from_string(
-            df.to_parquet(index=False), content_type="application/octet-stream"
-        )
+        _store_to_silver(storage_client, df, path)
     finally:
         storage_client.close()
 
 
+def _store_as_of_range(
+    storage_client: storage.Client,
+    df: pd.DataFrame,
+    start_dt: date,
+    end_dt: date,
+    lookback_days: int,
+) -> None:
+    """Write the as_of file for each trading day in range, sliced from one computation."""
+    trade_dates = df["trade_date"]
+    as_of_dates = [
+        d
+        for d in trade_dates.drop_duplicates().sort_values().to_numpy(dtype=object)
+        if start_dt <= d <= end_dt
+    ]
+
+    def _upload(as_of: date) -> None:
+        window = df[
+            (trade_dates >= as_of - timedelta(days=lookback_days)) & (trade_dates <= as_of)
+        ]
+        _store_to_silver(storage_client, window, _gcp_blob_path(as_of))
+
+    logging.info(f"Storing {len(as_of_dates)} as_of files to silver ({start_dt}..{end_dt})")
+    with ThreadPoolExecutor(max_workers=WRITE_CONCURRENCY) as pool:
+        list(pool.map(_upload, as_of_dates))
+
+
+def _partition_blob_path(trade_date: date) -> str:
+    fmt_date = trade_date.strftime("%Y-%m-%d")
+    return (
+        f"{PARTITION_PREFIX}trade_date={fmt_date}/"
+        f"stock_features_daily-{fmt_date}.parquet"
+    )
+
+
+def _first_complete_date(
+    df: pd.DataFrame, features: tuple[str, ...], *, resumed: bool
+) -> date | None:
+    """Earliest trade date whose features don't depend on where the read window began.
+
+    A full recompute starts every window at the edge of the lookback, so its
+    first `warmup_rows` trading days are truncated and must not overwrite
+    earlier, complete partitions. Rows advanced from a checkpoint are complete.
+    """
+    dates = df["trade_date"].drop_duplicates().sort_values().to_numpy(dtype=object)
+    if resumed:
+        return dates[0] if len(dates) else None
+    warmup = feature_engine.warmup_rows(features)
+    return dates[warmup - 1] if len(dates) >= warmup else None
+
+
+def _content_hash(day: pd.DataFrame) -> str:
+    return hashlib.sha256(
+        pd.util.hash_pandas_object(day, index=False).to_numpy().tobytes()
+    ).hexdigest()
+
+
+def _store_partitions(
+    storage_client: storage.Client, df: pd.DataFrame, first: date | None
+) -> None:
+    """Write one Parquet file per trade date from `first` on, skipping unchanged days.
+
+    Each file carries a hash of its rows in object metadata; a day is
+    uploaded only when that hash differs from the stored one.
+    """
+    if first is None:
+        logging.warning("Not enough history for complete features; nothing written")
+        return
+    df = df[df["trade_date"] >= first]
+    last = df["trade_date"].max()
+    stored = {
+        blob.name: (blob.metadata or {}).get("content_sha256")
+        for blob in storage_client.list_blobs(
+            SILVER_BUCKET,
+            prefix=PARTITION_PREFIX,
+            start_offset=f"{PARTITION_PREFIX}trade_date={first:%Y-%m-%d}",
+            end_offset=f"{PARTITION_PREFIX}trade_date={last:%Y-%m-%d}~",
+        )
+    }
+
+    changed = []
+    for trade_date, day in df.groupby("trade_date", sort=True, observed=True):
+        # The date is the hive partition key, not a file column.
+        day = day.drop(columns="trade_date")
+        path = _partition_blob_path(trade_date)
+        digest = _content_hash(day)
+        if stored.get(path) != digest:
+            changed.append((path, day, digest))
+
+    bucket = storage_client.bucket(SILVER_BUCKET)
+
+    def _upload(item: tuple[str, pd.DataFrame, str]) -> None:
+        path, day, digest = item
+        blob = bucket.blob(path)
+        blob.metadata = {"content_sha256": digest}
+        blob.upload_from_string(
+            parquet.to_parquet_bytes(
+                pa.Table.from_pandas(day, preserve_index=False),
+                sort_by=("symbol",),
+                dictionary_columns=("symbol",),
+            ),
+            content_type="application/octet-stream",
+        )
+
+    with ThreadPoolExecutor(max_workers=WRITE_CONCURRENCY) as pool:
+        list(pool.map(_upload, changed))
+    logging.info(
+        f"Silver partitions {first}..{last}: {len(changed)} written, "
+        f"{df['trade_date'].nunique() - len(changed)} unchanged"
+    )
+
+
+def _parse_features(_ctx, _param, value: str) -> tuple[str, ...]:
+    names = tuple(n.strip() for n in value.split(",") if n.strip())
+    try:
+        for name in names:
+            feature_engine.parse_feature(name)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    return names
+
+
 @click.command()
 @click.option(
     "--report-date",
@@ -110,16 +428,86 @@ def _store_to_silver(df: pd.DataFrame, to: str) -> None:
     default=None,
     help="As-of date (YYYY-MM-DD). Default: today.",
 )
+@click.option(
+    "--start",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="First as-of date of a range (YYYY-MM-DD, inclusive). Requires --end.",
+)
+@click.option(
+    "--end",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="Last as-of date of a range (YYYY-MM-DD, inclusive). Requires --start.",
+)
 @click.option(
     "--lookback-days",
     type=int,
     default=LOOKBACK_DAYS,
-    help=f"Days of history to read. Default: {LOOKBACK_DAYS}",
+    help="Days of history to read. Default: derived from the features' warm-up.",
+)
+@click.option(
+    "--features",
+    default=FEATURES,
+    callback=_parse_features,
+    help=f"Comma-separated features, e.g. sma_50,ema_20,rsi_14. Default: {FEATURES}",
+)
+@click.option(
+    "--incremental/--full-recompute",
+    default=False,
+    envvar="INCREMENTAL",
+    help="Resume from the previous as_of checkpoint and read only new bronze days; "
+    "falls back to a full recompute when the checkpoint is missing or stale. "
+    "Default: full recompute.",
+)
+@click.option(
+    "--layout",
+    type=click.Choice(["as_of", "trade_date"]),
+    default=SILVER_LAYOUT,
+    envvar="SILVER_LAYOUT",
+    help="as_of: one file per run with the whole window; trade_date: one file per "
+    f"trading day, written only when changed. Default: {SILVER_LAYOUT}.",
+)
+@click.option(
+    "--workers",
+    type=int,
+    default=WORKERS,
+    help=f"Processes to shard feature computation across. Default: {WORKERS}.",
+)
+@click.option(
+    "--shard-files",
+    is_flag=True,
+    default=False,
+    help="Each worker writes its own part file (as_of layout, single date only).",
 )
 def cli(
     report_date: datetime | None,
-    lookback_days: int,
+    start: datetime | None,
+    end: datetime | None,
+    lookback_days: int | None,
+    features: tuple[str, ...],
+    incremental: bool,
+    layout: str,
+    workers: int,
+    shard_files: bool,
 ) -> None:
-    """Compute stock features (SMA50, SMA200) from bronze to silver."""
-    end_dt = report_date.date() if report_date else None
-    run(end_dt=end_dt, lookback_days=lookback_days)
+    """Compute stock features (SMAs, EMA, RSI, volatility, ...) from bronze to silver."""
+    if (start is None) != (end is None):
+        raise click.UsageError("Provide both --start and --end")
+    if start is not None and report_date is not None:
+        raise click.UsageError("Use --report-date or --start/--end, not both")
+    if start is not None and start > end:
+        raise click.UsageError("Date range is empty")
+    if shard_files and (layout != "as_of" or start is not None):
+        raise click.UsageError("--shard-files needs the as_of layout and a single date")
+    end_dt = (end or report_date).date() if (end or report_date) else None
+    run(
+        end_dt=end_dt,
+        start_dt=start.date() if start else None,
+        lookback_days=lookback_days,
+        features=features,
+        incremental=incremental,
+        layout=layout,
+        workers=workers,
+        shard_files=shard_files,
+    )
@@ -0,0 +1,138 @@
+"""Compute spx_gold_daily and publish spx_gold_trend in one process.
+
+The indicator still writes its silver Parquet (lineage, BigQuery tables,
+backfills), but the rows it just computed go straight to the gold upsert
+instead of being read back through `silver_gold_to_spx_ext`: no BigQuery job,
+second container start or object-store read on the daily critical path.
+"""
+
+from datetime import date, datetime
+
+import click
+import pandas as pd
+
+from indicators import spx_gold_daily
+from publishers import spx_gold_trend
+
+# Indicator output columns under the names the publisher's silver query uses.
+GOLD_INPUT_COLUMNS = {
+    "dt": "dt",
+    "indicator": "indicator",
+    "base_close": "gold_close",
+    "quote_close": "spx_close",
+    "value": "gold_to_spx_ratio",
+    "inverse_value": "spx_to_gold_ratio",
+    "trend": "trend",
+    "sma_50": "sma_50",
+    "sma_200": "sma_200",
+}
+
+
+def run(
+    *,
+    report_date: date | None = None,
+    start_date: date | None = None,
+    source: str = spx_gold_daily.SILVER_SOURCE,
+    cache_url: str | None = spx_gold_daily.INDICATOR_CACHE,
+    incremental: bool = False,
+) -> None:
+    """Run the indicator for `report_date` (or `start_date`..`report_date`),
+    then upsert its INDICATOR_ID rows into gold in one transaction."""
+    rows = spx_gold_daily.run(
+        end_dt=report_date,
+        start_dt=start_date,
+        source=source,
+        cache_url=cache_url,
+        incremental=incremental,
+    )
+    ind = _gold_input(rows)
+    if ind.empty:
+        raise SystemExit(
+            f"Indicator produced no {spx_gold_trend.INDICATOR_ID} rows. Check RATIO_PAIRS."
+        )
+    gold_rows = (
+        spx_gold_trend._make_gold_row(ind)
+        if start_date is None
+        else spx_gold_trend._make_gold_rows(ind)
+    )
+
+    conn = spx_gold_trend._get_db_connection()
+    try:
+        counts = spx_gold_trend._upsert_gold(conn, gold_rows)
+    finally:
+        conn.close()
+    print(
+        f"Upserted {len(gold_rows)} rows into {spx_gold_trend.GOLD_TABLE} "
+        f"for dt={gold_rows['dt'].min()}..{gold_rows['dt'].max()}: "
+        f"{spx_gold_trend._format_counts(counts)}"
+    )
+
+
+def _gold_input(rows: pd.DataFrame) -> pd.DataFrame:
+    """The publisher's silver read, from in-memory indicator rows."""
+    rows = rows[rows["indicator"] == spx_gold_trend.INDICATOR_ID]
+    return rows[list(GOLD_INPUT_COLUMNS)].rename(columns=GOLD_INPUT_COLUMNS)
+
+
+@click.command()
+@click.option(
+    "--report-date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="Report date (YYYY-MM-DD). Default: REPORT_DATE env or today.",
+)
+@click.option(
+    "--start",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="First date of a range (YYYY-MM-DD, inclusive). Requires --end.",
+)
+@click.option(
+    "--end",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="Last date of a range (YYYY-MM-DD, inclusive). Requires --start.",
+)
+@click.option(
+    "--source",
+    type=click.Choice(["bigquery", "lake"]),
+    default=spx_gold_daily.SILVER_SOURCE,
+    envvar="SILVER_SOURCE",
+    help=f"Where the indicator reads silver prices. Default: {spx_gold_daily.SILVER_SOURCE}.",
+)
+@click.option(
+    "--cache-dir",
+    "cache_url",
+    default=spx_gold_daily.INDICATOR_CACHE,
+    envvar="INDICATOR_CACHE",
+    help="Indicator result cache (local directory or gs:// URL). Default: off.",
+)
+@click.option(
+    "--incremental/--full-recompute",
+    default=False,
+    envvar="INCREMENTAL",
+    help="Continue the indicator from its previous checkpoint. Default: full recompute.",
+)
+def cli(
+    report_date: datetime | None,
+    start: datetime | None,
+    end: datetime | None,
+    source: str,
+    cache_url: str | None,
+    incremental: bool,
+) -> None:
+    """Compute gold-to-SPX and publish it to gold Postgres without a silver read-back."""
+    if (start is None) != (end is None):
+        raise click.UsageError("Provide both --start and --end")
+    if start is not None and report_date is not None:
+        raise click.UsageError("Use --report-date or --start/--end, not both")
+    if start is not None and start > end:
+        raise click.UsageError("Date range is empty")
+    rd = (end or report_date).date() if (end or report_date) else None
+    run(
+        report_date=rd,
+        start_date=start.date() if start else None,
+        source=source,
+        cache_url=cache_url,
+        incremental=incremental,
+    )
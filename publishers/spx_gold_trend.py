@@ -1,3 +1,4 @@
+import io
 import os
 from datetime import date, datetime
 import logging
@@ -7,6 +8,8 @@ import pandas as pd
 import psycopg2
 from google.cloud import bigquery
 
+from common import bq
+
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
@@ -35,11 +38,31 @@ GOLD_POSTGRES_PORT = int(os.getenv("GOLD_POSTGRES_PORT", "5432"))
 GOLD_POSTGRES_USER = os.getenv("GOLD_POSTGRES_USER", "macrocontext")
 GOLD_POSTGRES_DB = os.getenv("GOLD_POSTGRES_DB", "macrocontext-db")
 
+# Derived tables next to GOLD_TABLE, refreshed in the publishing transaction
+# for the dates it changed: <table>_weekly / <table>_monthly rollups and
+# <table>_regimes (one row per trend run).
+ROLLUP_PERIODS = {"weekly": "week", "monthly": "month"}
+
+GOLD_COLUMNS = [
+    "dt",
+    "indicator",
+    "trend",
+    "spx_close",
+    "gold_close",
+    "gold_to_spx_ratio",
+    "spx_to_gold_ratio",
+    "sma_50",
+    "sma_200",
+]
+
 
 def run(
     *,
     report_date: date | None = None,
+    start_date: date | None = None,
 ) -> None:
+    """Publish the indicator row for `report_date`, or every row from
+    `start_date` through `report_date` in one query and one transaction."""
     if report_date is None:
         rd = os.environ.get("REPORT_DATE")
         report_date = (
@@ -48,74 +71,109 @@ def run(
             else datetime.now().date()
         )
 
-    password = os.environ["GOLD_POSTGRES_PASSWORD"]
-    conn = psycopg2.connect(
-        user=GOLD_POSTGRES_USER,
-        password=password,
-        database=GOLD_POSTGRES_DB,
-        host=GOLD_POSTGRES_HOST,
-        port=GOLD_POSTGRES_PORT,
-    )
-
+    conn = _get_db_connection()
     try:
         logging.info(f"Connected to database: {conn.dsn}")
-        ind = _read_indicator(report_date.strftime("%Y-%m-%d"))
-        logging.info(f"\n{ind}")
-        gold_row = _make_gold_row(ind)
-        logging.info(f"\n{gold_row}")
-        _upsert_gold(conn, gold_row)
-        print(f"Upserted {GOLD_TABLE} for dt={report_date}")
+        if start_date is None:
+            ind = _read_indicator(report_date, report_date)
+            logging.info(f"\n{ind}")
+            gold_row = _make_gold_row(ind)
+            logging.info(f"\n{gold_row}")
+            counts = _upsert_gold(conn, gold_row)
+            print(f"Upserted {GOLD_TABLE} for dt={report_date}: {_format_counts(counts)}")
+        else:
+            ind = _read_indicator(start_date, report_date)
+            gold_rows = _make_gold_rows(ind)
+            counts = _upsert_gold(conn, gold_rows)
+            print(
+                f"Upserted {len(gold_rows)} rows into {GOLD_TABLE} "
+                f"for dt={start_date}..{report_date}: {_format_counts(counts)}"
+            )
     finally:
         conn.close()
 
 
 def _get_db_connection() -> psycopg2.extensions.connection:
-    return psycopg2.connect(
+    """Connect to the gold database, creating the gold tables if missing."""
+    conn = psycopg2.connect(
         user=GOLD_POSTGRES_USER,
         password=os.environ["GOLD_POSTGRES_PASSWORD"],
         database=GOLD_POSTGRES_DB,
         host=GOLD_POSTGRES_HOST,
         port=GOLD_POSTGRES_PORT,
     )
+    try:
+        _create_gold_tables(conn)
+    except Exception:
+        conn.close()
+        raise
+    return conn
 
 
-def _read_indicator(report_date: str) -> pd.DataFrame:
-    bq = bigquery.Client(project=PROJECT_ID)
-    try:
-        sql = f"""
-        SELECT
-          SAFE_CAST(dt AS DATE) AS dt,
-          SAFE_CAST(indicator AS STRING) AS indicator,
-          SAFE_CAST(gold_close AS FLOAT64) AS gold_close,
-          SAFE_CAST(spx_close AS FLOAT64) AS spx_close,
-          SAFE_CAST(value AS FLOAT64) AS gold_to_spx_ratio,
-          SAFE_CAST(inverse_value AS FLOAT64) AS spx_to_gold_ratio,
-          SAFE_CAST(trend AS STRING) AS trend,
-          SAFE_CAST(sma_50 AS FLOAT64) AS sma_50,
-          SAFE_CAST(sma_200 AS FLOAT64) AS sma_200
-        FROM `{PROJECT_ID}`.`{SILVER_DATA_LAKE}`.`{SILVER_BQ_INDICATOR_TABLE}`
-        WHERE indicator = @indicator
-          AND frequency IN ('daily', 'Daily')
-          AND SAFE_CAST(dt AS DATE) = @report_date
-        ORDER BY dt, indicator
-        """
-        job_config = bigquery.QueryJobConfig(
-            query_parameters=[
-                bigquery.ScalarQueryParameter("indicator", "STRING", INDICATOR_ID),
-                bigquery.ScalarQueryParameter("report_date", "DATE", report_date),
-            ]
+def _create_gold_tables(conn: psycopg2.extensions.connection) -> None:
+    """Create GOLD_TABLE and its derived tables; run once per connection,
+    ahead of any upserts on it."""
+    schema, _ = GOLD_TABLE.split(".", 1)
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            CREATE SCHEMA IF NOT EXISTS {schema};
+            CREATE TABLE IF NOT EXISTS {GOLD_TABLE} (
+              dt DATE PRIMARY KEY,
+              indicator TEXT NOT NULL,
+              trend TEXT NOT NULL,
+              spx_close DOUBLE PRECISION NOT NULL,
+              gold_close DOUBLE PRECISION NOT NULL,
+              gold_to_spx_ratio DOUBLE PRECISION NOT NULL,
+              spx_to_gold_ratio DOUBLE PRECISION NOT NULL,
+              sma_50 DOUBLE PRECISION NOT NULL,
+              sma_200 DOUBLE PRECISION NOT NULL
+            );
+            """
         )
-        df = bq.query(sql, job_config=job_config).to_dataframe()
-        if df.empty:
-            raise SystemExit(
-                "No rows returned from Silver. Check SILVER_BQ_TABLE / columns / dates."
-            )
-        return df
-    finally:
-        bq.close()
+        cur.execute(_derived_ddl())
+    conn.commit()
+
+
+def _read_indicator(start_date: date, end_date: date) -> pd.DataFrame:
+    sql = f"""
+    SELECT
+      SAFE_CAST(dt AS DATE) AS dt,
+      SAFE_CAST(indicator AS STRING) AS indicator,
+      SAFE_CAST(gold_close AS FLOAT64) AS gold_close,
+      SAFE_CAST(spx_close AS FLOAT64) AS spx_close,
+      SAFE_CAST(value AS FLOAT64) AS gold_to_spx_ratio,
+      SAFE_CAST(inverse_value AS FLOAT64) AS spx_to_gold_ratio,
+      SAFE_CAST(trend AS STRING) AS trend,
+      SAFE_CAST(sma_50 AS FLOAT64) AS sma_50,
+      SAFE_CAST(sma_200 AS FLOAT64) AS sma_200
+    FROM `{PROJECT_ID}`.`{SILVER_DATA_LAKE}`.`{SILVER_BQ_INDICATOR_TABLE}`
+    WHERE indicator = @indicator
+      AND frequency IN ('daily', 'Daily')
+      AND SAFE_CAST(dt AS DATE) BETWEEN @start_date AND @end_date
+    ORDER BY dt, indicator
+    """
+    df = bq.query_dataframe(
+        sql,
+        [
+            bigquery.ScalarQueryParameter("indicator", "STRING", INDICATOR_ID),
+            bigquery.ScalarQueryParameter("start_date", "DATE", start_date),
+            bigquery.ScalarQueryParameter("end_date", "DATE", end_date),
+        ],
+        project=PROJECT_ID,
+    )
+    if df.empty:
+        raise SystemExit(
+            "No rows returned from Silver. Check SILVER_BQ_TABLE / columns / dates."
+        )
+    return df
 
 
 def _make_gold_row(indicator_df: pd.DataFrame) -> pd.DataFrame:
+    return _make_gold_rows(indicator_df).tail(1)
+
+
+def _make_gold_rows(indicator_df: pd.DataFrame) -> pd.DataFrame:
     required = {
         "dt",
         "indicator",
@@ -151,59 +209,211 @@ def _make_gold_row(indicator_df: pd.DataFrame) -> pd.DataFrame:
             "Check upstream indicator data."
         )
 
-    return out.tail(1)
+    # One row per dt: the merge cannot update the same key twice.
+    return out.sort_values("dt", kind="stable").drop_duplicates("dt", keep="last")
 
 
-def _upsert_gold(conn: psycopg2.extensions.connection, df: pd.DataFrame) -> None:
-    schema, _ = GOLD_TABLE.split(".", 1)
-    create_sql = f"""
-    CREATE SCHEMA IF NOT EXISTS {schema};
-    CREATE TABLE IF NOT EXISTS {GOLD_TABLE} (
-      dt DATE PRIMARY KEY,
-      indicator TEXT NOT NULL,
+def _upsert_gold(
+    conn: psycopg2.extensions.connection, df: pd.DataFrame
+) -> dict[str, int]:
+    """Merge `df` into GOLD_TABLE, writing only new or changed rows.
+
+    The tables must exist (`_get_db_connection` creates them). Returns
+    counts of inserted, updated and unchanged rows.
+    """
+    # Rows are streamed into a temp table with COPY and merged with one
+    # INSERT ... ON CONFLICT, so a whole range is a single statement. Rows
+    # equal to the stored ones are skipped (no new tuple, no WAL);
+    # RETURNING reports what was written, xmax = 0 marking inserts.
+    stage_sql = f"""
+    CREATE TEMP TABLE gold_stage (LIKE {GOLD_TABLE} INCLUDING DEFAULTS)
+    ON COMMIT DROP;
+    """
+    columns = ", ".join(GOLD_COLUMNS)
+    values = [c for c in GOLD_COLUMNS if c != "dt"]
+    updates = ",\n      ".join(f"{c} = EXCLUDED.{c}" for c in values)
+    merge_sql = f"""
+    INSERT INTO {GOLD_TABLE} AS g ({columns})
+    SELECT {columns} FROM gold_stage
+    ON CONFLICT (dt) DO UPDATE SET
+      {updates}
+    WHERE ({", ".join(f"g.{c}" for c in values)})
+      IS DISTINCT FROM ({", ".join(f"EXCLUDED.{c}" for c in values)})
+    RETURNING dt, (xmax = 0) AS inserted;
+    """
+
+    buf = io.StringIO()
+    df[GOLD_COLUMNS].to_csv(buf, index=False, header=False)
+    buf.seek(0)
+
+    with conn.cursor() as cur:
+        cur.execute(stage_sql)
+        cur.copy_expert(
+            f"COPY gold_stage ({columns}) FROM STDIN WITH (FORMAT csv)", buf
+        )
+        cur.execute(merge_sql)
+        written = cur.fetchall()
+        _refresh_derived(cur, [dt for dt, _ in written])
+    conn.commit()
+
+    inserted = sum(ins for _, ins in written)
+    return {
+        "inserted": inserted,
+        "updated": len(written) - inserted,
+        "unchanged": len(df) - len(written),
+    }
+
+
+def _refresh_derived(cur: psycopg2.extensions.cursor, changed: list[date]) -> None:
+    """Bring rollups and regimes up to date for the `changed` gold dates.
+
+    Only the periods holding a changed date are rebuilt. Regimes are rebuilt
+    from the run before the earliest change, since a changed trend can
+    extend, split or merge runs from there on. Empty derived tables (e.g.
+    just created) are built from the whole gold table.
+    """
+    table = GOLD_TABLE
+    lo, hi = (min(changed), max(changed)) if changed else (None, None)
+
+    for suffix, unit in ROLLUP_PERIODS.items():
+        rollup = f"{table}_{suffix}"
+        cur.execute(f"SELECT EXISTS (SELECT 1 FROM {rollup})")
+        (populated,) = cur.fetchone()
+        if populated and lo is None:
+            continue
+        start, end = lo, hi
+        if not populated:
+            cur.execute(f"SELECT min(dt), max(dt) FROM {table}")
+            start, end = cur.fetchone()
+            if start is None:
+                continue
+        cur.execute(
+            f"""
+            DELETE FROM {rollup}
+            WHERE period_start BETWEEN date_trunc('{unit}', %(lo)s::date)::date
+                                   AND date_trunc('{unit}', %(hi)s::date)::date;
+            INSERT INTO {rollup}
+            SELECT
+              date_trunc('{unit}', dt)::date AS period_start,
+              min(dt) AS first_dt,
+              max(dt) AS last_dt,
+              count(*) AS trading_days,
+              count(*) FILTER (WHERE trend = 'up') AS up_days,
+              (array_agg(trend ORDER BY dt DESC))[1] AS trend,
+              (array_agg(gold_to_spx_ratio ORDER BY dt))[1] AS ratio_open,
+              (array_agg(gold_to_spx_ratio ORDER BY dt DESC))[1] AS ratio_close,
+              max(gold_to_spx_ratio) AS ratio_high,
+              min(gold_to_spx_ratio) AS ratio_low,
+              avg(gold_to_spx_ratio) AS ratio_avg,
+              (array_agg(gold_close ORDER BY dt DESC))[1] AS gold_close,
+              (array_agg(spx_close ORDER BY dt DESC))[1] AS spx_close,
+              (array_agg(sma_50 ORDER BY dt DESC))[1] AS sma_50,
+              (array_agg(sma_200 ORDER BY dt DESC))[1] AS sma_200
+            FROM {table}
+            WHERE dt >= date_trunc('{unit}', %(lo)s::date)
+              AND dt < date_trunc('{unit}', %(hi)s::date) + interval '1 {unit}'
+            GROUP BY 1;
+            """,
+            {"lo": start, "hi": end},
+        )
+
+    regimes = f"{table}_regimes"
+    cur.execute(f"SELECT EXISTS (SELECT 1 FROM {regimes})")
+    (populated,) = cur.fetchone()
+    if populated and not changed:
+        return
+    if populated:
+        cur.execute(
+            f"""
+            SELECT COALESCE(
+              (SELECT max(run_start) FROM {regimes} WHERE run_start < %s),
+              (SELECT min(dt) FROM {table})
+            )
+            """,
+            (lo,),
+        )
+    else:
+        cur.execute(f"SELECT min(dt) FROM {table}")
+    (rebuild_from,) = cur.fetchone()
+    if rebuild_from is None:
+        return
+    cur.execute(
+        f"""
+        DELETE FROM {regimes} WHERE run_start >= %(from)s;
+        INSERT INTO {regimes}
+        SELECT
+          min(dt) AS run_start,
+          max(dt) AS run_end,
+          min(trend) AS trend,
+          count(*) AS trading_days,
+          max(dt) - min(dt) + 1 AS calendar_days,
+          (array_agg(gold_to_spx_ratio ORDER BY dt))[1] AS ratio_start,
+          (array_agg(gold_to_spx_ratio ORDER BY dt DESC))[1] AS ratio_end,
+          (array_agg(gold_to_spx_ratio ORDER BY dt DESC))[1]
+            / (array_agg(gold_to_spx_ratio ORDER BY dt))[1] - 1 AS ratio_return,
+          (array_agg(gold_close ORDER BY dt DESC))[1]
+            / (array_agg(gold_close ORDER BY dt))[1] - 1 AS gold_return,
+          (array_agg(spx_close ORDER BY dt DESC))[1]
+            / (array_agg(spx_close ORDER BY dt))[1] - 1 AS spx_return
+        FROM (
+          SELECT *, count(*) FILTER (WHERE new_run) OVER (ORDER BY dt) AS run
+          FROM (
+            SELECT *, trend IS DISTINCT FROM lag(trend) OVER (ORDER BY dt) AS new_run
+            FROM {table}
+            WHERE dt >= %(from)s
+          ) t
+        ) r
+        GROUP BY run;
+        """,
+        {"from": rebuild_from},
+    )
+
+
+def _derived_ddl() -> str:
+    table = GOLD_TABLE
+    name = table.split(".", 1)[1]
+    rollups = "".join(
+        f"""
+    CREATE TABLE IF NOT EXISTS {table}_{suffix} (
+      period_start DATE PRIMARY KEY,
+      first_dt DATE NOT NULL,
+      last_dt DATE NOT NULL,
+      trading_days INTEGER NOT NULL,
+      up_days INTEGER NOT NULL,
       trend TEXT NOT NULL,
-      spx_close DOUBLE PRECISION NOT NULL,
+      ratio_open DOUBLE PRECISION NOT NULL,
+      ratio_close DOUBLE PRECISION NOT NULL,
+      ratio_high DOUBLE PRECISION NOT NULL,
+      ratio_low DOUBLE PRECISION NOT NULL,
+      ratio_avg DOUBLE PRECISION NOT NULL,
       gold_close DOUBLE PRECISION NOT NULL,
-      gold_to_spx_ratio DOUBLE PRECISION NOT NULL,
-      spx_to_gold_ratio DOUBLE PRECISION NOT NULL,
+      spx_close DOUBLE PRECISION NOT NULL,
       sma_50 DOUBLE PRECISION NOT NULL,
       sma_200 DOUBLE PRECISION NOT NULL
+    );"""
+        for suffix in ROLLUP_PERIODS
+    )
+    return f"""{rollups}
+    CREATE TABLE IF NOT EXISTS {table}_regimes (
+      run_start DATE PRIMARY KEY,
+      run_end DATE NOT NULL,
+      trend TEXT NOT NULL,
+      trading_days INTEGER NOT NULL,
+      calendar_days INTEGER NOT NULL,
+      ratio_start DOUBLE PRECISION NOT NULL,
+      ratio_end DOUBLE PRECISION NOT NULL,
+      ratio_return DOUBLE PRECISION NOT NULL,
+      gold_return DOUBLE PRECISION NOT NULL,
+      spx_return DOUBLE PRECISION NOT NULL
     );
+    CREATE INDEX IF NOT EXISTS {name}_trend_dt_idx ON {table} (trend, dt);
+    CREATE INDEX IF NOT EXISTS {name}_regimes_trend_idx ON {table}_regimes (trend, run_start);
+    CREATE INDEX IF NOT EXISTS {name}_regimes_end_idx ON {table}_regimes (run_end);
     """
 
-    upsert_sql = f"""
-    INSERT INTO {GOLD_TABLE} (
-      dt, indicator, trend, spx_close, gold_close, gold_to_spx_ratio,
-      spx_to_gold_ratio, sma_50, sma_200
-    ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
-    ON CONFLICT (dt) DO UPDATE SET
-      indicator = EXCLUDED.indicator,
-      trend = EXCLUDED.trend,
-      spx_close = EXCLUDED.spx_close,
-      gold_close = EXCLUDED.gold_close,
-      gold_to_spx_ratio = EXCLUDED.gold_to_spx_ratio,
-      spx_to_gold_ratio = EXCLUDED.spx_to_gold_ratio,
-      sma_50 = EXCLUDED.sma_50,
-      sma_200 = EXCLUDED.sma_200;
-    """
 
-    row = df.iloc[0]
-    vals = (
-        row["dt"],
-        row["indicator"],
-        row["trend"],
-        float(row["spx_close"]),
-        float(row["gold_close"]),
-        float(row["gold_to_spx_ratio"]),
-        float(row["spx_to_gold_ratio"]),
-        float(row["sma_50"]),
-        float(row["sma_200"]),
-    )
-
-    with conn.cursor() as cur:
-        cur.execute(create_sql)
-        cur.execute(upsert_sql, vals)
-    conn.commit()
+def _format_counts(counts: dict[str, int]) -> str:
+    return ", ".join(f"{n} {k}" for k, n in counts.items())
 
 
 @click.command()
@@ -213,7 +423,27 @@ def _upsert_gold(conn: psycopg2.extensions.connection, df: pd.DataFrame) -> None
     default=None,
     help="Report date (YYYY-MM-DD). Default: REPORT_DATE env or today.",
 )
-def cli(report_date: datetime | None) -> None:
+@click.option(
+    "--start",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="First date of a range (YYYY-MM-DD, inclusive). Requires --end.",
+)
+@click.option(
+    "--end",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="Last date of a range (YYYY-MM-DD, inclusive). Requires --start.",
+)
+def cli(
+    report_date: datetime | None, start: datetime | None, end: datetime | None
+) -> None:
     """Publish gold-to-SPX indicator from silver to gold Postgres."""
-    rd = report_date.date() if report_date else None
-    run(report_date=rd)
+    if (start is None) != (end is None):
+        raise click.UsageError("Provide both --start and --end")
+    if start is not None and report_date is not None:
+        raise click.UsageError("Use --report-date or --start/--end, not both")
+    if start is not None and start > end:
+        raise click.UsageError("Date range is empty")
+    rd = (end or report_date).date() if (end or report_date) else None
+    run(report_date=rd, start_date=start.date() if start else None)
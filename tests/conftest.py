@@ -0,0 +1,195 @@
+"""Shared fixtures: synthetic prices, an in-memory stand-in for GCS and a
+scratch gold schema on TEST_POSTGRES_DSN."""
+
+import io
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+from common import bq
+
+_generations = itertools.count(1)
+
+
+class FakeBlob:
+    """A GCS object as (data, metadata, generation) in its bucket's dict."""
+
+    def __init__(self, store: dict, name: str) -> None:
+        self._store = store
+        self.name = name
+        self.metadata = None
+
+    @property
+    def generation(self) -> int | None:
+        return self._store[self.name][2] if self.name in self._store else None
+
+    @property
+    def size(self) -> int | None:
+        return len(self._store[self.name][0]) if self.name in self._store else None
+
+    def exists(self) -> bool:
+        return self.name in self._store
+
+    def reload(self) -> None:
+        if self.name not in self._store:
+            raise NotFound(self.name)
+
+    def upload_from_string(
+        self, data, content_type=None, if_generation_match=None, **_kwargs
+    ) -> None:
+        if if_generation_match is not None and if_generation_match != (self.generation or 0):
+            raise PreconditionFailed(self.name)
+        if isinstance(data, str):
+            data = data.encode()
+        self._store[self.name] = (bytes(data), self.metadata, next(_generations))
+
+    def upload_from_filename(self, filename, content_type=None, **_kwargs) -> None:
+        with open(filename, "rb") as f:
+            self.upload_from_string(f.read())
+
+    def download_as_bytes(self) -> bytes:
+        if self.name not in self._store:
+            raise NotFound(self.name)
+        return self._store[self.name][0]
+
+    def open(self, mode: str = "rb", **_kwargs):
+        if mode == "rb":
+            return io.BytesIO(self.download_as_bytes())
+        return _FakeUpload(self)
+
+    def delete(self, if_generation_match=None) -> None:
+        if self.name not in self._store:
+            raise NotFound(self.name)
+        if if_generation_match is not None and if_generation_match != self.generation:
+            raise PreconditionFailed(self.name)
+        del self._store[self.name]
+
+
+class _FakeUpload(io.BytesIO):
+    """`blob.open("wb")`: the object is committed on a clean close only."""
+
+    def __init__(self, blob: FakeBlob) -> None:
+        super().__init__()
+        self._blob = blob
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is None:
+            self._blob.upload_from_string(self.getvalue())
+        return super().__exit__(exc_type, *args)
+
+
+class FakeBucket:
+    def __init__(self, store: dict) -> None:
+        self._store = store
+
+    def blob(self, name: str) -> FakeBlob:
+        blob = FakeBlob(self._store, name)
+        if name in self._store:
+            blob.metadata = self._store[name][1]
+        return blob
+
+
+class FakeStorageClient:
+    """The slice of `storage.Client` the processors use, keyed by object name."""
+
+    def __init__(self) -> None:
+        self.objects: dict[str, dict] = {}
+
+    def bucket(self, name: str) -> FakeBucket:
+        return FakeBucket(self.objects.setdefault(name, {}))
+
+    def list_blobs(self, bucket: str, prefix: str = "", start_offset=None, end_offset=None):
+        store = self.objects.setdefault(bucket, {})
+        return [
+            self.bucket(bucket).blob(name)
+            for name in sorted(store)
+            if name.startswith(prefix)
+            and (start_offset is None or name >= start_offset)
+            and (end_offset is None or name < end_offset)
+        ]
+
+    def close(self) -> None:
+        pass
+
+
+@pytest.fixture
+def storage_client() -> FakeStorageClient:
+    return FakeStorageClient()
+
+
+def random_walk_prices(
+    symbols: tuple[str, ...], start: str, periods: int, *, gap_frac: float = 0.03, seed: int = 0
+) -> pd.DataFrame:
+    """Business-day closes per symbol with a few dropped rows, typed like a BigQuery read."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, periods=periods).date
+    df = pd.concat(
+        pd.DataFrame(
+            {
+                "symbol": s,
+                "trade_date": dates,
+                "close": 100 * np.exp(np.cumsum(rng.normal(0, 0.01, periods))),
+            }
+        )
+        for s in symbols
+    ).reset_index(drop=True)
+    df = df.drop(df.sample(frac=gap_frac, random_state=seed).index)
+    table = pa.Table.from_pandas(
+        df.sort_values(["symbol", "trade_date"]), preserve_index=False
+    )
+    return bq.to_dataframe(table, dictionary_columns=("symbol",))
+
+
+@pytest.fixture
+def prices() -> pd.DataFrame:
+    return random_walk_prices(("AAA", "BBB", "CCC"), "2023-01-02", 400)
+
+
+@pytest.fixture
+def gold_conn(monkeypatch):
+    """A connection to TEST_POSTGRES_DSN with GOLD_TABLE in a fresh schema."""
+    dsn = os.getenv("TEST_POSTGRES_DSN")
+    if not dsn:
+        pytest.skip("TEST_POSTGRES_DSN not set")
+    psycopg2 = pytest.importorskip("psycopg2")
+    from publishers import spx_gold_trend
+
+    conn = psycopg2.connect(dsn)
+    with conn.cursor() as cur:
+        cur.execute("DROP SCHEMA IF EXISTS test_gold CASCADE")
+    conn.commit()
+    monkeypatch.setattr(spx_gold_trend, "GOLD_TABLE", "test_gold.spx_gold_trend")
+    spx_gold_trend._create_gold_tables(conn)
+    yield conn
+    conn.rollback()
+    with conn.cursor() as cur:
+        cur.execute("DROP SCHEMA IF EXISTS test_gold CASCADE")
+    conn.commit()
+    conn.close()
+
+
+def indicator_rows(start: str, periods: int, *, seed: int = 0) -> pd.DataFrame:
+    """Publisher input (the silver indicator read) with multi-day trend runs."""
+    rng = np.random.default_rng(seed)
+    gold = 1800 * np.exp(np.cumsum(rng.normal(0, 0.01, periods)))
+    spx = 4000 * np.exp(np.cumsum(rng.normal(0, 0.01, periods)))
+    ratio = gold / spx
+    trend = np.repeat(np.resize(["up", "down"], periods), rng.integers(3, 15, periods))
+    return pd.DataFrame(
+        {
+            "dt": pd.bdate_range(start, periods=periods).date,
+            "indicator": "gold_to_spx",
+            "gold_close": gold,
+            "spx_close": spx,
+            "gold_to_spx_ratio": ratio,
+            "spx_to_gold_ratio": 1 / ratio,
+            "trend": trend[:periods],
+            "sma_50": ratio * 0.99,
+            "sma_200": ratio * 0.98,
+        }
+    )
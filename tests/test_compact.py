@@ -0,0 +1,137 @@
+import io
+import json
+from datetime import date, datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import compact
+from common import parquet
+from ingestors import fred, massive
+from tests.test_massive import FakeS3, bronze_files, clock, day_aggs_csv, ingest  # noqa: F401
+
+FRED_PREFIX = "provider=fred/series=STLFSI3/frequency=W/"
+MASSIVE_PREFIX = "provider=massive/series=us_stocks_sip/frequency=daily/"
+
+
+@pytest.fixture
+def bronze(monkeypatch, storage_client):
+    monkeypatch.setattr(compact.storage, "Client", lambda: storage_client)
+    return storage_client.bucket(compact.DATASET_CONFIG["bronze_fred"]["bucket"])
+
+
+def _read(blob) -> pa.Table:
+    return pq.read_table(io.BytesIO(blob.download_as_bytes()))
+
+
+def test_conform_rewrites_pandas_written_fred_files(bronze):
+    old = bronze.blob(f"{FRED_PREFIX}issued_date=2024-01-08/ingest_date=2024-01-08/a.parquet")
+    # As the ingestor wrote it before the declared schema: date is timestamp[ns].
+    frame = pd.DataFrame(
+        {"date": pd.to_datetime(["2024-01-05", "2023-12-29"]), "value": [1.5, None]}
+    )
+    old.upload_from_string(frame.to_parquet(index=False))
+    new = bronze.blob(f"{FRED_PREFIX}issued_date=2024-01-15/ingest_date=2024-01-15/b.parquet")
+    new.upload_from_string(
+        parquet.to_parquet_bytes(
+            fred._to_bronze_table(pd.Series([2.0], index=pd.to_datetime(["2024-01-12"]))),
+            sort_by=("date",),
+        )
+    )
+    new_generation = new.generation
+
+    compact.run(dataset="bronze_fred", conform_only=True)
+
+    table = _read(old)
+    assert table.schema.remove_metadata().equals(fred.BRONZE_SCHEMA)
+    assert table.column("date").to_pylist() == [date(2023, 12, 29), date(2024, 1, 5)]
+    assert table.column("value").to_pylist() == [None, 1.5]
+    assert new.generation == new_generation
+
+
+def test_fred_bronze_is_not_compacted(bronze):
+    with pytest.raises(SystemExit):
+        compact.run(dataset="bronze_fred")
+
+
+@pytest.fixture
+def massive_bronze(monkeypatch, storage_client, clock):
+    """Two February days ingested from a fake Massive S3; `compact` sees March."""
+    monkeypatch.setitem(compact.DATASET_CONFIG["bronze_massive"], "bucket", "bronze")
+    monkeypatch.setattr(compact.storage, "Client", lambda: storage_client)
+    monkeypatch.setattr(compact, "datetime", clock)
+    s3 = FakeS3()
+    for day, tickers in ((5, ["AAPL", "MSFT"]), (6, ["AAPL"])):
+        report_date = date(2024, 2, day)
+        key = massive._massive_object_key("us_stocks_sip", "day_aggs_v1", report_date)
+        s3.put(key, day_aggs_csv(tickers), etag=f"e{day}")
+        clock.today_value = datetime(2024, 2, day + 1, 6, 0)
+        ingest(s3, storage_client, report_date=report_date)
+    clock.today_value = datetime(2024, 3, 2, 6, 0)
+    return s3
+
+
+def _compacted(storage_client, period="2024-02"):
+    bronze = storage_client.objects["bronze"]
+    period_dir = f"{MASSIVE_PREFIX}period={period}/"
+    name = f"{compact.COMPACTED_PREFIX}/{period_dir}bronze_massive-{period}.parquet"
+    manifest = f"{compact.MANIFEST_PREFIX}/{period_dir}manifest.json"
+    return bronze.get(name), json.loads(bronze[manifest][0]) if manifest in bronze else None
+
+
+def _daily_files(storage_client) -> list[str]:
+    return [n for n in bronze_files(storage_client) if n.startswith(MASSIVE_PREFIX)]
+
+
+def test_closed_month_is_compacted_once(storage_client, massive_bronze):
+    compact.run(dataset="bronze_massive")
+
+    (data, _, generation), manifest = _compacted(storage_client)
+    table = pq.read_table(io.BytesIO(data))
+    assert table.num_rows == 3
+    assert sorted(set(table.column("issued_date").to_pylist())) == [
+        date(2024, 2, 5),
+        date(2024, 2, 6),
+    ]
+    assert [s["issued_date"] for s in manifest["sources"]] == ["2024-02-05", "2024-02-06"]
+    assert len(_daily_files(storage_client)) == 2  # sources kept by default
+
+    compact.run(dataset="bronze_massive")
+
+    assert _compacted(storage_client)[0][2] == generation
+
+
+def test_open_month_is_not_compacted(storage_client, massive_bronze, clock):
+    clock.today_value = datetime(2024, 2, 20, 6, 0)
+
+    compact.run(dataset="bronze_massive")
+
+    assert _compacted(storage_client) == (None, None)
+
+
+def test_deleted_sources_still_count_as_ingested(storage_client, massive_bronze, clock):
+    compact.run(dataset="bronze_massive", delete_sources=True)
+
+    assert _daily_files(storage_client) == []
+    # The daily manifests' bronze files now live in the compacted file.
+    clock.today_value = datetime(2024, 3, 3, 6, 0)
+    assert not ingest(massive_bronze, storage_client, report_date=date(2024, 2, 5))
+    assert massive_bronze.gets == 2
+
+
+def test_re_ingest_after_compaction_replaces_only_its_date(storage_client, massive_bronze, clock):
+    compact.run(dataset="bronze_massive", delete_sources=True)
+    key = massive._massive_object_key("us_stocks_sip", "day_aggs_v1", date(2024, 2, 5))
+    massive_bronze.put(key, day_aggs_csv(["AAPL", "MSFT", "NVDA"]), etag="e5b")
+    clock.today_value = datetime(2024, 3, 3, 6, 0)
+    assert ingest(massive_bronze, storage_client, report_date=date(2024, 2, 5))
+
+    compact.run(dataset="bronze_massive", delete_sources=True)
+
+    (data, _, _), manifest = _compacted(storage_client)
+    table = pq.read_table(io.BytesIO(data))
+    days = pd.Series(table.column("issued_date").to_pylist()).value_counts()
+    assert days[date(2024, 2, 5)] == 3 and days[date(2024, 2, 6)] == 1
+    assert len(manifest["sources"]) == 3
@@ -0,0 +1,101 @@
+import io
+import os
+import tempfile
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from common import features as feature_engine
+
+FEATURES = ("sma_5", "sma_20", "ema_10", "rsi_14", "volatility_20", "drawdown_30", "return_1")
+
+
+def _round_trip(state: pd.DataFrame) -> pd.DataFrame:
+    """The checkpoint as the processor stores and reloads it (Parquet)."""
+    buf = io.BytesIO()
+    pq.write_table(pa.Table.from_pandas(state, preserve_index=False), buf)
+    return pq.read_table(io.BytesIO(buf.getvalue())).to_pandas()
+
+
+def _assert_same_features(a: pd.DataFrame, b: pd.DataFrame) -> None:
+    key = ["symbol", "trade_date"]
+    a = a.astype({"symbol": str}).sort_values(key, ignore_index=True)
+    b = b.astype({"symbol": str}).sort_values(key, ignore_index=True)
+    assert a[key].equals(b[key])
+    for name in FEATURES:
+        np.testing.assert_allclose(a[name], b[name], rtol=1e-9, atol=1e-12, equal_nan=True)
+
+
+def test_advance_in_daily_steps_matches_full_recompute(prices):
+    full = feature_engine.compute_features(prices, FEATURES)
+
+    dates = prices["trade_date"].drop_duplicates().sort_values().to_numpy(dtype=object)
+    first = prices[prices["trade_date"] <= dates[99]]
+    out, state = feature_engine.advance(feature_engine.empty_state(FEATURES), first, FEATURES)
+    outs = [out]
+    for day in dates[100:]:
+        state = _round_trip(state)
+        new = prices[prices["trade_date"] == day].reset_index(drop=True)
+        out, state = feature_engine.advance(state, new, FEATURES)
+        outs.append(out)
+
+    _assert_same_features(pd.concat(outs, ignore_index=True), full)
+
+
+def test_advance_keeps_symbols_without_new_rows(prices):
+    dates = prices["trade_date"].drop_duplicates().sort_values().to_numpy(dtype=object)
+    _, state = feature_engine.advance(
+        feature_engine.empty_state(FEATURES), prices[prices["trade_date"] <= dates[50]], FEATURES
+    )
+    only_aaa = prices[(prices["trade_date"] == dates[51]) & (prices["symbol"] == "AAA")]
+    _, next_state = feature_engine.advance(state, only_aaa.reset_index(drop=True), FEATURES)
+
+    assert list(next_state["symbol"]) == ["AAA", "BBB", "CCC"]
+    before = state.set_index("symbol")
+    after = next_state.set_index("symbol")
+    assert after.at["AAA", "n_obs"] == before.at["AAA", "n_obs"] + 1
+    for symbol in ("BBB", "CCC"):
+        assert after.at[symbol, "n_obs"] == before.at[symbol, "n_obs"]
+        assert after.at[symbol, "last_date"] == before.at[symbol, "last_date"]
+
+
+def test_parallel_matches_single_process(prices):
+    single, single_state = feature_engine.advance(
+        feature_engine.empty_state(FEATURES), prices, FEATURES
+    )
+    parallel, parallel_state = feature_engine.advance_parallel(
+        feature_engine.empty_state(FEATURES), prices, FEATURES, workers=2
+    )
+    _assert_same_features(parallel, single)
+    assert list(parallel_state["symbol"]) == list(single_state["symbol"])
+
+
+def _write_part(out_dir: str, shard: int, df: pd.DataFrame) -> None:
+    df.to_parquet(os.path.join(out_dir, f"part-{shard}.parquet"), index=False)
+
+
+def test_parallel_shard_writer_and_ipc_files_are_cleaned_up(prices, tmp_path, monkeypatch):
+    work, parts = tmp_path / "work", tmp_path / "parts"
+    work.mkdir()
+    parts.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(work))
+    single, single_state = feature_engine.advance(
+        feature_engine.empty_state(FEATURES), prices, FEATURES
+    )
+
+    out, state = feature_engine.advance_parallel(
+        feature_engine.empty_state(FEATURES),
+        prices,
+        FEATURES,
+        workers=2,
+        shard_writer=partial(_write_part, str(parts)),
+    )
+
+    assert out is prices
+    written = pd.concat(pd.read_parquet(p) for p in sorted(parts.iterdir()))
+    _assert_same_features(written, single)
+    assert list(state["symbol"]) == list(single_state["symbol"])
+    assert list(work.iterdir()) == []
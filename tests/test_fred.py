@@ -0,0 +1,196 @@
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+import pytest
+
+from ingestors import fred as fred_ingest
+
+
+class FakeFred:
+    """The fredapi calls the ingestor makes, recorded with their arguments."""
+
+    root_url = "https://fred.test/fred"
+    api_key = "test-key"
+
+    def __init__(self, data: pd.Series, vintages: list[str], last_updated: str) -> None:
+        self.data = data
+        self.vintages = [datetime.strptime(v, "%Y-%m-%d") for v in vintages]
+        self.last_updated = last_updated
+        self.calls: list[tuple] = []
+
+    def get_series_info(self, series_id):
+        self.calls.append(("info", series_id))
+        return {"id": series_id, "frequency_short": "W", "last_updated": self.last_updated}
+
+    def get_series_vintage_dates(self, series_id):
+        self.calls.append(("vintage_dates", series_id))
+        return self.vintages
+
+    def get_series(self, series_id, observation_start=None):
+        self.calls.append(("series", series_id, observation_start))
+        if observation_start is None:
+            return self.data
+        return self.data[self.data.index >= pd.Timestamp(observation_start)]
+
+
+@pytest.fixture
+def observations(monkeypatch):
+    """Fake `series/observations` endpoint: set `rows`, read back `queries`."""
+    endpoint = {"rows": [], "queries": []}
+
+    def urlopen(url):
+        endpoint["queries"].append(
+            {k: v[0] for k, v in parse_qs(urlsplit(url).query).items()}
+        )
+        return io.BytesIO(json.dumps({"observations": endpoint["rows"]}).encode())
+
+    monkeypatch.setattr(fred_ingest, "urlopen", urlopen)
+    return endpoint
+
+
+def _weekly(start: str, periods: int, *, seed: int = 0) -> pd.Series:
+    index = pd.date_range(start, periods=periods, freq="W-FRI")
+    return pd.Series(range(seed, seed + periods), index=index, dtype="float64")
+
+
+def _ingest(fred, storage_client, **kwargs) -> bool:
+    return fred_ingest._ingest_series(
+        fred,
+        storage_client,
+        fred_ingest._TokenBucket(rate=1000, capacity=10),
+        landing_zone_bucket="landing",
+        bronze_bucket="bronze",
+        series_id="STLFSI3",
+        today=kwargs.pop("today", "2024-06-03"),
+        revision_window_days=kwargs.pop("revision_window_days", 28),
+        **kwargs,
+    )
+
+
+def test_revision_check_asks_only_for_revised_observations_before_the_window(
+    observations,
+):
+    fred = FakeFred(_weekly("2020-01-03", 10), ["2024-01-05", "2024-05-31", "2024-06-07"], "")
+
+    assert (
+        fred_ingest._earliest_revision(
+            fred,
+            fred_ingest._TokenBucket(rate=1000, capacity=10),
+            "STLFSI3",
+            "2024-05-31",
+            date(2024, 5, 3),
+        )
+        is None
+    )
+
+    (query,) = observations["queries"]
+    assert query["series_id"] == "STLFSI3"
+    assert query["vintage_dates"] == "2024-06-07"
+    assert query["output_type"] == "3"
+    assert query["observation_end"] == "2024-05-02"
+    assert "observation_start" not in query and "realtime_start" not in query
+
+
+def test_no_new_vintage_skips_the_observation_request(observations):
+    fred = FakeFred(_weekly("2020-01-03", 10), ["2024-01-05", "2024-05-31"], "")
+    limiter = fred_ingest._TokenBucket(rate=1000, capacity=10)
+
+    assert fred_ingest._earliest_revision(fred, limiter, "X", "2024-05-31", date(2024, 5, 3)) is None
+    assert observations["queries"] == []
+
+
+def test_incremental_run_fetches_the_window_and_writes_the_delta(storage_client, observations):
+    first = FakeFred(_weekly("2024-01-05", 20), ["2024-05-24"], "2024-05-24 07:31:02-05")
+    assert _ingest(first, storage_client, today="2024-05-24")
+
+    data = _weekly("2024-01-05", 21)
+    data.iloc[-3] = 99.0  # revised inside the window
+    second = FakeFred(data, ["2024-05-24", "2024-05-31"], "2024-05-31 07:31:02-05")
+    assert _ingest(second, storage_client, today="2024-05-31")
+
+    assert second.calls[-1] == ("series", "STLFSI3", date(2024, 4, 19))
+    bronze = sorted(n for n in storage_client.objects["bronze"] if n.endswith(".parquet"))
+    assert len(bronze) == 2
+    delta = pd.read_parquet(io.BytesIO(storage_client.objects["bronze"][bronze[-1]][0]))
+    assert [str(d) for d in delta["date"]] == ["2024-05-10", "2024-05-24"]
+
+    # Unchanged last_updated: only the series info is requested.
+    third = FakeFred(data, [], "2024-05-31 07:31:02-05")
+    assert not _ingest(third, storage_client, today="2024-06-03")
+    assert third.calls == [("info", "STLFSI3")]
+
+
+def test_revision_before_the_window_re_pulls_the_full_history(storage_client, observations):
+    first = FakeFred(_weekly("2024-01-05", 20), ["2024-05-24"], "2024-05-24 07:31:02-05")
+    _ingest(first, storage_client, today="2024-05-24")
+
+    observations["rows"] = [{"date": "2024-02-02", "STLFSI3_20240531": "5"}]
+    data = _weekly("2024-01-05", 21)
+    data.iloc[4] = 5.0
+    second = FakeFred(data, ["2024-05-24", "2024-05-31"], "2024-05-31 07:31:02-05")
+    _ingest(second, storage_client, today="2024-05-31")
+
+    assert second.calls[-1] == ("series", "STLFSI3", None)
+    newest = max(n for n in storage_client.objects["bronze"] if n.endswith(".parquet"))
+    assert len(pd.read_parquet(io.BytesIO(storage_client.objects["bronze"][newest][0]))) == 21
+
+
+def test_uploads_are_logged(storage_client, observations, caplog, capsys):
+    fred = FakeFred(_weekly("2024-01-05", 3), [], "2024-01-19 07:31:02-06")
+    with caplog.at_level("INFO"):
+        _ingest(fred, storage_client)
+
+    uploads = [r for r in caplog.records if r.getMessage().startswith("Successfully uploaded")]
+    assert len(uploads) == 2 and capsys.readouterr().out == ""
+
+
+class FakeClock:
+    """monotonic()/sleep() for the token bucket: sleeping advances the clock."""
+
+    def __init__(self) -> None:
+        self.now = 100.0
+        self.slept: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket_bursts_then_holds_the_rate(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(fred_ingest.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(fred_ingest.time, "sleep", clock.sleep)
+    bucket = fred_ingest._TokenBucket(rate=2.0, capacity=3)
+
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.slept == []
+
+    for _ in range(4):
+        bucket.acquire()
+    assert clock.now - 100.0 == pytest.approx(2.0)
+
+    clock.now += 60
+    for _ in range(4):
+        bucket.acquire()
+    # Idle time refills to capacity only, so the fourth request waits again.
+    assert clock.now - 162.0 == pytest.approx(0.5)
+
+
+def test_token_bucket_is_shared_safely_across_threads():
+    bucket = fred_ingest._TokenBucket(rate=200.0, capacity=5)
+    start = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: bucket.acquire(), range(45)))
+
+    # 5 from the burst, then 40 at 200/s: never faster than the rate allows.
+    assert time.monotonic() - start >= 40 / 200.0 * 0.95
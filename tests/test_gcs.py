@@ -0,0 +1,33 @@
+import google.auth
+import pytest
+from google.auth.credentials import AnonymousCredentials
+from google.auth.transport.requests import AuthorizedSession
+
+from common import gcs
+
+
+@pytest.fixture(autouse=True)
+def credentials(monkeypatch):
+    creds = AnonymousCredentials()
+    monkeypatch.setattr(google.auth, "default", lambda *args, **kwargs: (creds, "test-project"))
+    monkeypatch.setenv("GOOGLE_CLOUD_PROJECT", "test-project")
+    return creds
+
+
+def test_large_pool_gets_its_own_authorized_session(credentials):
+    client = gcs.pooled_storage_client(pool_size=32)
+
+    session = client._http
+    assert isinstance(session, AuthorizedSession)
+    assert session.credentials is credentials
+    adapter = session.get_adapter("https://storage.googleapis.com/")
+    assert adapter._pool_maxsize == 32 and adapter._pool_connections == 32
+    client.close()
+
+
+def test_default_pool_is_a_plain_client():
+    client = gcs.pooled_storage_client(pool_size=10)
+
+    adapter = client._http.get_adapter("https://storage.googleapis.com/")
+    assert adapter._pool_maxsize == 10
+    client.close()
@@ -0,0 +1,240 @@
+import gzip
+import io
+from datetime import date, datetime, timezone
+
+import pyarrow.parquet as pq
+import pytest
+
+from ingestors import massive
+
+REPORT_DATE = date(2024, 3, 4)
+SOURCE_KEY = massive._massive_object_key("us_stocks_sip", "day_aggs_v1", REPORT_DATE)
+
+
+class FakeS3:
+    """Massive flat files by key: HEAD, streaming GET and file download."""
+
+    def __init__(self) -> None:
+        self.objects: dict[str, tuple[bytes, str]] = {}
+        self.gets = 0
+
+    def put(self, key: str, data: bytes, etag: str) -> None:
+        self.objects[key] = (data, etag)
+
+    def head_object(self, Bucket, Key):
+        data, etag = self.objects[Key]
+        return {
+            "ETag": f'"{etag}"',
+            "ContentLength": len(data),
+            "LastModified": datetime(2024, 3, 5, tzinfo=timezone.utc),
+        }
+
+    def get_object(self, Bucket, Key):
+        self.gets += 1
+        return {"Body": io.BytesIO(self.objects[Key][0])}
+
+    def download_fileobj(self, Bucket, Key, Fileobj, Config=None):
+        self.gets += 1
+        Fileobj.write(self.objects[Key][0])
+
+
+def day_aggs_csv(tickers: list[str], *, minutes: int = 1) -> bytes:
+    """A gzipped *_aggs_v1 flat file: one bar per ticker per minute."""
+    lines = ["ticker,volume,open,close,high,low,window_start,transactions"]
+    start = 1709560800_000_000_000  # 2024-03-04 14:00 UTC, in epoch ns
+    for ticker in tickers:
+        for m in range(minutes):
+            ns = start + m * 60_000_000_000
+            lines.append(f"{ticker},{100 + m},1.0,1.5,2.0,0.5,{ns},{m + 1}")
+    return gzip.compress(("\n".join(lines) + "\n").encode())
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Sets the day `datetime.now()` returns inside the ingestor (the ingest_date)."""
+
+    class Clock(datetime):
+        today_value = datetime(2024, 3, 5, 6, 0)
+
+        @classmethod
+        def now(cls, tz=None):
+            return cls.today_value
+
+    monkeypatch.setattr(massive, "datetime", Clock)
+    return Clock
+
+
+@pytest.fixture
+def s3() -> FakeS3:
+    s3 = FakeS3()
+    s3.put(SOURCE_KEY, day_aggs_csv(["AAPL", "MSFT"]), etag="v1")
+    return s3
+
+
+def ingest(s3, storage_client, *, force=False, streaming=True, **kwargs) -> bool:
+    return massive._ingest_date(
+        s3,
+        storage_client,
+        landing_zone_bucket="landing",
+        bronze_bucket="bronze",
+        series_id="us_stocks_sip",
+        resolution=kwargs.pop("resolution", "daily"),
+        report_date=kwargs.pop("report_date", REPORT_DATE),
+        streaming=streaming,
+        force=force,
+    )
+
+
+def bronze_files(storage_client) -> list[str]:
+    return sorted(storage_client.objects.get("bronze", {}))
+
+
+def manifests(storage_client) -> dict[str, bytes]:
+    landing = storage_client.objects.get("landing", {})
+    return {n: v[0] for n, v in landing.items() if n.startswith(massive.MANIFEST_PREFIX)}
+
+
+def test_rerun_after_bronze_was_lost_replaces_the_stale_manifest(s3, storage_client, clock):
+    assert ingest(s3, storage_client)
+    (lost,) = bronze_files(storage_client)
+    storage_client.bucket("bronze").blob(lost).delete()
+
+    clock.today_value = datetime(2024, 3, 6, 6, 0)
+    assert ingest(s3, storage_client)
+    clock.today_value = datetime(2024, 3, 7, 6, 0)
+    assert not ingest(s3, storage_client)
+    assert not ingest(s3, storage_client)
+
+    assert s3.gets == 2
+    (bronze,) = bronze_files(storage_client)
+    assert "ingest_date=2024-03-06" in bronze
+    (manifest,) = manifests(storage_client).values()
+    assert bronze.encode() in manifest
+
+
+def test_unchanged_etag_is_skipped_without_a_download(s3, storage_client, clock):
+    assert ingest(s3, storage_client)
+    before = {b: dict(objs) for b, objs in storage_client.objects.items()}
+
+    clock.today_value = datetime(2024, 3, 6, 6, 0)
+    assert not ingest(s3, storage_client)
+
+    assert s3.gets == 1
+    assert storage_client.objects == before
+
+
+def test_new_source_version_replaces_the_old_bronze_file(s3, storage_client, clock):
+    ingest(s3, storage_client)
+    s3.put(SOURCE_KEY, day_aggs_csv(["AAPL", "MSFT", "NVDA"]), etag="v2")
+
+    clock.today_value = datetime(2024, 3, 6, 6, 0)
+    assert ingest(s3, storage_client)
+
+    (bronze,) = bronze_files(storage_client)
+    assert "ingest_date=2024-03-06" in bronze
+    table = pq.read_table(io.BytesIO(storage_client.objects["bronze"][bronze][0]))
+    assert table.num_rows == 3
+    # Both versions keep their manifest and landing copy.
+    assert sorted(n.rsplit("/", 1)[1] for n in manifests(storage_client)) == ["v1.json", "v2.json"]
+    assert len(storage_client.objects["landing"]) == 4
+
+
+def test_force_re_ingests_and_prunes_the_earlier_copy(s3, storage_client, clock):
+    ingest(s3, storage_client)
+
+    clock.today_value = datetime(2024, 3, 6, 6, 0)
+    assert ingest(s3, storage_client, force=True)
+
+    assert s3.gets == 2
+    (bronze,) = bronze_files(storage_client)
+    assert "ingest_date=2024-03-06" in bronze
+
+
+class _FailingBody(io.BytesIO):
+    """An S3 body whose connection drops after `fail_after` bytes."""
+
+    def __init__(self, data: bytes, fail_after: int) -> None:
+        super().__init__(data)
+        self._fail_after = fail_after
+
+    def read(self, size=-1):
+        remaining = self._fail_after - self.tell()
+        if remaining <= 0:
+            raise ConnectionError("connection reset")
+        return super().read(remaining if size is None or size < 0 else min(size, remaining))
+
+
+def test_streaming_lands_the_exact_source_bytes(s3, storage_client, clock):
+    s3.put(SOURCE_KEY, day_aggs_csv(["AAPL", "MSFT"], minutes=50), etag="v1")
+
+    assert ingest(s3, storage_client)
+
+    landing = {n: v[0] for n, v in storage_client.objects["landing"].items()}
+    (raw,) = [v for n, v in landing.items() if n.endswith(".csv.gz")]
+    # Byte-for-byte, including the gzip trailer the CSV decoder never reads.
+    assert raw == s3.objects[SOURCE_KEY][0]
+    (bronze,) = bronze_files(storage_client)
+    table = pq.read_table(io.BytesIO(storage_client.objects["bronze"][bronze][0]))
+    assert table.num_rows == 100
+    assert table.column("ticker").to_pylist() == ["AAPL"] * 50 + ["MSFT"] * 50
+
+
+def test_streaming_and_file_mode_write_the_same_bronze(s3, storage_client, clock):
+    ingest(s3, storage_client, streaming=True)
+    (streamed,) = bronze_files(storage_client)
+    streamed = pq.read_table(io.BytesIO(storage_client.objects["bronze"][streamed][0]))
+
+    clock.today_value = datetime(2024, 3, 6, 6, 0)
+    ingest(s3, storage_client, streaming=False, force=True)
+    (downloaded,) = bronze_files(storage_client)
+    downloaded = pq.read_table(io.BytesIO(storage_client.objects["bronze"][downloaded][0]))
+
+    assert streamed.equals(downloaded)
+
+
+def test_failed_stream_commits_nothing(s3, storage_client, clock, monkeypatch):
+    data = s3.objects[SOURCE_KEY][0]
+    monkeypatch.setattr(
+        s3, "get_object", lambda Bucket, Key: {"Body": _FailingBody(data, len(data) // 2)}
+    )
+
+    with pytest.raises(ConnectionError):
+        ingest(s3, storage_client)
+
+    assert not any(storage_client.objects.values())
+
+
+def test_background_writer_reraises_upload_errors():
+    class BrokenSink:
+        def write(self, data):
+            raise OSError("upload failed")
+
+    writer = massive._BackgroundWriter(BrokenSink(), chunk_size=4)
+    writer.write(b"12345")
+    with pytest.raises(OSError, match="upload failed"):
+        writer.finish()
+
+
+def test_minute_files_always_stream_in_small_row_groups(storage_client, clock, monkeypatch):
+    s3 = FakeS3()
+    key = massive._massive_object_key("us_stocks_sip", "minute_aggs_v1", REPORT_DATE)
+    tickers = [f"T{i:03}" for i in range(40)]
+    s3.put(key, day_aggs_csv(tickers, minutes=60), etag="m1")
+    monkeypatch.setattr(massive, "STREAM_BLOCK_SIZE_MAP", {"minute": 16 << 10})
+    monkeypatch.setattr(
+        s3, "download_fileobj", lambda *a, **k: pytest.fail("minute files must stream")
+    )
+
+    assert ingest(s3, storage_client, resolution="minute", streaming=False)
+
+    (bronze,) = bronze_files(storage_client)
+    assert "/frequency=minute/" in bronze
+    parquet_file = pq.ParquetFile(io.BytesIO(storage_client.objects["bronze"][bronze][0]))
+    meta = parquet_file.metadata
+    assert meta.num_rows == 40 * 60
+    assert meta.num_row_groups > 1
+    ticker = parquet_file.schema_arrow.get_field_index("ticker")
+    stats = [meta.row_group(i).column(ticker).statistics for i in range(meta.num_row_groups)]
+    bounds = [(s.min, s.max) for s in stats]
+    # Row groups cover consecutive ticker ranges, so a one-ticker read skips the rest.
+    assert all(hi <= lo for (_, hi), (lo, _) in zip(bounds, bounds[1:]))
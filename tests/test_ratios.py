@@ -0,0 +1,204 @@
+import io
+from datetime import date
+
+import fsspec
+import fsspec.implementations.local
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from indicators import ratios, spx_gold_daily
+from tests.conftest import random_walk_prices
+
+PAIRS = [("gold_to_spx", "GLD", "SPY"), ("tlt_to_spx", "TLT", "SPY")]
+
+
+@pytest.fixture
+def ratio_prices() -> pd.DataFrame:
+    prices = random_walk_prices(("GLD", "SPY", "TLT"), "2021-01-04", 900, gap_frac=0, seed=5)
+    prices = prices.rename(columns={"trade_date": "dt"})
+    # Whole-market holidays: a day one leg misses gives its pairs a NaN ratio,
+    # which keeps the SMAs NaN for a full window.
+    holidays = prices["dt"].drop_duplicates().sample(frac=0.03, random_state=5)
+    prices = prices[~prices["dt"].isin(holidays)]
+    prices["symbol"] = prices["symbol"].astype(str)
+    return prices.sort_values(["dt", "symbol"], ignore_index=True)
+
+
+def _round_trip(state: pd.DataFrame) -> pd.DataFrame:
+    buf = io.BytesIO()
+    pq.write_table(pa.Table.from_pandas(state, preserve_index=False), buf)
+    return pq.read_table(io.BytesIO(buf.getvalue())).to_pandas()
+
+
+def _dates(prices: pd.DataFrame) -> np.ndarray:
+    return prices["dt"].drop_duplicates().sort_values().to_numpy(dtype=object)
+
+
+def _by_pair(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values(["indicator", "dt"], ignore_index=True)
+
+
+def _assert_same_rows(a: pd.DataFrame, b: pd.DataFrame) -> None:
+    a, b = _by_pair(a), _by_pair(b)
+    for c in ("dt", "indicator", "trend", "trend_run_id"):
+        assert list(a[c]) == list(b[c]), c
+    for c in ("value", "sma_50", "sma_200"):
+        np.testing.assert_allclose(a[c], b[c], rtol=1e-9, equal_nan=True)
+
+
+def test_daily_steps_match_full_recompute(ratio_prices):
+    full = ratios.compute_ratios(ratio_prices, PAIRS)
+    dates = _dates(ratio_prices)
+
+    out, state = ratios.advance_ratios(
+        ratios.empty_state(), ratio_prices[ratio_prices["dt"] <= dates[399]], PAIRS
+    )
+    outs = [out]
+    for day in dates[400:]:
+        state = _round_trip(state)
+        out, state = ratios.advance_ratios(state, ratio_prices[ratio_prices["dt"] == day], PAIRS)
+        outs.append(out)
+
+    _assert_same_rows(pd.concat(outs), full)
+
+
+def test_run_ids_are_run_start_dates(ratio_prices):
+    full = _by_pair(ratios.compute_ratios(ratio_prices, PAIRS))
+    for _, rows in full.groupby("indicator"):
+        starts = rows.groupby("trend_run_id")["dt"].min()
+        assert [int(f"{d:%Y%m%d}") for d in starts] == list(starts.index)
+        assert (rows["trend_run_id"].diff().dropna() >= 0).all()
+
+
+def test_run_ids_survive_a_recompute_from_a_later_start(ratio_prices):
+    """A fallback recompute over a shorter window keeps ids for every run
+    that starts after its first (truncated) run."""
+    full = _by_pair(ratios.compute_ratios(ratio_prices, PAIRS))
+    dates = _dates(ratio_prices)
+    later = _by_pair(ratios.compute_ratios(ratio_prices[ratio_prices["dt"] >= dates[300]], PAIRS))
+
+    for name, rows in later.groupby("indicator"):
+        first_run = rows["trend_run_id"].iloc[0]
+        tail = rows[rows["trend_run_id"] != first_run]
+        expected = full[(full["indicator"] == name) & full["dt"].isin(tail["dt"])]
+        assert not tail.empty
+        assert list(tail["trend_run_id"]) == list(expected["trend_run_id"])
+
+
+def test_seeded_recompute_keeps_the_recorded_run_ids(ratio_prices):
+    """A window starting anywhere continues the runs an earlier checkpoint
+    recorded, so every id in it matches the one computed from all history."""
+    full = _by_pair(ratios.compute_ratios(ratio_prices, PAIRS))
+    dates = _dates(ratio_prices)
+    truncated = 0
+    for offset in (100, 300, 350, 400):
+        seed_day = dates[offset + 250]
+        _, seeds = ratios.advance_ratios(
+            ratios.empty_state(), ratio_prices[ratio_prices["dt"] <= seed_day], PAIRS
+        )
+        window = ratio_prices[ratio_prices["dt"] >= dates[offset]]
+
+        unseeded = _by_pair(ratios.compute_ratios(window, PAIRS))
+        seeded = _by_pair(ratios.compute_ratios(window, PAIRS, seeds=_round_trip(seeds)))
+
+        expected = full[full["dt"] >= seed_day]
+        assert _ids_after(seeded, seed_day) == list(expected["trend_run_id"])
+        truncated += _ids_after(unseeded, seed_day) != list(expected["trend_run_id"])
+    assert truncated  # the window edge does cut a run for some offsets
+
+
+def _ids_after(rows: pd.DataFrame, day) -> list:
+    return list(rows.loc[rows["dt"] >= day, "trend_run_id"])
+
+
+def test_missing_symbol_only_affects_its_pairs(ratio_prices):
+    dates = _dates(ratio_prices)
+    _, state = ratios.advance_ratios(
+        ratios.empty_state(), ratio_prices[ratio_prices["dt"] <= dates[599]], PAIRS
+    )
+    day = ratio_prices[(ratio_prices["dt"] == dates[600]) & (ratio_prices["symbol"] != "TLT")]
+
+    out, next_state = ratios.advance_ratios(state, day, PAIRS)
+
+    gold = out[out["indicator"] == "gold_to_spx"]
+    tlt = out[out["indicator"] == "tlt_to_spx"]
+    assert list(gold["dt"]) == [dates[600]] and gold["value"].notna().all()
+    # SPY traded: the TLT pair gets the NaN-ratio row a longer run would have.
+    assert tlt["value"].isna().all()
+    assert set(next_state["symbol"]) == {"gold_to_spx", "tlt_to_spx"}
+
+
+def test_all_symbols_missing_is_an_error(ratio_prices):
+    other = ratio_prices.assign(symbol="XYZ")
+    with pytest.raises(SystemExit):
+        ratios.advance_ratios(ratios.empty_state(), other, PAIRS)
+
+
+def test_indicator_checkpoints_chain(monkeypatch, tmp_path, ratio_prices):
+    """Run ids and SMAs continue through `_store_state` / `_load_state`."""
+    fs = fsspec.filesystem("file", auto_mkdir=True)
+    monkeypatch.setattr(spx_gold_daily, "SILVER_BUCKET", str(tmp_path))
+    dates = _dates(ratio_prices)
+    full = ratios.compute_ratios(ratio_prices[ratio_prices["dt"] <= dates[420]], PAIRS)
+
+    out, state = ratios.advance_ratios(
+        ratios.empty_state(), ratio_prices[ratio_prices["dt"] <= dates[400]], PAIRS
+    )
+    spx_gold_daily._store_state(fs, state, dates[400], PAIRS)
+    outs = [out]
+    for day in dates[401:421]:
+        as_of, state, _ = spx_gold_daily._load_state(fs, day, PAIRS, max_gap_days=7)
+        rows = ratio_prices[(ratio_prices["dt"] > as_of) & (ratio_prices["dt"] <= day)]
+        out, state = ratios.advance_ratios(state, rows, PAIRS)
+        spx_gold_daily._store_state(fs, state, day, PAIRS)
+        outs.append(out)
+
+    _assert_same_rows(pd.concat(outs), full)
+    # Other pairs, or a gap past max_gap_days: full recompute.
+    assert spx_gold_daily._load_state(fs, dates[421], PAIRS[:1], max_gap_days=7) is None
+    assert spx_gold_daily._load_state(fs, date(2030, 1, 1), PAIRS, max_gap_days=7) is None
+
+
+def test_full_recompute_continues_runs_from_an_older_checkpoint(
+    monkeypatch, tmp_path, ratio_prices
+):
+    """Without a usable checkpoint (stale, or not incremental), the indicator
+    reads back to the latest older one and keeps its run ids."""
+    fs = _LocalFileSystem(auto_mkdir=True)
+    monkeypatch.setattr(spx_gold_daily, "SILVER_BUCKET", str(tmp_path))
+    monkeypatch.setattr(spx_gold_daily.gcsfs, "GCSFileSystem", lambda: fs)
+    monkeypatch.setattr(spx_gold_daily, "_upload", lambda files: None)
+    reads = []
+
+    def pull(start_dt, end_dt, symbols):
+        reads.append(start_dt)
+        return ratio_prices[ratio_prices["dt"].between(start_dt, end_dt)]
+
+    monkeypatch.setattr(spx_gold_daily, "_pull_daily_prices", pull)
+    dates = _dates(ratio_prices)
+    full = ratios.compute_ratios(ratio_prices, PAIRS)
+    _, state = ratios.advance_ratios(
+        ratios.empty_state(), ratio_prices[ratio_prices["dt"] <= dates[400]], PAIRS
+    )
+    spx_gold_daily._store_state(fs, state, dates[400], PAIRS)
+
+    for incremental in (False, True):  # the checkpoint is 30 trading days old
+        rows = spx_gold_daily.run(
+            end_dt=dates[430],
+            pairs=PAIRS,
+            source="bigquery",
+            cache_url=None,
+            incremental=incremental,
+            max_gap_days=7,
+        )
+        expected = full[full["dt"] == dates[430]]
+        _assert_same_rows(rows, expected)
+        assert reads[-1] < dates[400]
+
+
+class _LocalFileSystem(fsspec.implementations.local.LocalFileSystem):
+    def close(self) -> None:
+        pass
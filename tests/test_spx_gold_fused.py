@@ -0,0 +1,79 @@
+import os
+from datetime import date
+
+import pandas as pd
+import psycopg2
+import pytest
+
+from indicators import ratios, spx_gold_daily
+from publishers import spx_gold_fused, spx_gold_trend
+from tests.conftest import random_walk_prices
+
+PAIRS = [("gold_to_spx", "GLD", "SPY"), ("tlt_to_spx", "TLT", "SPY")]
+
+
+@pytest.fixture
+def indicator_output() -> pd.DataFrame:
+    """What spx_gold_daily.run returns for a range: every pair's rows."""
+    prices = random_walk_prices(("GLD", "SPY", "TLT"), "2023-01-02", 340, gap_frac=0, seed=3)
+    prices = prices.rename(columns={"trade_date": "dt"}).astype({"symbol": str})
+    rows = ratios.compute_ratios(prices, PAIRS)
+    return rows[rows["dt"] >= date(2024, 1, 2)].reset_index(drop=True)
+
+
+@pytest.fixture
+def fused(monkeypatch, indicator_output):
+    """spx_gold_fused wired to canned indicator rows; returns the run kwargs seen."""
+    calls = []
+
+    def indicator_run(**kwargs):
+        calls.append(kwargs)
+        end = kwargs["end_dt"]
+        if kwargs["start_dt"] is None:
+            return indicator_output[indicator_output["dt"] == end]
+        return indicator_output[
+            (indicator_output["dt"] >= kwargs["start_dt"]) & (indicator_output["dt"] <= end)
+        ]
+
+    monkeypatch.setattr(spx_gold_daily, "run", indicator_run)
+    return calls
+
+
+def test_gold_input_matches_the_silver_read(indicator_output):
+    ind = spx_gold_fused._gold_input(indicator_output)
+
+    assert set(ind["indicator"]) == {spx_gold_trend.INDICATOR_ID}
+    gold = indicator_output[indicator_output["indicator"] == "gold_to_spx"]
+    assert list(ind["gold_close"]) == list(gold["base_close"])
+    assert list(ind["spx_to_gold_ratio"]) == list(gold["inverse_value"])
+    # The columns _make_gold_rows requires, and nothing else.
+    assert len(spx_gold_trend._make_gold_rows(ind)) == len(gold)
+
+
+def test_no_gold_rows_is_an_error(fused, monkeypatch):
+    monkeypatch.setattr(spx_gold_trend, "INDICATOR_ID", "missing_pair")
+    with pytest.raises(SystemExit):
+        spx_gold_fused.run(report_date=date(2024, 3, 1))
+
+
+def test_range_run_publishes_the_indicator_rows(fused, gold_conn, indicator_output, monkeypatch):
+    dsn = os.environ["TEST_POSTGRES_DSN"]
+    monkeypatch.setattr(spx_gold_trend, "_get_db_connection", lambda: psycopg2.connect(dsn))
+
+    spx_gold_fused.run(report_date=date(2024, 3, 29), start_date=date(2024, 3, 1))
+    spx_gold_fused.run(report_date=date(2024, 4, 1), incremental=True)
+
+    assert fused[0]["start_dt"] == date(2024, 3, 1) and not fused[0]["incremental"]
+    assert fused[1]["start_dt"] is None and fused[1]["incremental"]
+    gold = indicator_output[
+        (indicator_output["indicator"] == "gold_to_spx")
+        & (indicator_output["dt"].between(date(2024, 3, 1), date(2024, 4, 1)))
+    ]
+    with gold_conn.cursor() as cur:
+        cur.execute(
+            f"SELECT dt, trend, gold_to_spx_ratio FROM {spx_gold_trend.GOLD_TABLE} ORDER BY dt"
+        )
+        stored = cur.fetchall()
+    assert [r[0] for r in stored] == list(gold["dt"])
+    assert [r[1] for r in stored] == list(gold["trend"])
+    assert [r[2] for r in stored] == pytest.approx(list(gold["value"]), rel=1e-12)
@@ -0,0 +1,165 @@
+"""Gold upserts against a real Postgres; skipped unless TEST_POSTGRES_DSN is set."""
+
+import os
+
+import numpy as np
+import pandas as pd
+import psycopg2
+
+from publishers import spx_gold_trend
+from tests.conftest import indicator_rows
+
+
+def _gold(conn) -> pd.DataFrame:
+    with conn.cursor() as cur:
+        cur.execute(
+            f"SELECT {', '.join(spx_gold_trend.GOLD_COLUMNS)} "
+            f"FROM {spx_gold_trend.GOLD_TABLE} ORDER BY dt"
+        )
+        return pd.DataFrame(cur.fetchall(), columns=spx_gold_trend.GOLD_COLUMNS)
+
+
+def _assert_gold_equals(conn, rows: pd.DataFrame) -> None:
+    stored = _gold(conn)
+    expected = rows.sort_values("dt", ignore_index=True)[spx_gold_trend.GOLD_COLUMNS]
+    for c in ("dt", "indicator", "trend"):
+        assert list(stored[c]) == list(expected[c]), c
+    for c in spx_gold_trend.GOLD_COLUMNS[3:]:
+        np.testing.assert_allclose(stored[c], expected[c], rtol=1e-12)
+
+
+def test_range_upsert_round_trips(gold_conn):
+    rows = spx_gold_trend._make_gold_rows(indicator_rows("2024-01-01", 120))
+
+    counts = spx_gold_trend._upsert_gold(gold_conn, rows)
+
+    assert counts == {"inserted": 120, "updated": 0, "unchanged": 0}
+    _assert_gold_equals(gold_conn, rows)
+
+
+def test_range_upsert_keeps_the_last_row_per_date(gold_conn):
+    ind = indicator_rows("2024-01-01", 10)
+    dup = ind.iloc[[4]].assign(trend="flat", gold_close=1.0)
+    rows = spx_gold_trend._make_gold_rows(pd.concat([ind, dup], ignore_index=True))
+
+    spx_gold_trend._upsert_gold(gold_conn, rows)
+
+    stored = _gold(gold_conn)
+    assert len(stored) == 10
+    assert stored.loc[4, "trend"] == "flat" and stored.loc[4, "gold_close"] == 1.0
+
+
+def test_upsert_counts_inserted_updated_and_unchanged(gold_conn):
+    rows = spx_gold_trend._make_gold_rows(indicator_rows("2024-01-01", 60))
+    spx_gold_trend._upsert_gold(gold_conn, rows)
+
+    assert spx_gold_trend._upsert_gold(gold_conn, rows) == {
+        "inserted": 0,
+        "updated": 0,
+        "unchanged": 60,
+    }
+
+    changed = rows.copy()
+    changed.loc[changed.index[[3, 17]], "sma_200"] += 0.01
+    changed.loc[changed.index[40], "trend"] = "flat"
+    more = spx_gold_trend._make_gold_rows(indicator_rows("2024-03-25", 5, seed=1))
+    counts = spx_gold_trend._upsert_gold(gold_conn, pd.concat([changed, more]))
+
+    assert counts == {"inserted": 5, "updated": 3, "unchanged": 57}
+    _assert_gold_equals(gold_conn, pd.concat([changed, more]))
+
+
+def test_unchanged_rows_are_not_rewritten(gold_conn):
+    rows = spx_gold_trend._make_gold_rows(indicator_rows("2024-01-01", 20))
+    spx_gold_trend._upsert_gold(gold_conn, rows)
+    tuples = _row_versions(gold_conn)
+
+    spx_gold_trend._upsert_gold(gold_conn, rows)
+
+    assert _row_versions(gold_conn) == tuples
+
+
+def _row_versions(conn) -> list:
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT dt, xmin::text FROM {spx_gold_trend.GOLD_TABLE} ORDER BY dt")
+        return cur.fetchall()
+
+
+DERIVED = {"weekly": "period_start", "monthly": "period_start", "regimes": "run_start"}
+
+
+def _derived(conn) -> dict[str, pd.DataFrame]:
+    out = {}
+    with conn.cursor() as cur:
+        for suffix, key in DERIVED.items():
+            cur.execute(f"SELECT * FROM {spx_gold_trend.GOLD_TABLE}_{suffix} ORDER BY {key}")
+            out[suffix] = pd.DataFrame(cur.fetchall(), columns=[d.name for d in cur.description])
+    return out
+
+
+def _rebuilt_derived(conn) -> dict[str, pd.DataFrame]:
+    """Derived tables built from scratch out of the current gold table."""
+    with conn.cursor() as cur:
+        for suffix in DERIVED:
+            cur.execute(f"DROP TABLE {spx_gold_trend.GOLD_TABLE}_{suffix}")
+        cur.execute(spx_gold_trend._derived_ddl())
+        spx_gold_trend._refresh_derived(cur, [])
+    conn.commit()
+    return _derived(conn)
+
+
+def test_incremental_refresh_matches_a_full_rebuild(gold_conn):
+    rows = spx_gold_trend._make_gold_rows(indicator_rows("2024-01-01", 150))
+    spx_gold_trend._upsert_gold(gold_conn, rows)
+
+    # A trend flip inside a run (splitting it), a value edit and a few new days.
+    edited = rows.copy()
+    edited.loc[edited.index[90], "trend"] = "flip"
+    edited.loc[edited.index[120], "gold_to_spx_ratio"] *= 1.5
+    more = spx_gold_trend._make_gold_rows(indicator_rows("2024-07-29", 8, seed=1))
+    spx_gold_trend._upsert_gold(gold_conn, edited.iloc[85:])
+    spx_gold_trend._upsert_gold(gold_conn, more)
+
+    incremental = _derived(gold_conn)
+    full = _rebuilt_derived(gold_conn)
+
+    for suffix in DERIVED:
+        pd.testing.assert_frame_equal(incremental[suffix], full[suffix], check_exact=False)
+    assert incremental["weekly"]["trading_days"].sum() == 158
+    assert (incremental["regimes"]["trend"] == "flip").sum() == 1
+    regimes = incremental["regimes"]
+    assert (regimes["trend"] != regimes["trend"].shift()).all()
+
+
+class _RecordingCursor(psycopg2.extensions.cursor):
+    statements: list[str] = []
+
+    def execute(self, query, vars=None):
+        self.statements.append(str(query))
+        return super().execute(query, vars)
+
+
+def test_tables_are_created_once_per_connection(gold_conn, monkeypatch):
+    with gold_conn.cursor() as cur:
+        cur.execute("DROP SCHEMA test_gold CASCADE")
+    gold_conn.commit()
+    dsn, connect = os.environ["TEST_POSTGRES_DSN"], psycopg2.connect
+    monkeypatch.setenv("GOLD_POSTGRES_PASSWORD", "")
+    monkeypatch.setattr(
+        psycopg2, "connect", lambda **kwargs: connect(dsn, cursor_factory=_RecordingCursor)
+    )
+    monkeypatch.setattr(_RecordingCursor, "statements", [])
+
+    first = spx_gold_trend._make_gold_rows(indicator_rows("2024-01-01", 30))
+    more = spx_gold_trend._make_gold_rows(indicator_rows("2024-02-12", 5, seed=1))
+    conn = spx_gold_trend._get_db_connection()
+    try:
+        spx_gold_trend._upsert_gold(conn, first)
+        spx_gold_trend._upsert_gold(conn, more)
+    finally:
+        conn.close()
+
+    ddl = [s for s in _RecordingCursor.statements if "CREATE TABLE IF NOT EXISTS" in s]
+    assert len(ddl) == 2  # the gold table, then the derived tables
+    assert len(_gold(gold_conn)) == 35
+    assert _derived(gold_conn)["weekly"]["trading_days"].sum() == 35
@@ -0,0 +1,161 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from processors import stock_features_daily as processor
+
+FEATURES = ("sma_5", "ema_10", "return_1")
+LOOKBACK_DAYS = 40
+
+
+@pytest.fixture
+def pipeline(monkeypatch, storage_client, prices):
+    """Processor wired to `prices` as bronze and the fake bucket as silver.
+
+    Returns a list that collects (read_from, read_to, written rows) per run.
+    """
+    runs = []
+
+    def read_market_data(start_dt, end_dt):
+        rows = prices[(prices["trade_date"] >= start_dt) & (prices["trade_date"] <= end_dt)]
+        runs.append({"read": (start_dt, end_dt)})
+        return rows.reset_index(drop=True)
+
+    def store_partitions(_client, df, first):
+        runs[-1]["written"] = df[df["trade_date"] >= first] if first else df.iloc[:0]
+
+    monkeypatch.setattr(processor, "_read_market_data", read_market_data)
+    monkeypatch.setattr(processor, "_store_partitions", store_partitions)
+    monkeypatch.setattr(processor.gcs, "pooled_storage_client", lambda *_: storage_client)
+    return runs
+
+
+def _run(end_dt, *, incremental=True, max_gap_days=7):
+    processor.run(
+        end_dt=end_dt,
+        lookback_days=LOOKBACK_DAYS,
+        features=FEATURES,
+        incremental=incremental,
+        max_gap_days=max_gap_days,
+        layout="trade_date",
+        workers=1,
+    )
+
+
+def _trade_dates(prices):
+    return prices["trade_date"].drop_duplicates().sort_values().to_numpy(dtype=object)
+
+
+def _checkpoints(storage_client):
+    names = storage_client.objects.get(processor.SILVER_BUCKET, {})
+    return sorted(n for n in names if n.startswith(processor.STATE_PREFIX))
+
+
+def test_checkpoints_chain_and_match_full_recompute(pipeline, storage_client, prices):
+    dates = _trade_dates(prices)
+    _run(dates[200])  # no checkpoint yet: full recompute
+    for day in dates[201:206]:
+        _run(day)
+
+    # Each incremental run read only the days after the previous checkpoint.
+    for previous, day, run in zip(dates[200:205], dates[201:206], pipeline[1:]):
+        assert run["read"][0] <= previous < day == run["read"][1]
+        assert list(run["written"]["trade_date"].unique()) == [day]
+    assert _checkpoints(storage_client)[-1] == processor._checkpoint_blob_path(dates[205])
+
+    # Same result as one computation from the first run's read window (EMAs
+    # depend on where they start, so a fresh lookback window would differ).
+    window = prices[
+        (prices["trade_date"] >= pipeline[0]["read"][0]) & (prices["trade_date"] <= dates[205])
+    ]
+    full = processor.feature_engine.compute_features(
+        window.reset_index(drop=True), FEATURES, min_periods=processor.MIN_PERIODS
+    )
+    incremental = pd.concat(run["written"] for run in pipeline[1:])
+    for day in dates[201:206]:
+        expected = full[full["trade_date"] == day].sort_values("symbol", ignore_index=True)
+        actual = incremental[incremental["trade_date"] == day].sort_values(
+            "symbol", ignore_index=True
+        )
+        for name in FEATURES:
+            np.testing.assert_allclose(actual[name], expected[name], rtol=1e-9, equal_nan=True)
+
+
+def test_checkpoint_is_the_last_trade_date_absorbed(pipeline, storage_client, prices):
+    dates = _trade_dates(prices)
+    # A weekend end date: the checkpoint stays on Friday's trade date.
+    friday = next(d for d in dates[200:] if d.weekday() == 4)
+    saturday = date.fromordinal(friday.toordinal() + 1)
+    _run(saturday)
+    assert _checkpoints(storage_client) == [processor._checkpoint_blob_path(friday)]
+
+
+def test_empty_delta_is_a_no_op(pipeline, storage_client, prices):
+    dates = _trade_dates(prices)
+    friday = next(d for d in dates[200:] if d.weekday() == 4)
+    _run(friday)
+    before = dict(storage_client.objects[processor.SILVER_BUCKET])
+
+    _run(date.fromordinal(friday.toordinal() + 1))  # Saturday: no new bronze rows
+
+    assert "written" not in pipeline[-1]
+    assert storage_client.objects[processor.SILVER_BUCKET] == before
+
+
+def test_late_bronze_day_falls_back_to_full_recompute(
+    pipeline, storage_client, prices, monkeypatch
+):
+    dates = _trade_dates(prices)
+    late = dates[202]
+    monkeypatch.setattr(
+        processor,
+        "_read_market_data",
+        _reading(prices[prices["trade_date"] != late], pipeline),
+    )
+    _run(dates[200])
+    _run(dates[203])  # dates[202] not in bronze yet: absorbed without it
+
+    monkeypatch.setattr(processor, "_read_market_data", _reading(prices, pipeline))
+    _run(dates[204])
+
+    read_from, read_to = pipeline[-1]["read"]
+    assert read_to == dates[204]
+    assert read_from == dates[204] - timedelta(days=LOOKBACK_DAYS)
+    assert late in set(pipeline[-1]["written"]["trade_date"])
+
+
+def test_stale_checkpoint_falls_back_to_full_recompute(pipeline, prices):
+    dates = _trade_dates(prices)
+    _run(dates[200])
+    _run(dates[215], max_gap_days=7)
+    assert pipeline[-1]["read"][0] == dates[215] - timedelta(days=LOOKBACK_DAYS)
+
+
+def test_checkpoint_with_other_features_is_ignored(storage_client, prices):
+    state = processor.feature_engine.empty_state(FEATURES)
+    processor._store_checkpoint(storage_client, state, date(2024, 1, 5), FEATURES, set())
+    assert processor._load_checkpoint(storage_client, date(2024, 1, 8), FEATURES, 7) is not None
+    assert processor._load_checkpoint(storage_client, date(2024, 1, 8), ("sma_5",), 7) is None
+
+
+def test_default_layout_writes_an_as_of_snapshot(pipeline, monkeypatch, prices):
+    stored = []
+    monkeypatch.setattr(
+        processor, "_store_to_silver", lambda _client, df, path: stored.append(path)
+    )
+    day = _trade_dates(prices)[200]
+    processor.run(end_dt=day, lookback_days=LOOKBACK_DAYS, features=FEATURES, workers=1)
+
+    assert stored == [processor._gcp_blob_path(day)]
+    assert "written" not in pipeline[-1]
+
+
+def _reading(prices, runs):
+    def read_market_data(start_dt, end_dt):
+        rows = prices[(prices["trade_date"] >= start_dt) & (prices["trade_date"] <= end_dt)]
+        runs.append({"read": (start_dt, end_dt)})
+        return rows.reset_index(drop=True)
+
+    return read_market_data